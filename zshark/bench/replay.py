@@ -0,0 +1,235 @@
+import os
+import socket
+import stat
+import struct
+import sys
+import time
+from typing import Any, BinaryIO, Callable, Dict, Iterator, Optional, Tuple
+
+from scapy.utils import RawPcapReader, RawPcapNgReader
+
+# Nanosecond-resolution pcap, so retimed and original timestamps survive the stream unchanged.
+PCAP_NS_MAGIC = 0xa1b23c4d
+SNAPLEN = 262144
+MAX_DATAGRAM = 65507
+# Sleep while the next packet is further ahead than this, then spin on the clock for the rest;
+# time.sleep alone overshoots by 50-100 us, which caps paced replay at ~10k packets/sec.
+SPIN_NS = 2_000_000
+LATE_NS = 1_000_000
+
+
+def read_records(pcap_path: str) -> Iterator[Tuple[int, bytes, int, int]]:
+    # (timestamp ns, frame, original length, linktype) for every record, without dissection.
+    reader = RawPcapReader(pcap_path)
+    try:
+        if isinstance(reader, RawPcapNgReader):
+            for raw, meta in reader:
+                ticks = (meta.tshigh << 32) + meta.tslow
+                yield ticks * 1_000_000_000 // meta.tsresol, raw, meta.wirelen, meta.linktype
+        else:
+            unit = 1 if reader.nano else 1000
+            for raw, meta in reader:
+                yield meta.sec * 1_000_000_000 + meta.usec * unit, raw, meta.wirelen, reader.linktype
+    finally:
+        reader.close()
+
+
+class PcapStreamSink:
+    # Writes a pcap stream (file, named pipe or stdout). The global header takes the linktype
+    # of the first packet; records of another linktype cannot be represented and are dropped.
+    def __init__(self, stream: BinaryIO, name: str):
+        self.stream = stream
+        self.name = name
+        self.linktype: Optional[int] = None
+
+    def send(self, ts_ns: int, raw: bytes, wirelen: int, linktype: int) -> bool:
+        if self.linktype is None:
+            self.linktype = linktype
+            self.stream.write(struct.pack("<IHHiIII", PCAP_NS_MAGIC, 2, 4, 0, 0, SNAPLEN, linktype))
+        elif linktype != self.linktype:
+            return False
+        sec, nsec = divmod(ts_ns, 1_000_000_000)
+        self.stream.write(struct.pack("<IIII", sec, nsec, len(raw), wirelen))
+        self.stream.write(raw)
+        return True
+
+    def flush(self) -> None:
+        self.stream.flush()
+
+    def close(self) -> None:
+        try:
+            self.stream.close()
+        except BrokenPipeError:
+            pass
+
+
+class UdpSink:
+    # One datagram per link-layer frame, like a port mirror; timestamps are not carried.
+    def __init__(self, host: str, port: int):
+        self.name = f"udp://{host}:{port}"
+        self.sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 4 << 20)
+        self.sock.connect((host, port))
+
+    def send(self, ts_ns: int, raw: bytes, wirelen: int, linktype: int) -> bool:
+        if len(raw) > MAX_DATAGRAM:
+            return False
+        try:
+            self.sock.send(raw)
+        except (ConnectionRefusedError, BlockingIOError):
+            # Nobody listening (ICMP port unreachable) or a full socket buffer: the frame is lost.
+            return False
+        return True
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.sock.close()
+
+
+def open_sink(target: str, mkfifo: bool = False):
+    # "-" is stdout, udp://host:port a local UDP socket, tcp://host:port and unix:///path a pcap
+    # stream to `zshark listen`; anything else is a file or named pipe (created when missing and
+    # `mkfifo` is set). Opening a pipe waits for its reader.
+    if target == "-":
+        return PcapStreamSink(sys.stdout.buffer, "stdout"), None
+    if target.startswith(("tcp://", "unix://")):
+        from zshark.core.ingest import parse_address
+
+        kind, address = parse_address(target)
+        if kind == "unix":
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.connect(address)
+        else:
+            sock = socket.create_connection(address)
+        stream = sock.makefile("wb", buffering=1 << 16)
+        # The connection stays open until the file object is closed.
+        sock.close()
+        return PcapStreamSink(stream, target), None
+    if target.startswith("udp://"):
+        host, _, port = target[len("udp://"):].rpartition(":")
+        if not host or not port.isdigit():
+            raise ValueError(f"Invalid UDP target '{target}' (expected udp://host:port)")
+        return UdpSink(host.strip("[]"), int(port)), None
+    created = None
+    if mkfifo and not os.path.exists(target):
+        os.mkfifo(target)
+        created = target
+    elif os.path.exists(target) and not stat.S_ISFIFO(os.stat(target).st_mode) and not os.path.isfile(target):
+        raise ValueError(f"Cannot replay into {target}: not a file or named pipe")
+    return PcapStreamSink(open(target, "wb", buffering=1 << 16), target), created
+
+
+class ReplayStats:
+    def __init__(self, speed: Optional[float], pps: Optional[float]):
+        self.speed = speed
+        self.target_pps = pps
+        self.packets = 0
+        self.bytes = 0
+        self.dropped = 0
+        self.loops = 0
+        self.capture_span_s = 0.0
+        self.elapsed_s = 0.0
+        self.late_packets = 0
+        self.max_lag_s = 0.0
+        self.total_lag_s = 0.0
+        self.stopped = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        elapsed = self.elapsed_s or float("nan")
+        return {
+            "mode": "max" if self.speed is None and self.target_pps is None else
+                    "pps" if self.target_pps is not None else "speed",
+            "speed": self.speed,
+            "target_pps": self.target_pps,
+            "packets": self.packets,
+            "bytes": self.bytes,
+            "dropped": self.dropped,
+            "loops": self.loops,
+            "elapsed_s": self.elapsed_s,
+            "capture_span_s": self.capture_span_s,
+            "pps": self.packets / elapsed,
+            "mbps": self.bytes * 8 / elapsed / 1e6,
+            "achieved_speed": self.capture_span_s / elapsed if self.capture_span_s else None,
+            "late_packets": self.late_packets,
+            "mean_lag_ms": self.total_lag_s / self.packets * 1000 if self.packets else 0.0,
+            "max_lag_ms": self.max_lag_s * 1000,
+            "stopped": self.stopped,
+        }
+
+
+def replay(pcap_path: str, sink, speed: Optional[float] = 1.0, pps: Optional[float] = None, loops: int = 1,
+           retime: bool = False, progress_interval_s: float = 0.0,
+           progress: Optional[Callable[[ReplayStats], None]] = None) -> ReplayStats:
+    # Sends every record of `pcap_path` to `sink` on schedule: at the capture's own inter-packet
+    # times divided by `speed`, at a constant `pps`, or as fast as possible when both are None.
+    # Send times are planned from the start of the replay rather than from the previous packet,
+    # so sleep overshoot and slow writes do not accumulate into drift.
+    if speed is not None and speed <= 0:
+        raise ValueError("Replay speed must be positive")
+    if pps is not None and pps <= 0:
+        raise ValueError("Packet rate must be positive")
+    stats = ReplayStats(None if pps is not None else speed, pps)
+    interval_ns = int(1e9 / pps) if pps is not None else 0
+    clock = time.perf_counter_ns
+    wall_offset = time.time_ns() - clock()
+    start = clock()
+    next_progress = start + int(progress_interval_s * 1e9) if progress is not None and progress_interval_s > 0 else None
+    first_ts = last_ts = None
+    shift = 0
+    index = 0
+    per_loop = 0
+    last_sent = None
+
+    try:
+        for loop in range(max(1, loops)):
+            for ts, raw, wirelen, linktype in read_records(pcap_path):
+                if first_ts is None:
+                    first_ts = ts
+                if loop == 0:
+                    last_ts = ts
+                    per_loop += 1
+                if speed is not None or pps is not None:
+                    due = start + (index * interval_ns if pps is not None else int((ts + shift - first_ts) / speed))
+                    now = clock()
+                    if due > now:
+                        sink.flush()
+                        if due - now > SPIN_NS:
+                            time.sleep((due - now - SPIN_NS // 2) / 1e9)
+                        while clock() < due:
+                            pass
+                    else:
+                        lag = now - due
+                        if lag > LATE_NS:
+                            stats.late_packets += 1
+                        stats.total_lag_s += lag / 1e9
+                        stats.max_lag_s = max(stats.max_lag_s, lag / 1e9)
+                index += 1
+                out_ts = clock() + wall_offset if retime else ts + shift
+                if sink.send(out_ts, raw, wirelen, linktype):
+                    stats.packets += 1
+                    stats.bytes += wirelen
+                else:
+                    stats.dropped += 1
+                last_sent = ts + shift
+                if next_progress is not None and clock() >= next_progress:
+                    stats.elapsed_s = (clock() - start) / 1e9
+                    progress(stats)
+                    next_progress += int(progress_interval_s * 1e9)
+            if first_ts is None:
+                break
+            stats.loops += 1
+            # The next pass starts one mean packet gap after the last packet, so the capture
+            # timeline (and the paced schedule) stays monotonic across loops.
+            span = last_ts - first_ts
+            shift += span + (span // (per_loop - 1) if per_loop > 1 else 0)
+        sink.flush()
+    except BrokenPipeError:
+        stats.stopped = "reader closed the stream"
+    except KeyboardInterrupt:
+        stats.stopped = "interrupted"
+    stats.elapsed_s = (clock() - start) / 1e9
+    if last_sent is not None:
+        stats.capture_span_s = (last_sent - first_ts) / 1e9
+    return stats
@@ -0,0 +1,234 @@
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import get_context
+from typing import Dict, Any, List, Optional
+
+import zshark
+
+RESULTS_SCHEMA = 1
+
+
+def measure_startup(repeat: int = 3) -> float:
+    probe = "import time; s = time.perf_counter(); import zshark.cli.main; print(time.perf_counter() - s)"
+    samples = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, "-c", probe], capture_output=True, text=True, check=True)
+        samples.append(float(out.stdout.strip()))
+    return min(samples)
+
+
+def _read_pass(pcap_path: str) -> Dict[str, Any]:
+    from scapy.utils import RawPcapReader
+
+    packets = 0
+    start = time.perf_counter()
+    reader = RawPcapReader(pcap_path)
+    try:
+        for _ in reader:
+            packets += 1
+    finally:
+        reader.close()
+    return {"wall_s": time.perf_counter() - start, "packets": packets}
+
+
+def run_once(pcap_path: str, config_json: str, with_report: bool, verbose: bool = False) -> Dict[str, Any]:
+    from loguru import logger
+    logger.remove()
+    logger.add(sys.stderr, level="DEBUG" if verbose else "WARNING")
+
+    from zshark.core.data_structures import ZSharkConfig
+    from zshark.core.processor import Analyzer
+
+    config = ZSharkConfig.model_validate_json(config_json)
+    read = _read_pass(pcap_path)
+
+    analyzer = Analyzer(config)
+    start = time.perf_counter()
+    result = analyzer.analyze_pcap(pcap_path)
+    analysis_s = time.perf_counter() - start
+
+    analysis_stats = result.analysis_stats
+    stages = {stage: entry["wall_s"] for stage, entry in analysis_stats.get("stages", {}).items()}
+    for engine_name, entry in analysis_stats.get("models", {}).items():
+        stages[f"model:{engine_name}"] = entry["wall_s"]
+    ingest = stages.pop("ingest", 0.0)
+    stages["read"] = read["wall_s"]
+    stages["dissect"] = max(0.0, ingest - read["wall_s"])
+
+    if with_report:
+        from zshark.reports.pdf_generator import generate_pdf_report
+
+        with tempfile.TemporaryDirectory() as tmp:
+            json_path = os.path.join(tmp, "bench_analysis.json")
+            with open(json_path, "w") as f:
+                f.write(result.model_dump_json(indent=4))
+            report_start = time.perf_counter()
+            generate_pdf_report(json_path, os.path.join(tmp, "bench_report.pdf"))
+            stages["report"] = time.perf_counter() - report_start
+
+    peak_rss = _peak_rss_kb()
+    windows = len(result.window_stats)
+
+    return {
+        "packets": result.total_packets,
+        "windows": windows,
+        "detections": len(result.detections),
+        "analysis_s": analysis_s,
+        "pps": result.total_packets / analysis_s if analysis_s > 0 else 0.0,
+        # Per-window cost dominates small-window runs, where packets per window are few.
+        "window_us": analysis_s / windows * 1e6 if windows else 0.0,
+        "stages": stages,
+        "peak_rss_kb": peak_rss,
+    }
+
+
+def _peak_rss_kb() -> int:
+    # ru_maxrss is reported in KiB on Linux and in bytes on macOS.
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        peak_rss //= 1024
+    return peak_rss
+
+
+def write_scaled_analysis(analysis_json: str, out_path: str, scale: int) -> Dict[str, int]:
+    # Repeats windows and detections back to back in time to model a capture `scale` times longer.
+    # Streams the source once per repetition so large inputs are never held in memory.
+    from datetime import timedelta
+    from zshark.reports.json_stream import iter_object
+
+    streamed = ("detections", "window_stats")
+    header = {key: value for key, value in iter_object(analysis_json, streamed) if key not in streamed}
+    start = datetime.fromisoformat(header["start_time"])
+    span = datetime.fromisoformat(header["end_time"]) - start or timedelta(seconds=1)
+    header["end_time"] = (start + max(1, scale) * span).isoformat()
+    counts = {"detections": 0, "windows": 0}
+
+    with open(out_path, "w") as out:
+        out.write(json.dumps(header)[:-1])
+        for key, field, time_key in (("detections", "detections", "timestamp"), ("window_stats", "windows", "start_time")):
+            out.write(f', "{key}": [')
+            first = True
+            for k in range(max(1, scale)):
+                for name, entry in iter_object(analysis_json, streamed):
+                    if name != key:
+                        continue
+                    entry[time_key] = (datetime.fromisoformat(entry[time_key]) + k * span).isoformat()
+                    out.write(("" if first else ", ") + json.dumps(entry))
+                    first = False
+                    counts[field] += 1
+            out.write("]")
+        out.write("}")
+    return counts
+
+
+def report_once(analysis_json: str, verbose: bool = False) -> Dict[str, Any]:
+    from loguru import logger
+    logger.remove()
+    logger.add(sys.stderr, level="DEBUG" if verbose else "WARNING")
+
+    from zshark.reports.pdf_generator import generate_pdf_report
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = os.path.join(tmp, "bench_report.pdf")
+        start = time.perf_counter()
+        generate_pdf_report(analysis_json, pdf_path)
+        report_s = time.perf_counter() - start
+        pdf_bytes = os.path.getsize(pdf_path)
+
+    return {
+        "report_s": report_s,
+        "pdf_bytes": pdf_bytes,
+        "stages": {"report": report_s},
+        "peak_rss_kb": _peak_rss_kb(),
+    }
+
+
+def run_report_benchmark(analysis_json: str, scale: int = 1, repeat: int = 1, verbose: bool = False) -> Dict[str, Any]:
+    runs = []
+    with tempfile.TemporaryDirectory() as tmp:
+        # Scaling happens here so the measured worker only pays for the report itself.
+        json_path = os.path.join(tmp, "scaled_analysis.json")
+        counts = write_scaled_analysis(analysis_json, json_path, scale)
+        for _ in range(max(1, repeat)):
+            with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+                runs.append({**counts, **pool.submit(report_once, json_path, verbose).result()})
+
+    return {
+        "schema": RESULTS_SCHEMA,
+        "kind": "report",
+        "zshark_version": zshark.__version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "input": {"analysis_json": analysis_json, "scale": scale},
+        "runs": runs,
+        "median": {
+            "report_s": statistics.median(run["report_s"] for run in runs),
+            "peak_rss_kb": max(run["peak_rss_kb"] for run in runs),
+            "stages": {"report": statistics.median(run["report_s"] for run in runs)},
+        },
+    }
+
+
+def _median_run(runs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    stages = sorted({stage for run in runs for stage in run["stages"]})
+    return {
+        "analysis_s": statistics.median(run["analysis_s"] for run in runs),
+        "pps": statistics.median(run["pps"] for run in runs),
+        "window_us": statistics.median(run.get("window_us", 0.0) for run in runs),
+        "peak_rss_kb": max(run["peak_rss_kb"] for run in runs),
+        "stages": {stage: statistics.median(run["stages"].get(stage, 0.0) for run in runs) for stage in stages},
+    }
+
+
+def run_benchmark(pcap_path: str, config, repeat: int = 1, with_report: bool = True,
+                  generated: Optional[Dict[str, Any]] = None, verbose: bool = False) -> Dict[str, Any]:
+    runs = []
+    config_json = config.model_dump_json()
+    for _ in range(max(1, repeat)):
+        # Each run gets a fresh interpreter so peak RSS and warm caches are per-run.
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+            runs.append(pool.submit(run_once, pcap_path, config_json, with_report, verbose).result())
+
+    return {
+        "schema": RESULTS_SCHEMA,
+        "zshark_version": zshark.__version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "input": {
+            "pcap": pcap_path,
+            "bytes": os.path.getsize(pcap_path),
+            "generated": generated,
+        },
+        "config": json.loads(config_json),
+        "startup_s": measure_startup(),
+        "runs": runs,
+        "median": _median_run(runs),
+    }
+
+
+def compare_results(old: Dict[str, Any], new: Dict[str, Any]) -> List[str]:
+    def line(name, before, after):
+        change = (after - before) / before * 100 if before else 0.0
+        return f"{name:<28} {before:>12.4f} -> {after:>12.4f}  ({change:+.1f}%)"
+
+    old_median, new_median = old["median"], new["median"]
+    lines = []
+    if "startup_s" in old or "startup_s" in new:
+        lines.append(line("startup_s", old.get("startup_s", 0.0), new.get("startup_s", 0.0)))
+    for metric in ("analysis_s", "report_s", "pps", "window_us", "peak_rss_kb"):
+        if metric in old_median or metric in new_median:
+            lines.append(line(metric, old_median.get(metric, 0.0), new_median.get(metric, 0.0)))
+    for stage in sorted(set(old_median["stages"]) | set(new_median["stages"])):
+        lines.append(line(stage, old_median["stages"].get(stage, 0.0), new_median["stages"].get(stage, 0.0)))
+    return lines
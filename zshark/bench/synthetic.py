@@ -0,0 +1,207 @@
+import heapq
+import random
+import socket
+import string
+import struct
+from typing import Dict, Iterator, Tuple, Optional
+
+TRAFFIC_KINDS = ("benign", "flood", "scan", "beaconing", "dga", "arp")
+DEFAULT_MIX: Dict[str, float] = {
+    "benign": 0.55,
+    "flood": 0.2,
+    "scan": 0.1,
+    "beaconing": 0.05,
+    "dga": 0.05,
+    "arp": 0.05,
+}
+BASE_TIME = 1_700_000_000.0
+DEFAULT_RATE_PPS = 200.0
+LINKTYPE_ETHERNET = 1
+
+Frame = Tuple[float, bytes]
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    mix: Dict[str, float] = {}
+    for part in text.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        kind, _, weight = part.partition("=")
+        kind = kind.strip()
+        if kind not in TRAFFIC_KINDS:
+            raise ValueError(f"Unknown traffic kind '{kind}'. Available: {', '.join(TRAFFIC_KINDS)}")
+        mix[kind] = float(weight) if weight else 1.0
+    total = sum(mix.values())
+    if total <= 0:
+        raise ValueError("Traffic mix must contain at least one positive weight.")
+    return {kind: weight / total for kind, weight in mix.items()}
+
+
+def _checksum(data: bytes) -> int:
+    if len(data) % 2:
+        data += b"\x00"
+    total = sum(struct.unpack(f"!{len(data) // 2}H", data))
+    while total >> 16:
+        total = (total & 0xFFFF) + (total >> 16)
+    return ~total & 0xFFFF
+
+
+def _mac(n: int) -> bytes:
+    return b"\x02\x00" + n.to_bytes(4, "big")
+
+
+def _ip(text: str) -> bytes:
+    return socket.inet_aton(text)
+
+
+def ether(dst: bytes, src: bytes, ethertype: int, payload: bytes) -> bytes:
+    return dst + src + struct.pack("!H", ethertype) + payload
+
+
+def ipv4(src: str, dst: str, proto: int, payload: bytes, ident: int = 0) -> bytes:
+    header = struct.pack("!BBHHHBBH4s4s", 0x45, 0, 20 + len(payload), ident & 0xFFFF, 0, 64, proto, 0, _ip(src), _ip(dst))
+    header = header[:10] + struct.pack("!H", _checksum(header)) + header[12:]
+    return header + payload
+
+
+def tcp(sport: int, dport: int, flags: int = 0x18, payload: bytes = b"", seq: int = 0) -> bytes:
+    return struct.pack("!HHIIBBHHH", sport, dport, seq & 0xFFFFFFFF, 0, 0x50, flags, 65535, 0, 0) + payload
+
+
+def udp(sport: int, dport: int, payload: bytes) -> bytes:
+    return struct.pack("!HHHH", sport, dport, 8 + len(payload), 0) + payload
+
+
+def dns_query(qid: int, name: str) -> bytes:
+    qname = b"".join(bytes([len(label)]) + label.encode() for label in name.split(".")) + b"\x00"
+    return struct.pack("!HHHHHH", qid & 0xFFFF, 0x0100, 1, 0, 0, 0) + qname + struct.pack("!HH", 1, 1)
+
+
+def arp(op: int, hwsrc: bytes, psrc: str, hwdst: bytes, pdst: str) -> bytes:
+    return struct.pack("!HHBBH", 1, 0x0800, 6, 4, op) + hwsrc + _ip(psrc) + hwdst + _ip(pdst)
+
+
+def _ip_frame(src: str, dst: str, proto: int, l4: bytes, ident: int) -> bytes:
+    return ether(_mac(2), _mac(1), 0x0800, ipv4(src, dst, proto, l4, ident))
+
+
+def _arrivals(rng: random.Random, count: int, start: float, span: float) -> Iterator[float]:
+    if count <= 0:
+        return
+    rate = count / max(span, 1e-6)
+    t = start
+    for _ in range(count):
+        t += rng.expovariate(rate)
+        yield min(t, start + span)
+
+
+def _benign(rng: random.Random, count: int, duration: float) -> Iterator[Frame]:
+    ports = (80, 443, 22, 25, 8080, 3306)
+    for i, t in enumerate(_arrivals(rng, count, 0.0, duration)):
+        src = f"10.1.0.{rng.randint(1, 200)}"
+        dst = f"10.2.0.{rng.randint(1, 20)}"
+        payload = b"\x00" * rng.randint(0, 1200)
+        yield t, _ip_frame(src, dst, 6, tcp(rng.randint(1024, 65535), rng.choice(ports), payload=payload, seq=i), i)
+
+
+def _flood(rng: random.Random, count: int, duration: float) -> Iterator[Frame]:
+    bots = [f"198.51.100.{n}" for n in (7, 8, 9)]
+    for i, t in enumerate(_arrivals(rng, count, duration * 0.45, duration * 0.1)):
+        yield t, _ip_frame(rng.choice(bots), "10.2.0.1", 6, tcp(rng.randint(1024, 65535), 80, flags=0x02, seq=i), i)
+
+
+def _scan(rng: random.Random, count: int, duration: float) -> Iterator[Frame]:
+    for i, t in enumerate(_arrivals(rng, count, duration * 0.2, max(duration * 0.1, 1.0))):
+        yield t, _ip_frame("10.66.0.5", "10.2.0.2", 6, tcp(40000, (i % 65535) + 1, flags=0x02), i)
+
+
+def _beacon_flow(rng: random.Random, n: int, period: float, offset: float, src: str, dst: str,
+                 sport: int) -> Iterator[Frame]:
+    for k in range(n):
+        yield (offset + k * period + rng.gauss(0, period * 0.01),
+               _ip_frame(src, dst, 6, tcp(sport, 443, payload=b"\x00" * 64, seq=k), k))
+
+
+def _beaconing(rng: random.Random, count: int, duration: float) -> Iterator[Frame]:
+    if count <= 0:
+        return
+    flows = max(1, count // 600)
+    per_flow = max(1, count // flows)
+    streams = []
+    for f in range(flows):
+        n = per_flow if f < flows - 1 else count - per_flow * (flows - 1)
+        period = min(rng.uniform(2.0, 8.0), duration / max(n, 1))
+        offset = rng.uniform(0, period)
+        streams.append(_beacon_flow(rng, n, period, offset, f"10.1.0.{210 + f % 40}", f"203.0.113.{1 + f % 250}",
+                                    50000 + f))
+    yield from heapq.merge(*streams, key=lambda item: item[0])
+
+
+def _dga(rng: random.Random, count: int, duration: float) -> Iterator[Frame]:
+    alphabet = string.ascii_lowercase + string.digits
+    for i, t in enumerate(_arrivals(rng, count, 0.0, duration)):
+        label = "".join(rng.choice(alphabet) for _ in range(rng.randint(12, 20)))
+        name = f"{label}.{rng.choice(('com', 'net', 'org'))}"
+        yield t, _ip_frame("10.1.0.77", "10.2.0.53", 17, udp(rng.randint(1024, 65535), 53, dns_query(i, name)), i)
+
+
+def _arp_churn(rng: random.Random, count: int, duration: float) -> Iterator[Frame]:
+    bindings = {f"10.1.0.{n}": _mac(100 + n) for n in range(1, 31)}
+    for t in _arrivals(rng, count, 0.0, duration):
+        ip = rng.choice(list(bindings))
+        if rng.random() < 0.05:
+            bindings[ip] = _mac(rng.randint(1000, 100000))
+        hwsrc = bindings[ip]
+        pdst = ip if rng.random() < 0.3 else f"10.1.0.{rng.randint(1, 254)}"
+        yield t, ether(b"\xff" * 6, hwsrc, 0x0806, arp(2, hwsrc, ip, b"\x00" * 6, pdst))
+
+
+GENERATORS = {
+    "benign": _benign,
+    "flood": _flood,
+    "scan": _scan,
+    "beaconing": _beaconing,
+    "dga": _dga,
+    "arp": _arp_churn,
+}
+
+
+def synthetic_frames(packets: int, mix: Optional[Dict[str, float]] = None, seed: int = 1,
+                     duration_s: Optional[float] = None) -> Tuple[Iterator[Frame], Dict[str, int], float]:
+    mix = dict(mix or DEFAULT_MIX)
+    duration = float(duration_s) if duration_s else packets / DEFAULT_RATE_PPS
+
+    counts = {kind: int(packets * weight) for kind, weight in mix.items()}
+    counts[max(mix, key=mix.get)] += packets - sum(counts.values())
+
+    streams = []
+    for index, kind in enumerate(TRAFFIC_KINDS):
+        if counts.get(kind, 0) > 0:
+            rng = random.Random(seed * 1000 + index)
+            streams.append(GENERATORS[kind](rng, counts[kind], duration))
+
+    return heapq.merge(*streams, key=lambda item: item[0]), counts, duration
+
+
+def write_pcap(path: str, frames: Iterator[Frame], base_time: float = BASE_TIME) -> int:
+    written = 0
+    with open(path, "wb") as f:
+        f.write(struct.pack("<IHHiIII", 0xA1B2C3D4, 2, 4, 0, 0, 65535, LINKTYPE_ETHERNET))
+        for offset, frame in frames:
+            ts = base_time + max(offset, 0.0)
+            sec = int(ts)
+            usec = int(round((ts - sec) * 1_000_000))
+            if usec >= 1_000_000:
+                sec, usec = sec + 1, usec - 1_000_000
+            f.write(struct.pack("<IIII", sec, usec, len(frame), len(frame)))
+            f.write(frame)
+            written += 1
+    return written
+
+
+def generate_pcap(path: str, packets: int, mix: Optional[Dict[str, float]] = None, seed: int = 1,
+                  duration_s: Optional[float] = None) -> Dict[str, object]:
+    frames, counts, duration = synthetic_frames(packets, mix, seed, duration_s)
+    written = write_pcap(path, frames)
+    return {"path": path, "packets": written, "duration_s": duration, "seed": seed, "mix": counts}
@@ -4,8 +4,8 @@ from loguru import logger
 import json
 import sys
 
-from zshark.core import Analyzer, ZSharkConfig, AnalysisResult
-from zshark.reports.pdf_generator import generate_pdf_report
+# Heavy dependencies (Scapy, NumPy, ReportLab) are imported inside the
+# subcommand handlers so that argument parsing and --help stay fast.
 
 def setup_logging(verbose: bool):
     logger.remove()
@@ -13,44 +13,293 @@ def setup_logging(verbose: bool):
 
     logger.add(sys.stderr, level=level, format="<green>{time:HH:mm:ss}</green> | {level} | {message}")
 
+def build_config(models: str = None, report_features: bool = True):
+    from zshark.core.data_structures import ZSharkConfig
+    from zshark.models import enable_models
+    from zshark.core.utils import REPORT_FEATURES
+
+    config = ZSharkConfig.default()
+    config.features = sorted(REPORT_FEATURES) if report_features else []
+    if models:
+        try:
+            enable_models(config, models.split(","))
+        except ValueError as e:
+            logger.error(str(e))
+            sys.exit(1)
+    return config
+
+def expand_capture_paths(patterns):
+    import glob
+    from zshark.core.processor import order_captures
+
+    paths = []
+    for pattern in patterns:
+        if glob.has_magic(pattern) and not Path(pattern).exists():
+            matches = [match for match in glob.glob(pattern) if Path(match).is_file()]
+            if not matches:
+                logger.error(f"No capture files match: {pattern}")
+                sys.exit(1)
+            paths.extend(order_captures(matches))
+        else:
+            paths.append(pattern)
+    return [Path(path) for path in paths]
+
+def index_results(db_path, output_paths, result=None):
+    # Adds finished analysis JSON files to the detection index; an in-memory result skips re-reading it.
+    from zshark.core.index import DetectionIndex
+    with DetectionIndex(db_path) as index:
+        for output_path in output_paths:
+            if result is not None:
+                index.add_result(result, str(output_path))
+            else:
+                index.add_json(str(output_path))
+    logger.info(f"Indexed {len(output_paths)} result(s) in {db_path}")
+
 def analyze_command(args):
     setup_logging(args.verbose)
     
     try:
-        pcap_path = Path(args.pcap_path)
+        from zshark.core.data_structures import AnalysisResult
+        from zshark.core.processor import Analyzer, is_stream
+
+        pcap_paths = expand_capture_paths(args.pcap_paths)
+        pcap_path = pcap_paths[0]
+        sources = [str(path) for path in pcap_paths]
+        source = sources[0] if len(sources) == 1 else sources
         out_dir = Path(args.out_dir)
         
-        if not pcap_path.exists():
-            logger.error(f"PCAP file not found: {pcap_path}")
+        for path in pcap_paths:
+            if not path.exists():
+                logger.error(f"PCAP file not found: {path}")
+                sys.exit(1)
+
+        if args.resume and not args.checkpoint:
+            logger.error("--resume requires --checkpoint")
             sys.exit(1)
 
         out_dir.mkdir(parents=True, exist_ok=True)
         
-        config = ZSharkConfig.default()
+        config = build_config(args.models, not args.skip_report_stats)
         config.analysis_profile = args.profile
         config.output_dir = str(out_dir)
         config.parallel_workers = args.parallel
+        config.reorder_window_s = args.reorder_window
+        config.fusion_expiry_s = args.fusion_expiry
+        config.talkers_capacity = args.talkers_capacity
+        config.window_top_talkers = args.window_top_talkers
+        config.packet_filter = args.filter
+        config.sampling_mode = args.sample
+        config.sampling_rate = args.sample_rate
+        config.sampling_seed = args.sample_seed
+        config.baseline_path = args.baseline
+        config.max_memory_bytes = args.max_memory
+        if args.cascade_every is not None:
+            config.cascade_every = args.cascade_every
+        if args.cascade_hold is not None:
+            config.cascade_hold_s = args.cascade_hold
         
-        logger.info(f"Starting analysis of {pcap_path.name} with profile '{args.profile}'...")
+        output_path = out_dir / f"{pcap_path.stem}_analysis.json"
+        cache = None
+        stateful = args.checkpoint or args.state_in or args.state_out
+        streaming = any(is_stream(path) for path in sources)
+        if not (args.no_cache or args.profile_out or args.metrics_port is not None or stateful or streaming):
+            from zshark.core.cache import ResultCache
+            cache = ResultCache(args.cache_dir, args.cache_max_mb * 1024 * 1024, args.cache_hash)
+            cache_key = cache.analysis_key(source, config, merge=args.merge)
+            cached = cache.lookup(cache_key)
+            if cached is not None:
+                import shutil
+                with open(cached) as f:
+                    data = json.load(f)
+                source_files = sources if len(sources) > 1 else []
+                if data.get("pcap_path") != str(pcap_path) or data.get("source_files", []) != source_files:
+                    data["pcap_path"] = str(pcap_path)
+                    data["source_files"] = source_files
+                    with open(output_path, "w") as f:
+                        json.dump(data, f, indent=4)
+                else:
+                    shutil.copyfile(cached, output_path)
+                logger.success(f"Cached analysis reused ({cached.name}). Results saved to {output_path}")
+                if args.index:
+                    index_results(args.index, [output_path])
+                print(f"Total Detections: {len(data.get('detections', []))}")
+                return
+
+        if len(pcap_paths) > 1:
+            logger.info(f"Starting analysis of {len(pcap_paths)} files as one {'merged' if args.merge else 'sequential'} stream ({pcap_path.name} ... "
+                        f"{pcap_paths[-1].name}) with profile '{args.profile}'...")
+        else:
+            logger.info(f"Starting analysis of {pcap_path.name} with profile '{args.profile}'...")
         
-        analyzer = Analyzer(config)
-        result: AnalysisResult = analyzer.analyze_pcap(str(pcap_path))
+        registry = None
+        if args.metrics_port is not None:
+            from zshark.core.metrics import MetricsRegistry, start_metrics_server
+            registry = MetricsRegistry()
+            metrics_server = start_metrics_server(registry, args.metrics_host, args.metrics_port)
+            logger.info(f"Serving pipeline metrics on http://{args.metrics_host}:{metrics_server.server_address[1]}/metrics")
+
+        analyzer = Analyzer(config, metrics=registry)
+        if args.state_in:
+            from zshark.core.checkpoint import load_model_state
+            restored = analyzer.restore_models(load_model_state(args.state_in))
+            logger.info(f"Restored state for {restored} model(s) from {args.state_in}")
+
+        run_kwargs = {"checkpoint_path": args.checkpoint, "checkpoint_interval_s": args.checkpoint_interval,
+                      "resume": args.resume, "merge": args.merge}
+        if args.profile_out:
+            import cProfile
+            profiler = cProfile.Profile()
+            result: AnalysisResult = profiler.runcall(analyzer.analyze_pcap, source, **run_kwargs)
+            profiler.dump_stats(args.profile_out)
+            logger.info(f"cProfile statistics written to {args.profile_out}")
+        else:
+            result: AnalysisResult = analyzer.analyze_pcap(source, **run_kwargs)
+
+        if args.state_out:
+            from zshark.core.checkpoint import save_model_state
+            save_model_state(args.state_out, analyzer.snapshot_models())
+            logger.info(f"Model state saved to {args.state_out}")
+
+        for engine_name, stats in result.analysis_stats.get("models", {}).items():
+            logger.debug(f"{engine_name}: {stats['cpu_s']:.3f}s CPU over {stats['windows']} windows, "
+                         f"{stats['detections']} detections, state {stats['state_size']}")
         
-        output_path = out_dir / f"{pcap_path.stem}_analysis.json"
         with open(output_path, "w") as f:
             f.write(result.model_dump_json(indent=4))
+        if cache is not None:
+            cache.store(cache_key, str(output_path))
+        if args.index:
+            index_results(args.index, [output_path], result)
             
         logger.success(f"Analysis complete. Results saved to {output_path}")
         print(f"Total Detections: {len(result.detections)}")
+        if result.prefilter:
+            print(f"Packet Filter: {result.prefilter['expression']} "
+                  f"({result.prefilter['packets_matched']} of {result.prefilter['packets_seen']} packets dissected)")
+        if result.sampling:
+            print(f"Sampling: {result.sampling['mode']} 1-in-{result.sampling['rate']}, "
+                  f"{result.sampling['packets_sampled']} of {result.sampling['packets_seen']} packets analyzed")
+        if result.cascade:
+            print(f"Cascade: expensive models ran on {result.cascade['full_windows']} full and "
+                  f"{result.cascade['focused_windows']} host-focused window(s), skipped "
+                  f"{result.cascade['skipped_windows']}; {result.cascade['packets_withheld']} packets withheld")
+        memory = result.analysis_stats.get("memory")
+        if memory and memory["enforcements"]:
+            print(f"Memory budget: evicted {sum(memory['evicted_entries'].values()):,} idle entries in "
+                  f"{memory['enforcements']} pass(es); peak estimate {memory['peak_bytes'] / 2**20:.1f} MiB")
+        correlated = [incident for incident in result.incidents if len(incident.engines) > 1]
+        if correlated:
+            print(f"Correlated Incidents: {len(correlated)} host(s) flagged by more than one engine")
         
     except Exception as e:
         logger.error(f"An error occurred during analysis: {e}")
         sys.exit(1)
 
+def analyze_dir_command(args):
+    setup_logging(args.verbose)
+
+    import json
+    from zshark.core.batch import find_pcaps, analyze_files
+
+    directory = Path(args.directory)
+    if not directory.is_dir():
+        logger.error(f"Directory not found: {directory}")
+        sys.exit(1)
+
+    pcaps = find_pcaps(str(directory), args.pattern, args.recursive)
+    if not pcaps:
+        logger.error(f"No capture files found in {directory}")
+        sys.exit(1)
+
+    config = build_config(args.models, not args.skip_report_stats)
+    config.analysis_profile = args.profile
+    config.output_dir = args.out_dir
+    config.baseline_path = args.baseline
+    config.max_memory_bytes = args.max_memory
+
+    def progress(done, total, summary):
+        name = Path(summary["pcap_path"]).name
+        if "error" in summary:
+            logger.error(f"[{done}/{total}] {name} failed: {summary['error']}")
+        else:
+            logger.info(f"[{done}/{total}] {name}: {summary['total_packets']:,} packets, "
+                        f"{summary['detections']} detection(s) in {summary['wall_s']:.1f}s")
+
+    logger.info(f"Analyzing {len(pcaps)} capture file(s) from {directory} with {args.workers or 'all'} worker(s)...")
+    try:
+        merged = analyze_files(pcaps, config, args.out_dir, args.workers, directory, progress)
+    except KeyboardInterrupt:
+        logger.warning("Batch analysis interrupted.")
+        sys.exit(130)
+
+    if args.index:
+        index_results(args.index, [s["output_path"] for s in merged["results"] if s.get("output_path")])
+
+    summary_path = Path(args.out_dir) / "batch_summary.json"
+    with open(summary_path, "w") as f:
+        json.dump(merged, f, indent=4)
+
+    logger.success(f"Analyzed {merged['succeeded']}/{merged['files']} file(s) in {merged['wall_s']:.1f}s. "
+                   f"Summary saved to {summary_path}")
+    print(f"Total Detections: {merged['detections']}")
+    if merged["failed"]:
+        sys.exit(1)
+
+def train_command(args):
+    setup_logging(args.verbose)
+
+    from zshark.core.batch import find_pcaps
+    from zshark.core.baseline import BaselineError, train_baseline, save_baseline
+
+    pcaps = []
+    for corpus in args.corpus:
+        path = Path(corpus)
+        if path.is_dir():
+            pcaps.extend(find_pcaps(str(path), args.pattern, args.recursive))
+        elif path.is_file():
+            pcaps.append(path)
+        else:
+            logger.error(f"Corpus path not found: {path}")
+            sys.exit(1)
+    if not pcaps:
+        logger.error("No capture files found in the corpus")
+        sys.exit(1)
+
+    config = build_config(None, False)
+    if args.window_size:
+        for model_config in config.models.values():
+            model_config.window_size_s = args.window_size
+
+    def progress(done, total, summary):
+        name = Path(summary["pcap_path"]).name
+        if "error" in summary:
+            logger.error(f"[{done}/{total}] {name} failed: {summary['error']}")
+        else:
+            logger.info(f"[{done}/{total}] {name}: {summary['packets']:,} packets in {summary['windows']} windows")
+
+    logger.info(f"Training a baseline from {len(pcaps)} known-good capture(s) with {args.workers or 'all'} worker(s)...")
+    try:
+        profile = train_baseline(pcaps, config, args.workers, progress)
+        save_baseline(args.output, profile)
+    except KeyboardInterrupt:
+        logger.warning("Training interrupted.")
+        sys.exit(130)
+    except (BaselineError, OSError) as e:
+        logger.error(f"An error occurred during training: {e}")
+        sys.exit(1)
+
+    logger.success(f"Baseline profile saved to {args.output} ({profile['windows']:,} windows, "
+                   f"{profile['packets']:,} packets, {len(profile['buckets'])} hour bucket(s)) in {profile['wall_s']:.1f}s")
+    print(f"Known IP-MAC bindings: {len(profile['ip_mac'])}  Benign domains: {len(profile['domains'])}")
+    if profile["failed"]:
+        sys.exit(1)
+
 def report_command(args):
     setup_logging(args.verbose)
     
     try:
+        from zshark.reports.pdf_generator import generate_pdf_report
+
         analysis_json_path = Path(args.analysis_json_path)
         pdf_path = Path(args.pdf_path)
         
@@ -58,15 +307,291 @@ def report_command(args):
             logger.error(f"Analysis JSON file not found: {analysis_json_path}")
             sys.exit(1)
 
+        cache = None
+        if not args.no_cache:
+            import shutil
+            from zshark.core.cache import ResultCache
+            cache = ResultCache(args.cache_dir, args.cache_max_mb * 1024 * 1024)
+            # The report names the capture after the JSON file, so identical results saved under
+            # different names get different PDFs.
+            layout = (f"{args.template}:{args.max_rows}:{args.max_appendix_rows}:{args.group_by}:{args.chart_points}:"
+                      f"{analysis_json_path.stem}")
+            cache_key = cache.report_key(str(analysis_json_path), layout)
+            cached = cache.lookup(cache_key, ".pdf")
+            if cached is not None:
+                shutil.copyfile(cached, pdf_path)
+                logger.success(f"Cached report reused ({cached.name}). Saved to {pdf_path}")
+                return
+
         logger.info(f"Generating PDF report from {analysis_json_path.name}...")
         
-        generate_pdf_report(str(analysis_json_path), str(pdf_path))
+        generate_pdf_report(str(analysis_json_path), str(pdf_path), max_detail_rows=args.max_rows,
+                            group_by=args.group_by, max_chart_points=args.chart_points,
+                            max_appendix_rows=args.max_appendix_rows)
+        if cache is not None:
+            cache.store(cache_key, str(pdf_path), ".pdf")
         logger.success(f"PDF report successfully generated and saved to {pdf_path}")
     except Exception as e:
         logger.error(f"An error occurred during report generation: {e}")
         sys.exit(1)
 
+def bench_command(args):
+    setup_logging(args.verbose)
+
+    try:
+        import tempfile
+        from zshark.bench.runner import run_benchmark, run_report_benchmark, compare_results
+        from zshark.bench.synthetic import generate_pcap, parse_mix, DEFAULT_MIX
+
+        config = build_config(args.models, not args.no_report)
+        if args.window_size:
+            for model_config in config.models.values():
+                model_config.window_size_s = args.window_size
+
+        if args.report_json:
+            if not Path(args.report_json).exists():
+                logger.error(f"Analysis JSON file not found: {args.report_json}")
+                sys.exit(1)
+            logger.info(f"Benchmarking report generation for {args.report_json} x{args.report_scale} ({args.repeat} run(s))...")
+            results = run_report_benchmark(args.report_json, args.report_scale, args.repeat, args.verbose)
+        else:
+            with tempfile.TemporaryDirectory() as tmp:
+                generated = None
+                if args.pcap:
+                    pcap_path = args.pcap
+                    if not Path(pcap_path).exists():
+                        logger.error(f"PCAP file not found: {pcap_path}")
+                        sys.exit(1)
+                else:
+                    mix = parse_mix(args.mix) if args.mix else DEFAULT_MIX
+                    pcap_path = args.pcap_out or str(Path(tmp) / "zshark_bench.pcap")
+                    logger.info(f"Generating {args.packets:,} synthetic packets (seed={args.seed})...")
+                    generated = generate_pcap(pcap_path, args.packets, mix, args.seed, args.duration)
+
+                logger.info(f"Benchmarking {pcap_path} ({args.repeat} run(s))...")
+                results = run_benchmark(pcap_path, config, repeat=args.repeat, with_report=not args.no_report,
+                                        generated=generated, verbose=args.verbose)
+
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+        median = results["median"]
+        if args.report_json:
+            first = results["runs"][0]
+            print(f"Report: {median['report_s']:.3f}s for {first['detections']:,} detections and "
+                  f"{first['windows']:,} windows  Peak RSS: {median['peak_rss_kb'] / 1024:.1f} MiB")
+        else:
+            print(f"Packets/sec: {median['pps']:,.0f}  Analysis: {median['analysis_s']:.3f}s  "
+                  f"Per window: {median['window_us']:.1f} us  Peak RSS: {median['peak_rss_kb'] / 1024:.1f} MiB  Startup: {results['startup_s'] * 1000:.0f} ms")
+            for stage, seconds in sorted(median["stages"].items(), key=lambda item: item[1], reverse=True):
+                print(f"  {stage:<28} {seconds:.4f}s")
+
+        if args.compare:
+            with open(args.compare) as f:
+                previous = json.load(f)
+            print(f"Comparison against {args.compare}:")
+            for line in compare_results(previous, results):
+                print(f"  {line}")
+
+        logger.success(f"Benchmark results saved to {args.output}")
+    except (ValueError, OSError) as e:
+        logger.error(f"An error occurred during benchmarking: {e}")
+        sys.exit(1)
+
+def listen_command(args):
+    setup_logging(args.verbose)
+
+    try:
+        import signal
+        from datetime import datetime
+        from zshark.core.ingest import SocketIngest
+        from zshark.core.processor import Analyzer
+
+        out_dir = Path(args.out_dir)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        config = build_config(args.models, not args.skip_report_stats)
+        config.analysis_profile = args.profile
+        config.output_dir = str(out_dir)
+        config.reorder_window_s = args.reorder_window
+        config.fusion_expiry_s = args.fusion_expiry
+        config.packet_filter = args.filter
+        config.baseline_path = args.baseline
+        config.max_memory_bytes = args.max_memory
+
+        registry = None
+        if args.metrics_port is not None:
+            from zshark.core.metrics import MetricsRegistry, start_metrics_server
+            registry = MetricsRegistry()
+            metrics_server = start_metrics_server(registry, args.metrics_host, args.metrics_port)
+            logger.info(f"Serving pipeline metrics on http://{args.metrics_host}:{metrics_server.server_address[1]}/metrics")
+
+        analyzer = Analyzer(config, metrics=registry)
+        ingest = SocketIngest(args.address, args.queue, args.overload, args.overload_rate,
+                              until_idle=args.until_idle, max_seconds=args.duration)
+        address = ingest.start()
+        # Ctrl-C or SIGTERM ends the run cleanly: queued packets are analyzed and results written.
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *_: ingest.stop())
+        logger.info(f"Send captures with e.g. 'tcpdump -w - | nc ...' or 'zshark replay capture.pcap {address}'")
+        result = analyzer.analyze_pcap(address, ingest=ingest)
+
+        output_path = out_dir / f"listen_{datetime.now():%Y%m%d_%H%M%S}_analysis.json"
+        with open(output_path, "w") as f:
+            f.write(result.model_dump_json(indent=4))
+        if args.index:
+            index_results(args.index, [output_path], result)
+        stats = result.analysis_stats.get("ingest", ingest.as_dict())
+        logger.success(f"Analysis complete. Results saved to {output_path}")
+        print(f"Total Detections: {len(result.detections)}")
+        print(f"Sensors: {len(stats['sensors'])}, {stats['packets']:,} packets queued, "
+              f"{stats['dropped_packets']:,} dropped under overload, peak queue {stats['peak_queue']}/{stats['queue_batches']} batches")
+    except (ValueError, OSError) as e:
+        logger.error(f"An error occurred while listening: {e}")
+        sys.exit(1)
+
+def index_command(args):
+    setup_logging(args.verbose)
+
+    from zshark.core.index import DetectionIndex, DetectionIndexError, index_paths
+
+    paths = index_paths(args.results)
+    if not paths:
+        logger.error("No analysis results found")
+        sys.exit(1)
+    failed = 0
+    try:
+        with DetectionIndex(args.db) as index:
+            for path in paths:
+                try:
+                    count = index.add_json(str(path))
+                    logger.debug(f"{path}: {count} detection(s)")
+                except (OSError, ValueError, KeyError, DetectionIndexError) as e:
+                    failed += 1
+                    logger.error(f"Cannot index {path}: {e}")
+            stats = index.stats()
+    except DetectionIndexError as e:
+        logger.error(str(e))
+        sys.exit(1)
+    logger.success(f"Indexed {len(paths) - failed}/{len(paths)} result(s) into {args.db}")
+    print(f"Index: {stats['analyses']} analyses, {stats['detections']:,} detections, "
+          f"{stats['windows']:,} windows ({stats['size_bytes'] / 2**20:.1f} MiB)")
+    if failed:
+        sys.exit(1)
+
+def query_command(args):
+    setup_logging(args.verbose)
+
+    import json
+    from zshark.core.index import DetectionIndex, DetectionIndexError, parse_time
+
+    if not Path(args.db).exists():
+        logger.error(f"Index not found: {args.db} (build it with 'zshark index' or --index)")
+        sys.exit(1)
+    try:
+        since = parse_time(args.since) if args.since else None
+        until = parse_time(args.until) if args.until else None
+        with DetectionIndex(args.db) as index:
+            if args.windows:
+                rows = index.windows(since, until, args.limit)
+            else:
+                rows = index.query(args.entity, args.label, args.engine, since, until, args.min_severity, args.limit)
+    except (ValueError, DetectionIndexError) as e:
+        logger.error(str(e))
+        sys.exit(1)
+
+    if args.json:
+        print(json.dumps(rows, indent=4))
+        return
+    if args.windows:
+        for row in rows:
+            print(f"{row['start_time']}  {row['packet_count']:>9,} pkts  {row['pps']:>10.1f} pps  "
+                  f"{Path(row['pcap_path'] or '-').name}")
+    else:
+        for row in rows:
+            print(f"{row['timestamp']}  {row['severity']:.2f}  {row['engine_name']:<24} {row['label']:<28} "
+                  f"{', '.join(row['entities']) or '-'}  ({Path(row['pcap_path'] or '-').name})")
+    print(f"{len(rows)} {'window' if args.windows else 'detection'}(s)"
+          + (f" (limited to {args.limit})" if len(rows) == args.limit else ""))
+
+def replay_command(args):
+    setup_logging(args.verbose)
+    # The summary goes to stderr when the capture itself is written to stdout.
+    out = sys.stderr if args.target == "-" else sys.stdout
+
+    try:
+        import os
+        from zshark.bench.replay import open_sink, replay
+
+        if not Path(args.pcap_path).exists():
+            logger.error(f"PCAP file not found: {args.pcap_path}")
+            sys.exit(1)
+        speed = None if args.max_rate or args.pps else args.speed
+        if args.mkfifo or Path(args.target).is_fifo():
+            logger.info(f"Waiting for a reader on {args.target} (e.g. zshark analyze {args.target})...")
+        sink, created = open_sink(args.target, args.mkfifo)
+
+        def progress(stats):
+            logger.info(f"{stats.packets:,} packets sent, {stats.packets / stats.elapsed_s:,.0f} pps, "
+                        f"{stats.late_packets:,} late, max lag {stats.max_lag_s * 1000:.1f} ms")
+
+        pace = "as fast as possible" if speed is None and not args.pps else \
+            f"at {args.pps:,.0f} pps" if args.pps else f"at {speed:g}x original timing"
+        logger.info(f"Replaying {args.pcap_path} into {sink.name} {pace}"
+                    f"{f' ({args.loop} times)' if args.loop > 1 else ''}...")
+        try:
+            stats = replay(args.pcap_path, sink, speed, args.pps, args.loop, args.retime,
+                           args.progress_interval, progress)
+        finally:
+            sink.close()
+            if created:
+                os.unlink(created)
+
+        summary = stats.as_dict()
+        if stats.stopped:
+            logger.warning(f"Replay stopped early: {stats.stopped}")
+        if args.stats_out:
+            with open(args.stats_out, "w") as f:
+                json.dump(summary, f, indent=2)
+        print(f"Sent {summary['packets']:,} packets ({summary['bytes'] / 1e6:.1f} MB) in {summary['elapsed_s']:.3f}s: "
+              f"{summary['pps']:,.0f} pps, {summary['mbps']:.1f} Mbit/s"
+              + (f", {summary['achieved_speed']:.2f}x capture time" if summary["achieved_speed"] else ""), file=out)
+        if speed is not None or args.pps:
+            print(f"Pacing: {summary['late_packets']:,} packet(s) more than 1 ms late, mean lag "
+                  f"{summary['mean_lag_ms']:.3f} ms, max {summary['max_lag_ms']:.1f} ms", file=out)
+        if summary["dropped"]:
+            print(f"Dropped: {summary['dropped']:,} packet(s) the target could not take", file=out)
+    except (ValueError, OSError) as e:
+        logger.error(f"An error occurred during replay: {e}")
+        sys.exit(1)
+
+def serve_command(args):
+    setup_logging(args.verbose)
+
+    import asyncio
+    from zshark.service.server import AnalysisService
+
+    config = build_config(args.models)
+    service = AnalysisService(
+        config,
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        output_dir=args.out_dir,
+        max_upload_bytes=args.max_upload_mb * 1024 * 1024,
+        path_root=args.path_root,
+        keep_uploads=args.keep_uploads,
+    )
+    try:
+        asyncio.run(service.serve_forever())
+    except KeyboardInterrupt:
+        logger.info("Z-Shark service stopped.")
+    except OSError as e:
+        logger.error(f"Could not start the Z-Shark service: {e}")
+        sys.exit(1)
+
 def main():
+    from zshark.core.memory import parse_size
+
     parser = argparse.ArgumentParser(
         prog="zshark",
         description="Z-Shark: The World-Class Packet Analysis Platform.",
@@ -76,24 +601,164 @@ def main():
     subparsers = parser.add_subparsers(dest="command", required=True, help="Available commands")
 
     analyze_parser = subparsers.add_parser("analyze", help="Analyzes a PCAP file using mathematical models.")
-    analyze_parser.add_argument("pcap_path", type=str, help="Path to the PCAP file to analyze.")
+    analyze_parser.add_argument("pcap_paths", nargs="+", metavar="pcap_path", help="PCAP file(s) or glob(s) to analyze; several files (e.g. tcpdump -C/-G rotations) are analyzed as one continuous stream, glob matches ordered by first packet time.")
     analyze_parser.add_argument("-o", "--out-dir", type=str, default="results", help="Output directory for analysis results (default: results).")
-    analyze_parser.add_argument("-p", "--profile", type=str, default="default", help="Analysis profile to use (default: default).")
-    analyze_parser.add_argument("--parallel", type=int, default=1, help="Number of parallel workers (default: 1).")
+    analyze_parser.add_argument("--merge", action="store_true", help="Merge several captures (e.g. multiple taps) by timestamp instead of reading them one after another.")
+    analyze_parser.add_argument("--reorder-window", type=float, default=0.0, help="Seconds of reordering buffer for slightly out-of-order packets (default: 0, disabled).")
+    analyze_parser.add_argument("--fusion-expiry", type=float, default=0.0, help="Close fused detections and per-host incidents after this many seconds without activity (default: 0, one per key for the whole capture).")
+    analyze_parser.add_argument("--talkers-capacity", type=int, default=1000, help="Keys tracked per top-talker table; memory stays fixed and counts are overestimated by at most packets/capacity (default: 1000).")
+    analyze_parser.add_argument("--window-top-talkers", type=int, default=0, help="Also store the exact top N source IPs and destination ports of every window (default: 0, disabled).")
+    analyze_parser.add_argument("--filter", type=str, default="auto", help="Only dissect packets matching this header filter, e.g. 'udp and port 53 or arp' (BPF subset: ip, ip6, arp, tcp, udp, icmp, proto, host, net, port, portrange). 'auto' derives it from the enabled models when no window feature needs all traffic; 'none' disables it (default: auto).")
+    analyze_parser.add_argument("--sample", choices=["none", "systematic", "random", "flow"], default="none", help="Analyze only a sample of the packets: every Nth, random 1-in-N, or 1-in-N conversations kept whole (default: none).")
+    analyze_parser.add_argument("--sample-rate", type=int, default=1, help="Keep 1 in N packets (or conversations) when sampling; rates are scaled back up by N (default: 1).")
+    analyze_parser.add_argument("--sample-seed", type=int, default=0, help="Seed for random and flow sampling (default: 0).")
+    analyze_parser.add_argument("-p", "--profile", choices=["default", "triage"], default="default", help="Analysis profile: default runs every model on every window; triage runs DNS, ARP and beaconing analysis only on every 30th window and on hosts flagged by the volume and port-scan models (default: default).")
+    analyze_parser.add_argument("--cascade-every", type=int, default=None, help="Run expensive models on every Nth window in full and otherwise only on flagged hosts; 0 runs every model on every window (default: set by the profile).")
+    analyze_parser.add_argument("--cascade-hold", type=float, default=None, help="Seconds a host flagged by a cheap model stays under expensive analysis (default: set by the profile).")
+    analyze_parser.add_argument("--baseline", type=str, default=None, help="Baseline profile from 'zshark train'; models start from it instead of the capture's own average.")
+    analyze_parser.add_argument("--max-memory", type=parse_size, default=0, help="Cap the estimated detector state, e.g. 512M or 2G; least recently active hosts and flows are evicted across all models when it is exceeded (default: unlimited).")
+    analyze_parser.add_argument("--parallel", type=int, default=1, help="Dissect packets in this many parser processes, fed by a reader process through shared memory; the models still run in order in this process (default: 1, in-process).")
+    analyze_parser.add_argument("-m", "--models", type=str, default=None, help="Comma-separated list of models to enable (default: all).")
+    analyze_parser.add_argument("--skip-report-stats", action="store_true", help="Only compute the window features the enabled models need (omits top talkers).")
+    analyze_parser.add_argument("--profile-out", type=str, default=None, help="Run under cProfile and write the statistics to this file.")
+    analyze_parser.add_argument("--metrics-port", type=int, default=None, help="Expose Prometheus metrics for the running analysis on this port.")
+    analyze_parser.add_argument("--metrics-host", type=str, default="127.0.0.1", help="Address for the metrics endpoint (default: 127.0.0.1).")
+    analyze_parser.add_argument("--checkpoint", type=str, default=None, help="Periodically save reader offset and model state to this file (removed on success).")
+    analyze_parser.add_argument("--checkpoint-interval", type=float, default=60.0, help="Seconds between checkpoints (default: 60).")
+    analyze_parser.add_argument("--resume", action="store_true", help="Continue from the --checkpoint file if it exists.")
+    analyze_parser.add_argument("--state-in", type=str, default=None, help="Load model state saved by --state-out from a previous run.")
+    analyze_parser.add_argument("--state-out", type=str, default=None, help="Save model state after the analysis so the next capture can continue from it.")
+    analyze_parser.add_argument("--index", type=str, default=None, help="Also add the results to this SQLite detection index for 'zshark query'.")
+    analyze_parser.add_argument("--no-cache", action="store_true", help="Always re-run the analysis instead of reusing a cached result.")
+    analyze_parser.add_argument("--cache-dir", type=str, default=None, help="Result cache directory (default: $ZSHARK_CACHE_DIR or ~/.cache/zshark).")
+    analyze_parser.add_argument("--cache-hash", choices=["sampled", "full"], default="sampled", help="How to fingerprint the PCAP: size plus sampled blocks, or a full SHA-256 (default: sampled).")
+    analyze_parser.add_argument("--cache-max-mb", type=int, default=1024, help="Maximum cache size before least-recently-used entries are evicted (default: 1024).")
     analyze_parser.add_argument("-v", "--verbose", action="store_true", help="Enable verbose logging.")
     analyze_parser.set_defaults(func=analyze_command)
 
+    analyze_dir_parser = subparsers.add_parser("analyze-dir", help="Analyzes every capture file in a directory with a process pool.")
+    analyze_dir_parser.add_argument("directory", type=str, help="Directory containing the PCAP files.")
+    analyze_dir_parser.add_argument("-o", "--out-dir", type=str, default="results", help="Output directory for per-file results and batch_summary.json (default: results).")
+    analyze_dir_parser.add_argument("-w", "--workers", type=int, default=0, help="Number of worker processes (default: one per CPU).")
+    analyze_dir_parser.add_argument("--pattern", action="append", default=None, help="Glob for capture files; repeatable (default: *.pcap, *.pcapng, *.cap, rotated *.pcapN).")
+    analyze_dir_parser.add_argument("-r", "--recursive", action="store_true", help="Search sub-directories too.")
+    analyze_dir_parser.add_argument("-p", "--profile", choices=["default", "triage"], default="default", help="Analysis profile; triage defers expensive models to flagged hosts (default: default).")
+    analyze_dir_parser.add_argument("--baseline", type=str, default=None, help="Baseline profile from 'zshark train' used for every capture.")
+    analyze_dir_parser.add_argument("--max-memory", type=parse_size, default=0, help="Detector state budget per worker, e.g. 512M (default: unlimited).")
+    analyze_dir_parser.add_argument("--index", type=str, default=None, help="Also add the results to this SQLite detection index for 'zshark query'.")
+    analyze_dir_parser.add_argument("-m", "--models", type=str, default=None, help="Comma-separated list of models to enable (default: all).")
+    analyze_dir_parser.add_argument("--skip-report-stats", action="store_true", help="Only compute the window features the enabled models need (omits top talkers).")
+    analyze_dir_parser.add_argument("-v", "--verbose", action="store_true", help="Enable verbose logging.")
+    analyze_dir_parser.set_defaults(func=analyze_dir_command)
+
     report_parser = subparsers.add_parser("report", help="Generates a PDF report from a saved analysis result.")
     report_parser.add_argument("analysis_json_path", type=str, help="Path to the analysis JSON file.")
     report_parser.add_argument("-o", "--pdf-path", type=str, default="report.pdf", help="Output path for the generated PDF report (default: report.pdf).")
     report_parser.add_argument("-t", "--template", type=str, default="forensic", help="Report template to use (default: forensic).")
+    report_parser.add_argument("--max-rows", type=int, default=500, help="Detections shown in the findings section; the rest go to an appendix (default: 500).")
+    report_parser.add_argument("--max-appendix-rows", type=int, default=1000, help="Most severe of the remaining detections listed in the appendix; the rest are only counted (default: 1000).")
+    report_parser.add_argument("--group-by", type=str, choices=["label", "entity", "none"], default="label", help="How to group detection tables (default: label).")
+    report_parser.add_argument("--chart-points", type=int, default=300, help="Maximum points per rate chart after LTTB downsampling (default: 300).")
+    report_parser.add_argument("--no-cache", action="store_true", help="Always regenerate the PDF instead of reusing a cached report.")
+    report_parser.add_argument("--cache-dir", type=str, default=None, help="Result cache directory (default: $ZSHARK_CACHE_DIR or ~/.cache/zshark).")
+    report_parser.add_argument("--cache-max-mb", type=int, default=1024, help="Maximum cache size before least-recently-used entries are evicted (default: 1024).")
     report_parser.add_argument("-v", "--verbose", action="store_true", help="Enable verbose logging.")
     report_parser.set_defaults(func=report_command)
 
+    bench_parser = subparsers.add_parser("bench", help="Benchmarks the analysis pipeline on synthetic or existing captures.")
+    bench_parser.add_argument("--pcap", type=str, default=None, help="Benchmark an existing PCAP instead of generating one.")
+    bench_parser.add_argument("-n", "--packets", type=int, default=50000, help="Number of synthetic packets to generate (default: 50000).")
+    bench_parser.add_argument("--mix", type=str, default=None, help="Traffic mix, e.g. 'benign=0.5,flood=0.2,scan=0.1,beaconing=0.1,dga=0.05,arp=0.05'.")
+    bench_parser.add_argument("--duration", type=float, default=None, help="Capture duration in seconds for synthetic traffic (default: packets / 200).")
+    bench_parser.add_argument("--seed", type=int, default=1, help="Random seed for synthetic traffic (default: 1).")
+    bench_parser.add_argument("--pcap-out", type=str, default=None, help="Keep the generated PCAP at this path.")
+    bench_parser.add_argument("-m", "--models", type=str, default=None, help="Comma-separated list of models to enable (default: all).")
+    bench_parser.add_argument("--window-size", type=int, default=None, help="Window size in seconds for every model; small windows measure per-window overhead (default: model config).")
+    bench_parser.add_argument("-r", "--repeat", type=int, default=1, help="Number of measured runs; medians are reported (default: 1).")
+    bench_parser.add_argument("--report-json", type=str, default=None, help="Benchmark only PDF report generation for this analysis JSON (e.g. results/botnet-capture-20110810-neris_analysis.json).")
+    bench_parser.add_argument("--report-scale", type=int, default=1, help="Repeat the analysis JSON's windows and detections this many times back to back (default: 1).")
+    bench_parser.add_argument("--no-report", action="store_true", help="Skip the PDF report stage.")
+    bench_parser.add_argument("-o", "--output", type=str, default="bench_results.json", help="Path of the machine-readable results file (default: bench_results.json).")
+    bench_parser.add_argument("--compare", type=str, default=None, help="Previous results file to compare against.")
+    bench_parser.add_argument("-v", "--verbose", action="store_true", help="Enable verbose logging.")
+    bench_parser.set_defaults(func=bench_command)
+
     subparsers.add_parser("summary", help="Provides a quick statistical summary of a PCAP file (Placeholder).")
-    subparsers.add_parser("serve", help="Starts the Z-Shark web service (Placeholder).")
-    subparsers.add_parser("train", help="Trains optional AI/ML models (Placeholder).")
-    subparsers.add_parser("replay", help="Replays a PCAP file to a network interface (Placeholder).")
+    serve_parser = subparsers.add_parser("serve", help="Starts a local HTTP analysis service backed by a warm worker pool.")
+    serve_parser.add_argument("--host", type=str, default="127.0.0.1", help="Address to bind (default: 127.0.0.1).")
+    serve_parser.add_argument("--port", type=int, default=8080, help="Port to listen on (default: 8080).")
+    serve_parser.add_argument("-w", "--workers", type=int, default=2, help="Number of pre-started analysis worker processes (default: 2).")
+    serve_parser.add_argument("-o", "--out-dir", type=str, default="results/service", help="Directory for job results and uploads (default: results/service).")
+    serve_parser.add_argument("-m", "--models", type=str, default=None, help="Comma-separated list of models to enable by default (default: all).")
+    serve_parser.add_argument("--max-upload-mb", type=int, default=512, help="Maximum accepted upload size in MiB (default: 512).")
+    serve_parser.add_argument("--path-root", type=str, default=None, help="Only accept submitted file paths under this directory.")
+    serve_parser.add_argument("--keep-uploads", action="store_true", help="Keep uploaded PCAPs after their job finishes.")
+    serve_parser.add_argument("-v", "--verbose", action="store_true", help="Enable verbose logging.")
+    serve_parser.set_defaults(func=serve_command)
+    train_parser = subparsers.add_parser("train", help="Builds a baseline profile from a corpus of known-good captures.")
+    train_parser.add_argument("corpus", nargs="+", help="Known-good capture files and/or directories of captures.")
+    train_parser.add_argument("-o", "--output", type=str, default="baseline.json", help="Path of the baseline profile; a .gz suffix compresses it (default: baseline.json).")
+    train_parser.add_argument("-w", "--workers", type=int, default=0, help="Number of worker processes (default: one per CPU).")
+    train_parser.add_argument("--pattern", action="append", default=None, help="Glob for capture files inside directories; repeatable (default: *.pcap, *.pcapng, *.cap, rotated *.pcapN).")
+    train_parser.add_argument("-r", "--recursive", action="store_true", help="Search sub-directories too.")
+    train_parser.add_argument("--window-size", type=int, default=None, help="Window size in seconds; use the one you analyze with (default: model config).")
+    train_parser.add_argument("-v", "--verbose", action="store_true", help="Enable verbose logging.")
+    train_parser.set_defaults(func=train_command)
+    listen_parser = subparsers.add_parser("listen", help="Analyzes live pcap streams from one or more sensors on a TCP or Unix socket.")
+    listen_parser.add_argument("address", type=str, help="Socket to listen on: tcp://HOST:PORT or unix:///PATH.")
+    listen_parser.add_argument("-o", "--out-dir", type=str, default="results", help="Output directory for the analysis result (default: results).")
+    listen_parser.add_argument("--queue", type=int, default=256, help="Batches of packets (one socket read each) buffered between the sensors and the analysis (default: 256).")
+    listen_parser.add_argument("--overload", choices=["block", "sample"], default="block", help="When the queue is full: stop reading so TCP pushes back on the sensors, or switch the sensor to flow sampling and drop what does not fit (default: block).")
+    listen_parser.add_argument("--overload-rate", type=int, default=10, help="Keep 1 in N conversations while a sensor is sampled under overload (default: 10).")
+    listen_parser.add_argument("--until-idle", action="store_true", help="Stop once every connected sensor has disconnected.")
+    listen_parser.add_argument("--duration", type=float, default=0.0, help="Stop after this many seconds (default: 0, until interrupted).")
+    listen_parser.add_argument("--reorder-window", type=float, default=1.0, help="Seconds of reordering buffer to interleave the sensors' packets by time (default: 1).")
+    listen_parser.add_argument("--fusion-expiry", type=float, default=300.0, help="Close fused detections and per-host incidents after this many idle seconds (default: 300).")
+    listen_parser.add_argument("--filter", type=str, default="auto", help="Only dissect packets matching this header filter (default: auto).")
+    listen_parser.add_argument("-p", "--profile", choices=["default", "triage"], default="default", help="Analysis profile (default: default).")
+    listen_parser.add_argument("--baseline", type=str, default=None, help="Baseline profile from 'zshark train'; recommended, since a stream has no global pre-pass.")
+    listen_parser.add_argument("--max-memory", type=parse_size, default=0, help="Cap the estimated detector state, e.g. 512M (default: unlimited).")
+    listen_parser.add_argument("-m", "--models", type=str, default=None, help="Comma-separated list of models to enable (default: all).")
+    listen_parser.add_argument("--skip-report-stats", action="store_true", help="Only compute the window features the enabled models need (omits top talkers).")
+    listen_parser.add_argument("--index", type=str, default=None, help="Also add the results to this SQLite detection index for 'zshark query'.")
+    listen_parser.add_argument("--metrics-port", type=int, default=None, help="Expose Prometheus metrics on this port, including packets dropped under overload.")
+    listen_parser.add_argument("--metrics-host", type=str, default="127.0.0.1", help="Address for the metrics endpoint (default: 127.0.0.1).")
+    listen_parser.add_argument("-v", "--verbose", action="store_true", help="Enable verbose logging.")
+    listen_parser.set_defaults(func=listen_command)
+
+    index_parser = subparsers.add_parser("index", help="Adds saved analysis results to a SQLite detection index.")
+    index_parser.add_argument("results", nargs="+", help="Analysis JSON files and/or directories searched for *_analysis.json.")
+    index_parser.add_argument("--db", type=str, default="results/zshark.db", help="Index database (default: results/zshark.db).")
+    index_parser.add_argument("-v", "--verbose", action="store_true", help="Enable verbose logging.")
+    index_parser.set_defaults(func=index_command)
+
+    query_parser = subparsers.add_parser("query", help="Searches the detection index across every indexed capture.")
+    query_parser.add_argument("--db", type=str, default="results/zshark.db", help="Index database (default: results/zshark.db).")
+    query_parser.add_argument("-e", "--entity", "--ip", type=str, default=None, help="IP address, domain or flow key involved in the detection.")
+    query_parser.add_argument("-l", "--label", type=str, default=None, help="Detection label; * is a wildcard, e.g. 'DNS*'.")
+    query_parser.add_argument("--engine", type=str, default=None, help="Engine name, e.g. BeaconingDetector.")
+    query_parser.add_argument("--since", type=str, default=None, help="Earliest detection time: epoch seconds or ISO time, e.g. 2024-05-01T12:00.")
+    query_parser.add_argument("--until", type=str, default=None, help="Detections before this time (same formats as --since).")
+    query_parser.add_argument("--min-severity", type=float, default=None, help="Only detections with at least this severity.")
+    query_parser.add_argument("-n", "--limit", type=int, default=100, help="Maximum rows, most recent first for detections (default: 100).")
+    query_parser.add_argument("--windows", action="store_true", help="List window summaries in the time range instead of detections.")
+    query_parser.add_argument("--json", action="store_true", help="Print the rows as JSON.")
+    query_parser.add_argument("-v", "--verbose", action="store_true", help="Enable verbose logging.")
+    query_parser.set_defaults(func=query_command)
+
+    replay_parser = subparsers.add_parser("replay", help="Replays a PCAP file into a local pipe, stdout or UDP socket at a controlled rate.")
+    replay_parser.add_argument("pcap_path", type=str, help="Path to the PCAP file to replay.")
+    replay_parser.add_argument("target", type=str, help="Where to send the packets: a named pipe or file, '-' for a pcap stream on stdout, tcp://HOST:PORT or unix:///PATH for a pcap stream to 'zshark listen', or udp://127.0.0.1:PORT for one datagram per frame.")
+    replay_parser.add_argument("--mkfifo", action="store_true", help="Create the target as a named pipe if it does not exist, and remove it afterwards.")
+    replay_parser.add_argument("-s", "--speed", type=float, default=1.0, help="Multiple of the original timing, e.g. 10 replays ten times faster (default: 1).")
+    replay_parser.add_argument("--pps", type=float, default=None, help="Send at this constant packet rate instead of the capture's timing.")
+    replay_parser.add_argument("--max-rate", action="store_true", help="Send as fast as the target accepts.")
+    replay_parser.add_argument("--loop", type=int, default=1, help="Replay the capture this many times back to back (default: 1).")
+    replay_parser.add_argument("--retime", action="store_true", help="Stamp packets with the time they are sent instead of their capture time, so the analyzer's window lag is measured against real time.")
+    replay_parser.add_argument("--progress-interval", type=float, default=5.0, help="Seconds between progress lines (default: 5; 0 disables).")
+    replay_parser.add_argument("--stats-out", type=str, default=None, help="Write the achieved rate and pacing statistics to this JSON file.")
+    replay_parser.add_argument("-v", "--verbose", action="store_true", help="Enable verbose logging.")
+    replay_parser.set_defaults(func=replay_command)
 
     args = parser.parse_args()
     
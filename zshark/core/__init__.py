@@ -1,4 +1,28 @@
-from .data_structures import Detection, AnalysisResult, ZSharkConfig, ModelConfig
-from .processor import Analyzer, PacketStreamer, WindowProcessor
-from .utils import get_flow_key, shannon_entropy, calculate_window_stats
+from importlib import import_module
 
+# Re-exports are resolved lazily so that importing a lightweight submodule
+# (e.g. zshark.core.data_structures) does not pull in Scapy via the processor.
+_EXPORTS = {
+    "Detection": "zshark.core.data_structures",
+    "AnalysisResult": "zshark.core.data_structures",
+    "ZSharkConfig": "zshark.core.data_structures",
+    "ModelConfig": "zshark.core.data_structures",
+    "DetectionRecord": "zshark.core.records",
+    "WindowRecord": "zshark.core.records",
+    "Analyzer": "zshark.core.processor",
+    "PacketStreamer": "zshark.core.processor",
+    "WindowProcessor": "zshark.core.processor",
+    "get_flow_key": "zshark.core.utils",
+    "shannon_entropy": "zshark.core.utils",
+    "calculate_window_stats": "zshark.core.utils",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        value = getattr(import_module(_EXPORTS[name]), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
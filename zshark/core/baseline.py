@@ -0,0 +1,257 @@
+import gzip
+import json
+import math
+import os
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import zshark
+from zshark.core.data_structures import ZSharkConfig
+
+BASELINE_VERSION = 1
+METRICS = ("pps", "bps", "src_ip_entropy", "dst_ip_entropy", "dst_port_entropy")
+# Windows are bucketed by UTC hour of day, so profiles do not depend on the training host's time zone.
+BUCKETS = 24
+MAX_DOMAINS = 50000
+# Domain labels are lower-cased letters, digits and hyphens; ^ and $ mark the label boundaries.
+NGRAM_ALPHABET = 39
+
+
+class BaselineError(Exception):
+    pass
+
+
+class Distribution:
+    # Count, mean and spread of one metric, mergeable across captures (Chan et al.).
+    __slots__ = ("count", "mean", "m2", "min", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def merge(self, other: "Distribution") -> None:
+        if not other.count:
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.m2 / self.count) if self.count else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"count": self.count, "mean": self.mean, "std": self.std, "min": self.min, "max": self.max}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Distribution":
+        dist = cls()
+        dist.count = data["count"]
+        dist.mean = data["mean"]
+        dist.m2 = data["std"] ** 2 * data["count"]
+        dist.min = data["min"]
+        dist.max = data["max"]
+        return dist
+
+
+class NgramModel:
+    # Character bigram model of benign domain labels. z_score() says how typical a label's
+    # mean log-probability is compared with the benign labels themselves.
+    def __init__(self, bigrams: Dict[str, int], score_mean: float, score_std: float):
+        self.bigrams = bigrams
+        self.totals: Dict[str, int] = defaultdict(int)
+        for pair, count in bigrams.items():
+            self.totals[pair[0]] += count
+        self.score_mean = score_mean
+        self.score_std = score_std or 1.0
+
+    @classmethod
+    def from_profile(cls, profile: Dict[str, Any]) -> Optional["NgramModel"]:
+        ngrams = profile.get("ngrams")
+        if not ngrams or not ngrams.get("bigrams"):
+            return None
+        return cls(ngrams["bigrams"], ngrams["score"]["mean"], ngrams["score"]["std"])
+
+    @staticmethod
+    def pairs(label: str) -> List[str]:
+        padded = f"^{label.lower()}$"
+        return [padded[i:i + 2] for i in range(len(padded) - 1)]
+
+    def score(self, label: str) -> float:
+        pairs = self.pairs(label)
+        return sum(math.log2((self.bigrams.get(pair, 0) + 1) / (self.totals.get(pair[0], 0) + NGRAM_ALPHABET))
+                   for pair in pairs) / len(pairs)
+
+    def z_score(self, label: str) -> float:
+        return (self.score(label) - self.score_mean) / self.score_std
+
+
+def profile_capture(pcap_path: str, config_json: str) -> Dict[str, Any]:
+    # Pool worker: window statistics, ARP bindings and queried domains of one known-good capture.
+    from scapy.layers.l2 import ARP
+    from zshark.core.processor import PacketStreamer, WindowProcessor
+    from zshark.core.utils import WINDOW_FEATURES
+    from zshark.models.dns_detector import domain_label, query_name
+
+    config = ZSharkConfig.model_validate_json(config_json)
+    processor = WindowProcessor(config, WINDOW_FEATURES)
+    buckets = defaultdict(lambda: {metric: Distribution() for metric in METRICS})
+    bindings: Dict[str, set] = defaultdict(set)
+    domains: Counter = Counter()
+    windows = packets = 0
+
+    for window, window_packets in processor.process_stream(PacketStreamer(pcap_path).stream()):
+        windows += 1
+        packets += window.packet_count
+        bucket = buckets[int(window.start // 3600) % BUCKETS]
+        for metric in METRICS:
+            value = getattr(window, metric)
+            if value is not None:
+                bucket[metric].add(float(value))
+        for pkt in window_packets:
+            arp = pkt.getlayer(ARP)
+            if arp is not None:
+                if arp.psrc != "0.0.0.0":
+                    bindings[arp.psrc].add(arp.hwsrc)
+                continue
+            qname = query_name(pkt)
+            if qname:
+                domains[domain_label(qname).lower()] += 1
+
+    return {"pcap_path": pcap_path, "windows": windows, "packets": packets, "buckets": dict(buckets),
+            "bindings": dict(bindings), "domains": domains}
+
+
+def merge_profiles(parts: List[Dict[str, Any]], window_size_s: float,
+                   max_domains: int = MAX_DOMAINS) -> Dict[str, Any]:
+    buckets = defaultdict(lambda: {metric: Distribution() for metric in METRICS})
+    bindings: Dict[str, set] = defaultdict(set)
+    domains: Counter = Counter()
+    for part in parts:
+        for hour, metrics in part["buckets"].items():
+            for metric, dist in metrics.items():
+                buckets[hour][metric].merge(dist)
+        for ip, macs in part["bindings"].items():
+            bindings[ip].update(macs)
+        domains.update(part["domains"])
+
+    overall = {metric: Distribution() for metric in METRICS}
+    for metrics in buckets.values():
+        for metric, dist in metrics.items():
+            overall[metric].merge(dist)
+
+    # Bigrams over distinct labels, so a few very popular names do not dominate the model.
+    bigrams: Counter = Counter()
+    for label in domains:
+        bigrams.update(NgramModel.pairs(label))
+    ngram = NgramModel(dict(bigrams), 0.0, 1.0)
+    scores = Distribution()
+    for label in domains:
+        scores.add(ngram.score(label))
+
+    return {
+        "kind": "baseline",
+        "version": BASELINE_VERSION,
+        "zshark_version": zshark.__version__,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "window_size_s": window_size_s,
+        "files": [part["pcap_path"] for part in parts],
+        "windows": sum(part["windows"] for part in parts),
+        "packets": sum(part["packets"] for part in parts),
+        "overall": {metric: dist.as_dict() for metric, dist in overall.items() if dist.count},
+        "buckets": {str(hour): {metric: dist.as_dict() for metric, dist in metrics.items() if dist.count}
+                    for hour, metrics in sorted(buckets.items())},
+        # An address seen with several MACs in known-good traffic has no single binding to defend.
+        "ip_mac": {ip: next(iter(macs)) for ip, macs in sorted(bindings.items()) if len(macs) == 1},
+        "ip_mac_ambiguous": sorted(ip for ip, macs in bindings.items() if len(macs) > 1),
+        "domains": dict(domains.most_common(max_domains)),
+        "ngrams": {"bigrams": dict(sorted(bigrams.items())), "score": scores.as_dict()},
+    }
+
+
+def train_baseline(pcap_paths: List[Path], config: ZSharkConfig, workers: int = 0,
+                   progress: Optional[Callable[[int, int, Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+    from zshark.core.workers import init_worker
+
+    workers = max(1, min(workers or os.cpu_count() or 1, len(pcap_paths) or 1))
+    config_json = config.model_dump_json()
+    window_size = config.models.get("ddos_volume", ZSharkConfig.default().models["ddos_volume"]).window_size_s
+    ordered = sorted(pcap_paths, key=lambda p: p.stat().st_size, reverse=True)
+    parts: List[Dict[str, Any]] = []
+    failures: List[Dict[str, str]] = []
+    started = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn"),
+                             initializer=init_worker, initargs=("WARNING",)) as pool:
+        futures = {pool.submit(profile_capture, str(path), config_json): path for path in ordered}
+        for done, future in enumerate(as_completed(futures), start=1):
+            path = futures[future]
+            try:
+                part = future.result()
+                parts.append(part)
+                summary = {"pcap_path": str(path), "windows": part["windows"], "packets": part["packets"]}
+            except Exception as e:
+                summary = {"pcap_path": str(path), "error": str(e)}
+                failures.append(summary)
+            if progress is not None:
+                progress(done, len(futures), summary)
+
+    if not parts:
+        raise BaselineError("No capture in the corpus could be read")
+    # Merge in path order so the same corpus always produces the same profile.
+    parts.sort(key=lambda part: part["pcap_path"])
+    profile = merge_profiles(parts, window_size)
+    profile["failed"] = failures
+    profile["wall_s"] = time.perf_counter() - started
+    return profile
+
+
+def save_baseline(path: str, profile: Dict[str, Any]) -> None:
+    Path(path).resolve().parent.mkdir(parents=True, exist_ok=True)
+    opener = gzip.open if str(path).endswith(".gz") else open
+    with opener(path, "wt") as f:
+        json.dump(profile, f, separators=(",", ":"))
+
+
+def load_baseline(path: str) -> Dict[str, Any]:
+    opener = gzip.open if str(path).endswith(".gz") else open
+    try:
+        with opener(path, "rt") as f:
+            profile = json.load(f)
+    except (OSError, ValueError) as e:
+        raise BaselineError(f"Cannot read baseline profile {path}: {e}") from None
+    if not isinstance(profile, dict) or profile.get("kind") != "baseline":
+        raise BaselineError(f"{path} is not a Z-Shark baseline profile")
+    if profile.get("version") != BASELINE_VERSION:
+        raise BaselineError(f"{path} has version {profile.get('version')}, expected {BASELINE_VERSION}")
+    return profile
+
+
+def bucket_stats(profile: Dict[str, Any], timestamp: float, metric: str, min_windows: int) -> Optional[Dict[str, Any]]:
+    # Statistics of `metric` for the hour of day of `timestamp`, falling back to the whole corpus
+    # when that hour holds too few windows; None when neither does.
+    hour = str(int(timestamp // 3600) % BUCKETS)
+    for stats in (profile["buckets"].get(hour, {}).get(metric), profile["overall"].get(metric)):
+        if stats is not None and stats["count"] >= min_windows:
+            return stats
+    return None
@@ -0,0 +1,112 @@
+import os
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Callable
+
+from zshark.core.data_structures import ZSharkConfig
+from zshark.core.workers import init_worker, run_analysis, TOP_DETECTIONS
+
+DEFAULT_PATTERNS = ("*.pcap", "*.pcapng", "*.cap", "*.pcap[0-9]*")
+TOP_TALKERS = 10
+
+
+def find_pcaps(directory: str, patterns: Optional[List[str]] = None, recursive: bool = False) -> List[Path]:
+    root = Path(directory)
+    found = set()
+    for pattern in patterns or DEFAULT_PATTERNS:
+        found.update(root.rglob(pattern) if recursive else root.glob(pattern))
+    return sorted(path for path in found if path.is_file())
+
+
+def output_path_for(pcap_path: Path, root: Path, out_dir: Path) -> Path:
+    # Keep rotated files from different sub-directories apart.
+    try:
+        relative = pcap_path.relative_to(root)
+    except ValueError:
+        relative = Path(pcap_path.name)
+    if relative.suffix in (".pcap", ".pcapng", ".cap"):
+        relative = relative.with_suffix("")
+    stem = "__".join(relative.parts)
+    return out_dir / f"{stem}_analysis.json"
+
+
+def _merge_talkers(summaries: List[Dict[str, Any]], field: str, key: str) -> List[Dict[str, Any]]:
+    merged = defaultdict(lambda: {"packets": 0, "bytes": 0})
+    for summary in summaries:
+        for entry in summary.get(field, []):
+            merged[entry[key]]["packets"] += entry["packets"]
+            merged[entry[key]]["bytes"] += entry["bytes"]
+    ranked = sorted(merged.items(), key=lambda item: item[1]["packets"], reverse=True)[:TOP_TALKERS]
+    return [{key: value, **stats} for value, stats in ranked]
+
+
+def merge_summaries(summaries: List[Dict[str, Any]], failures: List[Dict[str, str]], wall_s: float) -> Dict[str, Any]:
+    labels = Counter()
+    detections = []
+    for summary in summaries:
+        labels.update(summary["labels"])
+        detections.extend({**det, "pcap_path": summary["pcap_path"]} for det in summary.get("top_detections", []))
+    detections.sort(key=lambda det: (det["severity"], det["score"]), reverse=True)
+
+    return {
+        "files": len(summaries) + len(failures),
+        "succeeded": len(summaries),
+        "failed": failures,
+        "start_time": min((s["start_time"] for s in summaries), default=None),
+        "end_time": max((s["end_time"] for s in summaries), default=None),
+        "total_packets": sum(s["total_packets"] for s in summaries),
+        "total_bytes": sum(s["total_bytes"] for s in summaries),
+        "detections": sum(s["detections"] for s in summaries),
+        "labels": dict(labels.most_common()),
+        # Merged from each file's top talkers, so counts below a file's cut-off are not included.
+        "top_source_ips": _merge_talkers(summaries, "top_source_ips", "ip"),
+        "top_dest_ports": _merge_talkers(summaries, "top_dest_ports", "port"),
+        "top_detections": detections[:TOP_DETECTIONS],
+        "wall_s": wall_s,
+        "analysis_wall_s": sum(s["wall_s"] for s in summaries),
+        "results": [{k: v for k, v in s.items() if not k.startswith("top_")} for s in summaries],
+    }
+
+
+def analyze_files(pcap_paths: List[Path], config: ZSharkConfig, out_dir: str, workers: int = 0,
+                  root: Optional[Path] = None,
+                  progress: Optional[Callable[[int, int, Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    if root is None:
+        root = Path(os.path.commonpath([str(p.parent) for p in pcap_paths])) if pcap_paths else Path(".")
+    workers = max(1, min(workers or os.cpu_count() or 1, len(pcap_paths) or 1))
+    config_json = config.model_dump_json()
+
+    # Largest files first so a big capture does not start last and stretch the run.
+    ordered = sorted(pcap_paths, key=lambda p: p.stat().st_size, reverse=True)
+    summaries: List[Dict[str, Any]] = []
+    failures: List[Dict[str, str]] = []
+    started = time.perf_counter()
+
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn"),
+                               initializer=init_worker, initargs=("WARNING", config_json))
+    try:
+        futures = {pool.submit(run_analysis, str(path), config_json, str(output_path_for(path, root, out))): path
+                   for path in ordered}
+        for done, future in enumerate(as_completed(futures), start=1):
+            path = futures[future]
+            try:
+                summary = future.result()
+                summaries.append(summary)
+            except Exception as e:
+                summary = {"pcap_path": str(path), "error": str(e)}
+                failures.append(summary)
+            if progress is not None:
+                progress(done, len(futures), summary)
+    except KeyboardInterrupt:
+        # Let running files finish but drop everything still queued.
+        pool.shutdown(wait=True, cancel_futures=True)
+        raise
+    pool.shutdown(wait=True)
+
+    summaries.sort(key=lambda s: s["start_time"])
+    return merge_summaries(summaries, failures, time.perf_counter() - started)
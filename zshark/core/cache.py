@@ -0,0 +1,126 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Optional, Sequence, Union
+
+import zshark
+from zshark.core.data_structures import ZSharkConfig
+
+HASH_MODES = ("sampled", "full")
+SAMPLE_BLOCK = 64 * 1024
+SAMPLE_BLOCKS = 16
+READ_CHUNK = 1 << 20
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+ENTRY_PREFIXES = ("analysis-", "report-")
+
+
+def default_cache_dir() -> Path:
+    if os.environ.get("ZSHARK_CACHE_DIR"):
+        return Path(os.environ["ZSHARK_CACHE_DIR"])
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return Path(base) / "zshark"
+
+
+def fingerprint_file(path: str, mode: str = "sampled") -> str:
+    if mode not in HASH_MODES:
+        raise ValueError(f"Unknown hash mode '{mode}'. Choose from: {', '.join(HASH_MODES)}")
+    size = os.path.getsize(path)
+    digest = hashlib.sha256(f"{mode}:{size}:".encode())
+    with open(path, "rb") as f:
+        if mode == "full" or size <= SAMPLE_BLOCK * SAMPLE_BLOCKS:
+            for chunk in iter(lambda: f.read(READ_CHUNK), b""):
+                digest.update(chunk)
+        else:
+            # Evenly spaced blocks, always including the first and the last one.
+            step = (size - SAMPLE_BLOCK) / (SAMPLE_BLOCKS - 1)
+            for index in range(SAMPLE_BLOCKS):
+                f.seek(int(index * step))
+                digest.update(f.read(SAMPLE_BLOCK))
+    return digest.hexdigest()
+
+
+def fingerprint_files(paths: Union[str, Sequence[str]], mode: str = "sampled") -> str:
+    if isinstance(paths, str):
+        return fingerprint_file(paths, mode)
+    if len(paths) == 1:
+        return fingerprint_file(paths[0], mode)
+    # An ordered file set is one logical capture: order matters as much as content.
+    return hashlib.sha256(":".join(fingerprint_file(path, mode) for path in paths).encode()).hexdigest()
+
+
+def config_digest(config: ZSharkConfig) -> str:
+    # output_dir and parallel_workers do not change the analysis result.
+    payload = config.model_dump_json(exclude={"output_dir", "parallel_workers"})
+    if config.baseline_path and os.path.isfile(config.baseline_path):
+        # Retraining a profile in place must not reuse results built on the old one.
+        payload += ":" + fingerprint_file(config.baseline_path, "full")
+    return hashlib.sha256(f"{zshark.__version__}:{payload}".encode()).hexdigest()
+
+
+class ResultCache:
+    def __init__(self, directory: Optional[str] = None, max_bytes: int = DEFAULT_MAX_BYTES, hash_mode: str = "sampled"):
+        if hash_mode not in HASH_MODES:
+            raise ValueError(f"Unknown hash mode '{hash_mode}'. Choose from: {', '.join(HASH_MODES)}")
+        self.directory = Path(directory) if directory else default_cache_dir()
+        self.max_bytes = max_bytes
+        self.hash_mode = hash_mode
+
+    def analysis_key(self, pcap_path: Union[str, Sequence[str]], config: ZSharkConfig, merge: bool = False) -> str:
+        fingerprint = fingerprint_files(pcap_path, self.hash_mode)
+        mode = "merge" if merge and not isinstance(pcap_path, str) else "sequential"
+        return "analysis-" + hashlib.sha256(f"{fingerprint}:{mode}:{config_digest(config)}".encode()).hexdigest()[:40]
+
+    def report_key(self, analysis_json_path: str, template: str) -> str:
+        fingerprint = fingerprint_file(analysis_json_path, "full")
+        return "report-" + hashlib.sha256(f"{fingerprint}:{template}:{zshark.__version__}".encode()).hexdigest()[:40]
+
+    def _entry(self, key: str, suffix: str) -> Path:
+        return self.directory / f"{key}{suffix}"
+
+    def lookup(self, key: str, suffix: str = ".json") -> Optional[Path]:
+        entry = self._entry(key, suffix)
+        try:
+            # The mtime doubles as the last-use time for LRU eviction.
+            os.utime(entry)
+        except FileNotFoundError:
+            return None
+        return entry
+
+    def store(self, key: str, source_path: str, suffix: str = ".json") -> Path:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        entry = self._entry(key, suffix)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as dst, open(source_path, "rb") as src:
+                shutil.copyfileobj(src, dst, READ_CHUNK)
+            os.replace(tmp_path, entry)
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+        self.evict(keep=entry)
+        return entry
+
+    def evict(self, keep: Optional[Path] = None) -> int:
+        entries = []
+        for path in self.directory.iterdir():
+            if not path.name.startswith(ENTRY_PREFIXES):
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in sorted(entries, key=lambda entry: entry[0]):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            path.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+        return removed
@@ -0,0 +1,117 @@
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from scapy.layers.inet import IP
+from scapy.layers.inet6 import IPv6
+from scapy.layers.l2 import ARP
+from scapy.packet import Packet
+
+from zshark.core.data_structures import ZSharkConfig
+from zshark.core.records import DetectionRecord, WindowRecord
+from zshark.core.scoring import detection_entities
+
+# Analysis profiles (--profile). A profile fills the cascade settings the config leaves unset.
+PROFILES: Dict[str, Dict[str, Any]] = {
+    "default": {},
+    # Fast first pass: expensive models see every 30th window in full and otherwise only
+    # the hosts the cheap tier flagged during the last minute.
+    "triage": {"cascade_every": 30, "cascade_hold_s": 60.0},
+}
+
+TIERS = ("cheap", "expensive")
+
+
+def resolve_profile(config: ZSharkConfig) -> Tuple[int, float]:
+    try:
+        profile = PROFILES[config.analysis_profile]
+    except KeyError:
+        raise ValueError(f"Unknown analysis profile '{config.analysis_profile}'. "
+                         f"Choose from: {', '.join(PROFILES)}") from None
+    settings = {field: getattr(config, field) for field in ("cascade_every", "cascade_hold_s")}
+    for field, value in profile.items():
+        if field not in config.model_fields_set:
+            settings[field] = value
+    return settings["cascade_every"], settings["cascade_hold_s"]
+
+
+def model_tier(model) -> str:
+    tier = model.config.tier or model.cost_tier
+    if tier not in TIERS:
+        raise ValueError(f"Unknown cost tier '{tier}' for {model.engine_name}. Choose from: {', '.join(TIERS)}")
+    return tier
+
+
+def _hosts(pkt: Packet) -> Tuple[str, ...]:
+    for layer in (IP, IPv6):
+        header = pkt.getlayer(layer)
+        if header is not None:
+            return header.src, header.dst
+    arp = pkt.getlayer(ARP)
+    if arp is not None:
+        return arp.psrc, arp.pdst
+    return ()
+
+
+class CascadeScheduler:
+    # Cheap models run on every window. Expensive models run on every `every`-th window in full;
+    # in between they only see packets of hosts the cheap tier flagged within the last `hold_s`
+    # seconds, and nothing when no host is flagged. A cheap detection that names no host (a
+    # volume anomaly) opens whole windows for the same hold.
+    def __init__(self, every: int, hold_s: float):
+        if every < 1:
+            raise ValueError("Cascade cadence must be at least 1 window")
+        self.every = every
+        self.hold_s = max(0.0, float(hold_s))
+        self.window_index = 0
+        self.flagged: Dict[str, float] = {}
+        self.open_until = float("-inf")
+        self.full_windows = 0
+        self.focused_windows = 0
+        self.skipped_windows = 0
+        self.packets_offered = 0
+        self.packets_withheld = 0
+        self.peak_flagged = 0
+
+    def observe(self, detections: Iterable[DetectionRecord], window: WindowRecord) -> None:
+        until = window.end + self.hold_s
+        for det in detections:
+            entities = detection_entities(det)
+            if not entities:
+                self.open_until = max(self.open_until, until)
+            for entity in entities:
+                self.flagged[entity] = max(self.flagged.get(entity, until), until)
+        self.peak_flagged = max(self.peak_flagged, len(self.flagged))
+
+    def select(self, window: WindowRecord, window_packets: List[Packet]) -> Optional[List[Packet]]:
+        # Packets the expensive tier analyzes for this window, or None to skip it.
+        index = self.window_index
+        self.window_index += 1
+        if self.flagged:
+            self.flagged = {entity: until for entity, until in self.flagged.items() if until >= window.start}
+        if index % self.every == 0 or self.open_until >= window.start:
+            self.full_windows += 1
+            self.packets_offered += len(window_packets)
+            return window_packets
+        selected = None
+        if self.flagged:
+            flagged = self.flagged
+            selected = [pkt for pkt in window_packets if any(host in flagged for host in _hosts(pkt))]
+        if not selected:
+            self.skipped_windows += 1
+            self.packets_withheld += len(window_packets)
+            return None
+        self.focused_windows += 1
+        self.packets_offered += len(selected)
+        self.packets_withheld += len(window_packets) - len(selected)
+        return selected
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "every": self.every,
+            "hold_s": self.hold_s,
+            "full_windows": self.full_windows,
+            "focused_windows": self.focused_windows,
+            "skipped_windows": self.skipped_windows,
+            "packets_offered": self.packets_offered,
+            "packets_withheld": self.packets_withheld,
+            "peak_flagged": self.peak_flagged,
+        }
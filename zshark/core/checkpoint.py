@@ -0,0 +1,68 @@
+import os
+import pickle
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, Sequence, Union
+
+from zshark.core.cache import fingerprint_files, config_digest
+from zshark.core.data_structures import ZSharkConfig
+
+CHECKPOINT_VERSION = 6
+
+
+class CheckpointError(Exception):
+    pass
+
+
+def _write_atomic(path: str, payload: Dict[str, Any]) -> None:
+    directory = Path(path).resolve().parent
+    directory.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except BaseException:
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
+
+
+def _read(path: str, kind: str) -> Dict[str, Any]:
+    # Checkpoints are pickles written by this tool; only load files you created.
+    with open(path, "rb") as f:
+        payload = pickle.load(f)
+    if not isinstance(payload, dict) or payload.get("kind") != kind:
+        raise CheckpointError(f"{path} is not a Z-Shark {kind} file")
+    if payload.get("version") != CHECKPOINT_VERSION:
+        raise CheckpointError(f"{path} has version {payload.get('version')}, expected {CHECKPOINT_VERSION}")
+    return payload
+
+
+def save_checkpoint(path: str, pcap_path: Union[str, Sequence[str]], config: ZSharkConfig, run_state: Dict[str, Any]) -> None:
+    _write_atomic(path, {
+        "kind": "checkpoint",
+        "version": CHECKPOINT_VERSION,
+        "created": datetime.now().isoformat(),
+        "pcap_fingerprint": fingerprint_files(pcap_path),
+        "config_digest": config_digest(config),
+        **run_state,
+    })
+
+
+def load_checkpoint(path: str, pcap_path: Union[str, Sequence[str]], config: ZSharkConfig) -> Dict[str, Any]:
+    payload = _read(path, "checkpoint")
+    if payload["pcap_fingerprint"] != fingerprint_files(pcap_path):
+        raise CheckpointError(f"Checkpoint {path} was written for a different capture")
+    if payload["config_digest"] != config_digest(config):
+        raise CheckpointError(f"Checkpoint {path} was written with a different configuration")
+    return payload
+
+
+def save_model_state(path: str, models: Dict[str, Any]) -> None:
+    _write_atomic(path, {"kind": "state", "version": CHECKPOINT_VERSION, "created": datetime.now().isoformat(),
+                         "models": models})
+
+
+def load_model_state(path: str) -> Dict[str, Any]:
+    return _read(path, "state")["models"]
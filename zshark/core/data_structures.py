@@ -16,6 +16,17 @@ class Detection(BaseModel):
     flow_key: Optional[str] = Field(None, description="A key identifying the flow (e.g., 'src_ip:dst_ip').")
 
 
+class Incident(BaseModel):
+    entity: str = Field(..., description="Host the correlated detections point to.")
+    first_seen: datetime
+    last_seen: datetime
+    severity: float = Field(..., description="Combined severity: 1 - prod(1 - s) over each engine's highest severity.")
+    max_severity: float
+    engines: List[str] = Field(default_factory=list)
+    labels: List[str] = Field(default_factory=list)
+    detection_count: int = Field(0, description="Raw detections folded into this incident.")
+
+
 class WindowStats(BaseModel):
     start_time: str = Field(..., description="ISO format start time of the window.")
     end_time: str = Field(..., description="ISO format end time of the window.")
@@ -23,8 +34,20 @@ class WindowStats(BaseModel):
     total_bytes: int = Field(..., description="Total bytes of packets in the window.")
     pps: float = Field(0.0, description="Packets per second.")
     bps: float = Field(0.0, description="Bits per second.")
-    src_ip_entropy: float = Field(0.0, description="Shannon entropy of source IP addresses.")
-    dst_ip_entropy: float = Field(0.0, description="Shannon entropy of destination IP addresses.")
+    src_ip_entropy: Optional[float] = Field(None, description="Shannon entropy of source IP addresses (None if not computed).")
+    dst_ip_entropy: Optional[float] = Field(None, description="Shannon entropy of destination IP addresses (None if not computed).")
+    dst_port_entropy: Optional[float] = Field(None, description="Shannon entropy of destination ports (None if not computed).")
+    top_source_ips: Optional[List[Dict[str, Any]]] = Field(None, description="Exact top-N source IPs of this window (None unless requested).")
+    top_dest_ports: Optional[List[Dict[str, Any]]] = Field(None, description="Exact top-N destination ports of this window (None unless requested).")
+
+    # Epoch seconds, as on zshark.core.records.WindowRecord, so models accept either.
+    @property
+    def start(self) -> float:
+        return datetime.fromisoformat(self.start_time).timestamp()
+
+    @property
+    def end(self) -> float:
+        return datetime.fromisoformat(self.end_time).timestamp()
 
     def get(self, key: str, default=None):
         return getattr(self, key, default)
@@ -39,11 +62,21 @@ class WindowStats(BaseModel):
 class AnalysisResult(BaseModel):
 
     pcap_path: str
+    source_files: List[str] = Field(default_factory=list, description="All capture files analyzed as one stream, "
+                                                                      "in order (empty for a single file)")
     start_time: datetime
     end_time: datetime
     total_packets: int
     total_bytes: int
     detections: List[Detection] = Field(default_factory=list)
+    incidents: List[Incident] = Field(default_factory=list, description="Detections correlated per host across engines")
+    sampling: Dict[str, Any] = Field(default_factory=dict, description="Sampling mode, rate and seen/sampled "
+                                                                        "counts (empty when every packet is analyzed)")
+    prefilter: Dict[str, Any] = Field(default_factory=dict, description="Packet filter expression and seen/matched "
+                                                                         "counts (empty when no filter was applied)")
+    cascade: Dict[str, Any] = Field(default_factory=dict, description="Cascade settings, windows and packets given to "
+                                                                       "the expensive models and their measured cost "
+                                                                       "(empty when every model saw every window)")
     summary_stats: Dict[str, Any] = Field(default_factory=dict)
     analysis_stats: Dict[str, Any] = Field(default_factory=dict)
     window_stats: List[WindowStats] = Field(default_factory=list, description="List of per-window statistics")
@@ -59,12 +92,47 @@ class ModelConfig(BaseModel):
     window_size_s: int = Field(10, description="Time window size in seconds for statistical calculation.")
     weight: float = Field(1.0, description="Weight for score fusion.")
     params: Dict[str, Any] = Field(default_factory=dict, description="Model-specific parameters.")
+    tier: Optional[str] = Field(None, description="Cascade tier override: 'cheap' or 'expensive' (None keeps the "
+                                                  "model's own).")
 
 
 class ZSharkConfig(BaseModel):
     analysis_profile: str = "default"
     output_dir: str = "results"
     parallel_workers: int = 1
+    features: Optional[List[str]] = Field(None, description="Window features to compute in addition to those "
+                                                            "required by the enabled models. None computes the "
+                                                            "report features (top talkers); [] only what the "
+                                                            "models need.")
+    reorder_window_s: float = Field(0.0, description="Hold packets this many seconds to put slightly out-of-order "
+                                                     "packets back in timestamp order (0 disables).")
+    reorder_max_packets: int = Field(100000, description="Upper bound on packets held by the reorder buffer.")
+    packet_filter: str = Field("auto", description="Header-level filter applied before dissection (BPF-like subset). "
+                                                   "'auto' derives it from the enabled models when no window feature "
+                                                   "needs all traffic; 'none' disables it.")
+    sampling_mode: str = Field("none", description="Packet sampling before dissection: none, systematic (every "
+                                                   "Nth), random, or flow (whole conversations by hash).")
+    sampling_rate: int = Field(1, description="Keep 1 in N packets; window PPS/BPS are scaled back up by N.")
+    sampling_seed: int = Field(0, description="Seed for random and flow sampling.")
+    talkers_top_n: int = Field(5, description="Top talkers reported per capture.")
+    talkers_capacity: int = Field(1000, description="Keys monitored per top-talker table (Space-Saving); counts are "
+                                                    "overestimated by at most total packets / capacity.")
+    talkers_cms_width: int = Field(2048, description="Count-Min sketch width used to bound newly admitted talkers.")
+    talkers_cms_depth: int = Field(4, description="Count-Min sketch depth.")
+    window_top_talkers: int = Field(0, description="Also record the exact top-N talkers of every window (0 disables).")
+    cascade_every: int = Field(0, description="Run expensive models on every Nth window in full and otherwise only "
+                                              "on hosts flagged by the cheap models (0 runs every model on every "
+                                              "window). Set by the 'triage' profile.")
+    cascade_hold_s: float = Field(0.0, description="Seconds a host flagged by a cheap model stays under expensive "
+                                                   "analysis.")
+    max_memory_bytes: int = Field(0, description="Budget for the estimated state of all detectors and top-talker "
+                                                 "tables; least recently active entries are evicted across models "
+                                                 "when it is exceeded (0 disables).")
+    baseline_path: Optional[str] = Field(None, description="Baseline profile written by 'zshark train'. Models start "
+                                                            "from it instead of the capture's global average PPS.")
+    fusion_expiry_s: float = Field(0.0, description="Close a fused detection or incident after this many seconds "
+                                                    "without new activity; later activity opens a new one (0 keeps "
+                                                    "one per key for the whole capture).")
     models: Dict[str, ModelConfig] = Field(default_factory=dict)
 
     @classmethod
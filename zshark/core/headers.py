@@ -0,0 +1,133 @@
+import struct
+from typing import NamedTuple, Optional, Tuple
+
+# Link types (pcap LINKTYPE_*) whose network header can be located without Scapy.
+LINKTYPE_ETHERNET = 1
+LINKTYPE_RAW = (12, 101)
+LINKTYPE_IPV4 = 228
+LINKTYPE_IPV6 = 229
+LINKTYPE_LINUX_SLL = 113
+LINKTYPE_LINUX_SLL2 = 276
+
+ETH_P_IP = 0x0800
+ETH_P_ARP = 0x0806
+ETH_P_IPV6 = 0x86DD
+VLAN_TYPES = (0x8100, 0x88A8, 0x9100)
+
+IPPROTO_TCP = 6
+IPPROTO_UDP = 17
+# IPv6 extension headers walked to reach the transport header.
+IPV6_EXTENSION_HEADERS = (0, 43, 60)
+IPPROTO_FRAGMENT = 44
+IPPROTO_AH = 51
+
+_u16 = struct.Struct("!H")
+
+
+class HeaderSummary(NamedTuple):
+    ethertype: Optional[int]
+    # IP protocol after IPv6 extension headers; None for non-IP frames.
+    proto: Optional[int]
+    # IP addresses, or the ARP sender/target protocol addresses; b"" if unknown.
+    src: bytes
+    dst: bytes
+    # TCP/UDP ports; None for other protocols and for non-first fragments.
+    sport: Optional[int]
+    dport: Optional[int]
+
+
+def network_header(raw: bytes, linktype: int) -> Tuple[Optional[int], int]:
+    # (ethertype, offset of the network header); ethertype is None if it cannot be found.
+    if linktype == LINKTYPE_ETHERNET:
+        if len(raw) < 14:
+            return None, 0
+        ethertype = _u16.unpack_from(raw, 12)[0]
+        offset = 14
+        while ethertype in VLAN_TYPES and len(raw) >= offset + 4:
+            ethertype = _u16.unpack_from(raw, offset + 2)[0]
+            offset += 4
+        return ethertype, offset
+    if linktype == LINKTYPE_LINUX_SLL:
+        return (_u16.unpack_from(raw, 14)[0], 16) if len(raw) >= 16 else (None, 0)
+    if linktype == LINKTYPE_LINUX_SLL2:
+        return (_u16.unpack_from(raw, 0)[0], 20) if len(raw) >= 20 else (None, 0)
+    if linktype in LINKTYPE_RAW or linktype in (LINKTYPE_IPV4, LINKTYPE_IPV6):
+        if not raw:
+            return None, 0
+        version = raw[0] >> 4
+        return (ETH_P_IP if version == 4 else ETH_P_IPV6 if version == 6 else None), 0
+    return None, 0
+
+
+def _ip_header(raw: bytes, ethertype: Optional[int], offset: int) -> Optional[Tuple[int, bytes, bytes, Optional[int]]]:
+    # (protocol, src, dst, transport offset); the offset is None when no transport header follows.
+    if ethertype == ETH_P_IP and len(raw) >= offset + 20:
+        ihl = (raw[offset] & 0x0F) * 4
+        fragment_offset = _u16.unpack_from(raw, offset + 6)[0] & 0x1FFF
+        transport = None if fragment_offset else offset + ihl
+        return raw[offset + 9], raw[offset + 12:offset + 16], raw[offset + 16:offset + 20], transport
+    if ethertype == ETH_P_IPV6 and len(raw) >= offset + 40:
+        proto = raw[offset + 6]
+        src, dst = raw[offset + 8:offset + 24], raw[offset + 24:offset + 40]
+        transport = offset + 40
+        while transport is not None and len(raw) >= transport + 8:
+            if proto in IPV6_EXTENSION_HEADERS:
+                proto, transport = raw[transport], transport + (raw[transport + 1] + 1) * 8
+            elif proto == IPPROTO_AH:
+                proto, transport = raw[transport], transport + (raw[transport + 1] + 2) * 4
+            elif proto == IPPROTO_FRAGMENT:
+                fragmented = _u16.unpack_from(raw, transport + 2)[0] & 0xFFF8
+                proto, transport = raw[transport], None if fragmented else transport + 8
+            else:
+                break
+        return proto, src, dst, transport
+    return None
+
+
+def _ports(raw: bytes, proto: int, transport: Optional[int]) -> Tuple[Optional[int], Optional[int]]:
+    if proto in (IPPROTO_TCP, IPPROTO_UDP) and transport is not None and len(raw) >= transport + 4:
+        return _u16.unpack_from(raw, transport)[0], _u16.unpack_from(raw, transport + 2)[0]
+    return None, None
+
+
+def flow_tuple(raw: bytes, linktype: int) -> Optional[Tuple[int, bytes, bytes, int, int]]:
+    # (protocol, src address, dst address, src port, dst port) from the raw header bytes;
+    # ports are 0 for non-TCP/UDP traffic and for fragments after the first.
+    ethertype, offset = network_header(raw, linktype)
+    header = _ip_header(raw, ethertype, offset)
+    if header is None:
+        return None
+    proto, src, dst, transport = header
+    sport, dport = _ports(raw, proto, transport)
+    return proto, src, dst, sport or 0, dport or 0
+
+
+def summarize(raw: bytes, linktype: int) -> HeaderSummary:
+    # Header fields the packet filter (zshark.core.prefilter) matches on.
+    ethertype, offset = network_header(raw, linktype)
+    header = _ip_header(raw, ethertype, offset)
+    if header is not None:
+        proto, src, dst, transport = header
+        sport, dport = _ports(raw, proto, transport)
+        return HeaderSummary(ethertype, proto, src, dst, sport, dport)
+    if ethertype == ETH_P_ARP and len(raw) >= offset + 8:
+        hlen, plen = raw[offset + 4], raw[offset + 5]
+        spa = offset + 8 + hlen
+        tpa = spa + plen + hlen
+        if len(raw) >= tpa + plen:
+            return HeaderSummary(ethertype, None, raw[spa:spa + plen], raw[tpa:tpa + plen], None, None)
+    return HeaderSummary(ethertype, None, b"", b"", None, None)
+
+
+def conversation_key(raw: bytes, linktype: int) -> bytes:
+    # Same key for both directions of a flow, so flow sampling keeps or drops whole flows.
+    flow = flow_tuple(raw, linktype)
+    if flow is not None:
+        proto, src, dst, sport, dport = flow
+        a, b = src + _u16.pack(sport), dst + _u16.pack(dport)
+        return bytes((proto,)) + min(a, b) + max(a, b)
+    if linktype == LINKTYPE_ETHERNET and len(raw) >= 12:
+        # Non-IP frames (ARP, ...) are grouped by their MAC address pair.
+        a, b = raw[0:6], raw[6:12]
+        return min(a, b) + max(a, b)
+    return raw[:64]
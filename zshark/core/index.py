@@ -0,0 +1,303 @@
+import json
+import os
+import sqlite3
+import time
+from collections import namedtuple
+from datetime import datetime
+from itertools import chain
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from zshark.core.data_structures import AnalysisResult
+from zshark.core.scoring import detection_entities
+
+INDEX_VERSION = 1
+# Rows buffered per executemany call; each analysis is inserted in a single transaction.
+BATCH_ROWS = 5000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS analyses (
+    id INTEGER PRIMARY KEY,
+    result_path TEXT NOT NULL UNIQUE,
+    pcap_path TEXT,
+    start_time REAL,
+    end_time REAL,
+    total_packets INTEGER,
+    total_bytes INTEGER,
+    detections INTEGER,
+    windows INTEGER,
+    indexed_at REAL
+);
+CREATE TABLE IF NOT EXISTS detections (
+    id INTEGER PRIMARY KEY,
+    analysis_id INTEGER NOT NULL,
+    ts REAL NOT NULL,
+    engine TEXT NOT NULL,
+    label TEXT NOT NULL,
+    severity REAL,
+    score REAL,
+    flow_key TEXT,
+    justification TEXT,
+    evidence TEXT
+);
+CREATE TABLE IF NOT EXISTS entities (
+    entity TEXT NOT NULL,
+    detection_id INTEGER NOT NULL,
+    PRIMARY KEY (entity, detection_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS windows (
+    analysis_id INTEGER NOT NULL,
+    start REAL NOT NULL,
+    end REAL NOT NULL,
+    packet_count INTEGER,
+    total_bytes INTEGER,
+    pps REAL,
+    bps REAL,
+    src_ip_entropy REAL,
+    dst_ip_entropy REAL,
+    dst_port_entropy REAL
+);
+CREATE INDEX IF NOT EXISTS detections_ts ON detections (ts);
+CREATE INDEX IF NOT EXISTS detections_label ON detections (label, ts);
+CREATE INDEX IF NOT EXISTS detections_engine ON detections (engine, ts);
+CREATE INDEX IF NOT EXISTS detections_analysis ON detections (analysis_id);
+CREATE INDEX IF NOT EXISTS entities_detection ON entities (detection_id);
+CREATE INDEX IF NOT EXISTS windows_start ON windows (start);
+CREATE INDEX IF NOT EXISTS windows_analysis ON windows (analysis_id, start);
+"""
+
+META_FIELDS = ("pcap_path", "start_time", "end_time", "total_packets", "total_bytes")
+WINDOW_FIELDS = ("packet_count", "total_bytes", "pps", "bps", "src_ip_entropy", "dst_ip_entropy", "dst_port_entropy")
+_Keys = namedtuple("_Keys", "evidence flow_key")
+
+
+class DetectionIndexError(Exception):
+    pass
+
+
+def _epoch(value: Union[str, datetime, float, None]) -> Optional[float]:
+    if value is None or isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value.timestamp()
+
+
+def parse_time(text: str) -> float:
+    # Epoch seconds or an ISO date/time (local time, as in the analysis JSON).
+    try:
+        return float(text)
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(text).timestamp()
+    except ValueError:
+        raise ValueError(f"Invalid time '{text}' (expected epoch seconds or e.g. 2024-05-01T12:00)") from None
+
+
+def entities(evidence: Dict[str, Any], flow_key: Optional[str]) -> List[str]:
+    # Hosts from fusion's entity rules, plus the queried domain and the flow key itself.
+    found = detection_entities(_Keys(evidence, flow_key))
+    for value in (evidence.get("domain"), evidence.get("flow_key") or flow_key):
+        if value:
+            found.append(str(value))
+    return list(dict.fromkeys(found))
+
+
+class DetectionIndex:
+    # SQLite index of detections and window summaries across many analysis results. Each result
+    # is stored under its JSON path; indexing the same path again replaces its rows.
+    def __init__(self, path: str):
+        Path(path).resolve().parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+        version = self.db.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        if version is None:
+            with self.db:
+                self.db.execute("INSERT INTO meta VALUES ('version', ?)", (str(INDEX_VERSION),))
+        elif int(version[0]) != INDEX_VERSION:
+            self.db.close()
+            raise DetectionIndexError(f"{path} has index version {version[0]}, expected {INDEX_VERSION}")
+
+    def close(self) -> None:
+        self.db.close()
+
+    def __enter__(self) -> "DetectionIndex":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def add_result(self, result: AnalysisResult, result_path: str) -> int:
+        meta = {"pcap_path": result.pcap_path, "start_time": result.start_time, "end_time": result.end_time,
+                "total_packets": result.total_packets, "total_bytes": result.total_bytes}
+        rows = [(("detection", (det.timestamp, det.engine_name, det.label, det.severity, det.score, det.flow_key,
+                                det.justification, det.evidence)) for det in result.detections),
+                (("window", (window.start_time, window.end_time, *(getattr(window, field) for field in WINDOW_FIELDS)))
+                 for window in result.window_stats)]
+        return self._insert(result_path, meta, chain.from_iterable(rows))
+
+    def add_json(self, json_path: str) -> int:
+        # Streams the analysis JSON, so results larger than memory can be indexed.
+        from zshark.reports.json_stream import iter_object
+
+        meta: Dict[str, Any] = {}
+
+        def rows() -> Iterator[Tuple[str, tuple]]:
+            for key, value in iter_object(json_path, streamed=("detections", "window_stats")):
+                if key == "detections":
+                    yield "detection", (value["timestamp"], value["engine_name"], value["label"], value["severity"],
+                                        value["score"], value.get("flow_key"), value.get("justification"),
+                                        value.get("evidence") or {})
+                elif key == "window_stats":
+                    yield "window", (value["start_time"], value["end_time"],
+                                     *(value.get(field) for field in WINDOW_FIELDS))
+                elif key in META_FIELDS:
+                    meta[key] = value
+
+        count = self._insert(json_path, meta, rows())
+        if "pcap_path" not in meta:
+            self.remove(json_path)
+            raise DetectionIndexError(f"{json_path} is not a Z-Shark analysis result")
+        return count
+
+    def remove(self, result_path: str) -> None:
+        with self.db:
+            self._delete(os.path.abspath(result_path))
+
+    def _delete(self, key: str) -> None:
+        db = self.db
+        old = db.execute("SELECT id FROM analyses WHERE result_path = ?", (key,)).fetchone()
+        if old is not None:
+            db.execute("DELETE FROM entities WHERE detection_id IN "
+                       "(SELECT id FROM detections WHERE analysis_id = ?)", old)
+            db.execute("DELETE FROM detections WHERE analysis_id = ?", old)
+            db.execute("DELETE FROM windows WHERE analysis_id = ?", old)
+            db.execute("DELETE FROM analyses WHERE id = ?", old)
+
+    def _insert(self, result_path: str, meta: Dict[str, Any], rows: Iterable[Tuple[str, tuple]]) -> int:
+        # `meta` may still be filled in while `rows` is consumed (streamed JSON), so the analysis
+        # row is completed last.
+        key = os.path.abspath(result_path)
+        db = self.db
+        with db:
+            self._delete(key)
+            analysis_id = db.execute("INSERT INTO analyses (result_path, indexed_at) VALUES (?, ?)",
+                                     (key, time.time())).lastrowid
+            # Detection ids are assigned here rather than by SQLite, so entity rows can be
+            # batched alongside them without a lookup per detection.
+            next_id = (db.execute("SELECT MAX(id) FROM detections").fetchone()[0] or 0) + 1
+            detections, entity_rows, windows = [], [], []
+            detection_count = window_count = 0
+
+            def flush() -> None:
+                db.executemany("INSERT INTO detections VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", detections)
+                db.executemany("INSERT OR IGNORE INTO entities VALUES (?, ?)", entity_rows)
+                db.executemany("INSERT INTO windows VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", windows)
+                detections.clear()
+                entity_rows.clear()
+                windows.clear()
+
+            for kind, row in rows:
+                if kind == "detection":
+                    ts, engine, label, severity, score, flow_key, justification, evidence = row
+                    det_id = next_id + detection_count
+                    detections.append((det_id, analysis_id, _epoch(ts), engine, label, severity, score, flow_key,
+                                       justification, json.dumps(evidence, default=str)))
+                    entity_rows.extend((entity, det_id) for entity in entities(evidence, flow_key))
+                    detection_count += 1
+                else:
+                    start, end, *values = row
+                    windows.append((analysis_id, _epoch(start), _epoch(end), *values))
+                    window_count += 1
+                if len(detections) + len(windows) >= BATCH_ROWS:
+                    flush()
+            flush()
+            db.execute("UPDATE analyses SET pcap_path = ?, start_time = ?, end_time = ?, total_packets = ?, "
+                       "total_bytes = ?, detections = ?, windows = ? WHERE id = ?",
+                       (meta.get("pcap_path"), _epoch(meta.get("start_time")), _epoch(meta.get("end_time")),
+                        meta.get("total_packets"), meta.get("total_bytes"), detection_count, window_count,
+                        analysis_id))
+        return detection_count
+
+    def query(self, entity: Optional[str] = None, label: Optional[str] = None, engine: Optional[str] = None,
+              since: Optional[float] = None, until: Optional[float] = None, min_severity: Optional[float] = None,
+              limit: int = 100) -> List[Dict[str, Any]]:
+        # Detections matching every given filter, most recent first. A label containing * is a wildcard.
+        clauses: List[str] = []
+        params: List[Any] = []
+        source = "detections d"
+        if entity:
+            source = "entities e JOIN detections d ON d.id = e.detection_id"
+            clauses.append("e.entity = ?")
+            params.append(entity)
+        if label:
+            clauses.append("d.label LIKE ?" if "*" in label else "d.label = ?")
+            params.append(label.replace("*", "%"))
+        if engine:
+            clauses.append("d.engine = ?")
+            params.append(engine)
+        if since is not None:
+            clauses.append("d.ts >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("d.ts < ?")
+            params.append(until)
+        if min_severity is not None:
+            clauses.append("d.severity >= ?")
+            params.append(min_severity)
+        sql = (f"SELECT d.id, d.ts, d.engine, d.label, d.severity, d.score, d.flow_key, d.justification, "
+               f"d.evidence, a.pcap_path, a.result_path FROM {source} JOIN analyses a ON a.id = d.analysis_id"
+               + (f" WHERE {' AND '.join(clauses)}" if clauses else "") + " ORDER BY d.ts DESC LIMIT ?")
+        rows = self.db.execute(sql, (*params, limit)).fetchall()
+        entity_map: Dict[int, List[str]] = {}
+        if rows:
+            ids = [row[0] for row in rows]
+            placeholders = ",".join("?" * len(ids))
+            for entity_name, det_id in self.db.execute(
+                    f"SELECT entity, detection_id FROM entities WHERE detection_id IN ({placeholders})", ids):
+                entity_map.setdefault(det_id, []).append(entity_name)
+        return [{"timestamp": datetime.fromtimestamp(ts).isoformat(), "engine_name": engine_name, "label": label_,
+                 "severity": severity, "score": score, "flow_key": flow_key, "justification": justification,
+                 "evidence": json.loads(evidence), "entities": entity_map.get(det_id, []),
+                 "pcap_path": pcap_path, "result_path": result_path}
+                for det_id, ts, engine_name, label_, severity, score, flow_key, justification, evidence,
+                pcap_path, result_path in rows]
+
+    def windows(self, since: Optional[float] = None, until: Optional[float] = None,
+                limit: int = 1000) -> List[Dict[str, Any]]:
+        clauses, params = [], []
+        if since is not None:
+            clauses.append("w.start >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("w.start < ?")
+            params.append(until)
+        sql = (f"SELECT w.start, w.end, {', '.join('w.' + field for field in WINDOW_FIELDS)}, a.pcap_path "
+               f"FROM windows w JOIN analyses a ON a.id = w.analysis_id"
+               + (f" WHERE {' AND '.join(clauses)}" if clauses else "") + " ORDER BY w.start LIMIT ?")
+        return [{"start_time": datetime.fromtimestamp(start).isoformat(),
+                 "end_time": datetime.fromtimestamp(end).isoformat(),
+                 **dict(zip(WINDOW_FIELDS, values)), "pcap_path": pcap_path}
+                for start, end, *values, pcap_path in self.db.execute(sql, (*params, limit))]
+
+    def stats(self) -> Dict[str, Any]:
+        analyses, detections, windows = self.db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(detections), 0), COALESCE(SUM(windows), 0) FROM analyses").fetchone()
+        return {"path": self.path, "analyses": analyses, "detections": detections, "windows": windows,
+                "size_bytes": os.path.getsize(self.path)}
+
+
+def index_paths(paths: Iterable[Union[str, Path]]) -> List[Path]:
+    # Analysis JSON files, and *_analysis.json files anywhere under directories.
+    found: List[Path] = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            found.extend(sorted(path.rglob("*_analysis.json")))
+        else:
+            found.append(path)
+    return found
@@ -0,0 +1,313 @@
+import asyncio
+import os
+import queue
+import struct
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+from loguru import logger
+from scapy.config import conf
+from scapy.packet import Packet
+
+from zshark.core.prefilter import PacketFilter
+from zshark.core.processor import FilteredRecord
+from zshark.core.sampling import Sampler
+
+OVERLOAD_POLICIES = ("block", "sample")
+# Microsecond and nanosecond classic pcap, as written by tcpdump -w - and zshark replay.
+PCAP_MAGICS = {0xa1b2c3d4: 1e-6, 0xa1b23c4d: 1e-9}
+MAX_CAPLEN = 262144
+READ_CHUNK = 1 << 16
+# A connection samples while the queue is above the high-water mark and returns to full
+# capture once it drains below the low-water mark.
+HIGH_WATER = 0.75
+LOW_WATER = 0.25
+
+Record = Tuple[float, bytes, int, int]
+
+
+def parse_address(address: str) -> Tuple[str, Union[str, Tuple[str, int]]]:
+    # "tcp://host:port" or "unix:///path/to.sock" -> ("tcp", (host, port)) / ("unix", path).
+    if address.startswith("unix://"):
+        path = address[len("unix://"):]
+        if not path:
+            raise ValueError(f"Invalid socket address '{address}' (expected unix:///path/to.sock)")
+        return "unix", path
+    if address.startswith("tcp://"):
+        host, _, port = address[len("tcp://"):].rpartition(":")
+        if host and port.isdigit():
+            return "tcp", (host.strip("[]"), int(port))
+    raise ValueError(f"Invalid socket address '{address}' (expected tcp://host:port or unix:///path)")
+
+
+def parse_pcap_header(header: bytes) -> Tuple[str, float, int]:
+    # Byte order, timestamp unit and linktype of a classic pcap global header.
+    for endian in ("<", ">"):
+        magic, = struct.unpack(endian + "I", header[:4])
+        if magic in PCAP_MAGICS:
+            linktype, = struct.unpack(endian + "I", header[20:24])
+            return endian, PCAP_MAGICS[magic], linktype & 0x0FFFFFFF
+    raise ValueError("not a classic pcap stream (pcapng is not supported over sockets)")
+
+
+class SensorStats:
+    __slots__ = ("name", "connected", "closed", "packets", "bytes", "dropped_packets", "dropped_bytes",
+                 "sampled_packets", "sampled_bytes", "overloads", "blocked_s", "error")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.connected = time.time()
+        self.closed: Optional[float] = None
+        self.packets = 0
+        self.bytes = 0
+        self.dropped_packets = 0
+        self.dropped_bytes = 0
+        # The part of the drops made by overload sampling (captured bytes, like the capture totals);
+        # the windows scale the conversations that were kept to stand for them.
+        self.sampled_packets = 0
+        self.sampled_bytes = 0
+        self.overloads = 0
+        self.blocked_s = 0.0
+        self.error: Optional[str] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+
+class SocketIngest:
+    # Accepts pcap streams from any number of sensors on a TCP or Unix socket. An asyncio loop on
+    # a background thread reads each connection in chunks and puts the parsed records, one batch
+    # per chunk, on a bounded queue; stream() is the consumer side and yields packets like
+    # PacketStreamer does. When the queue is full, "block" stops reading the connection so TCP
+    # flow control pushes back on the sensor, and "sample" keeps 1 in `overload_rate`
+    # conversations (flow sampling) until the queue drains, dropping whole batches only when
+    # it is still full. Each batch is queued with the sampling rate it was taken at, and its
+    # records carry that rate as `sample_weight`. Nothing is ever buffered beyond
+    # `queue_batches` batches plus the kernel socket buffers.
+    def __init__(self, address: str, queue_batches: int = 256, overload: str = "block", overload_rate: int = 10,
+                 until_idle: bool = False, max_seconds: float = 0.0):
+        if overload not in OVERLOAD_POLICIES:
+            raise ValueError(f"Unknown overload policy '{overload}'. Choose from: {', '.join(OVERLOAD_POLICIES)}")
+        if queue_batches < 1:
+            raise ValueError("Ingest queue must hold at least one batch")
+        self.kind, self.bind = parse_address(address)
+        self.address = address
+        self.overload = overload
+        self.overload_rate = max(2, overload_rate)
+        self.until_idle = until_idle
+        self.max_seconds = max_seconds
+        self.queue: "queue.Queue[Tuple[int, List[Record]]]" = queue.Queue(queue_batches)
+        self.high_water = max(1, int(queue_batches * HIGH_WATER))
+        self.low_water = int(queue_batches * LOW_WATER)
+        self.sensors: List[SensorStats] = []
+        self.active = 0
+        self.peak_queue = 0
+        self.started: Optional[float] = None
+        self._stop = threading.Event()
+        self._ready = threading.Event()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._error: Optional[BaseException] = None
+        # PacketStreamer interface used by Analyzer.analyze_pcap.
+        self.pcap_path = address
+        self.pcap_paths = [address]
+        self.sampler: Optional[Sampler] = None
+        self.prefilter: Optional[PacketFilter] = None
+        self.file_index = 0
+        self.offset = 0
+
+    def start(self) -> str:
+        # Binds the socket and returns the actual address (a tcp port of 0 picks a free one).
+        self._thread = threading.Thread(target=self._run, name="zshark-ingest", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        if self._error is not None:
+            raise self._error
+        self.started = time.monotonic()
+        logger.info(f"Listening for pcap streams on {self.address}")
+        return self.address
+
+    def stop(self) -> None:
+        # Stops accepting data; stream() ends once the queued batches are consumed.
+        self._stop.set()
+        if self._loop is not None and self._loop.is_running():
+            self._loop.call_soon_threadsafe(self._loop.stop)
+
+    def _run(self) -> None:
+        loop = self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            if self.kind == "unix":
+                if os.path.exists(self.bind):
+                    os.unlink(self.bind)
+                server = loop.run_until_complete(asyncio.start_unix_server(self._handle, self.bind))
+            else:
+                server = loop.run_until_complete(asyncio.start_server(self._handle, *self.bind))
+                host, port = server.sockets[0].getsockname()[:2]
+                self.address = f"tcp://{f'[{host}]' if ':' in host else host}:{port}"
+        except OSError as e:
+            self._error = OSError(f"Cannot listen on {self.address}: {e}")
+            self._ready.set()
+            loop.close()
+            return
+        self._ready.set()
+        try:
+            loop.run_forever()
+        finally:
+            server.close()
+            for task in asyncio.all_tasks(loop):
+                task.cancel()
+            loop.run_until_complete(asyncio.gather(*asyncio.all_tasks(loop), return_exceptions=True))
+            loop.close()
+            if self.kind == "unix" and os.path.exists(self.bind):
+                os.unlink(self.bind)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        peer = writer.get_extra_info("peername")
+        sensor = SensorStats(f"{peer[0]}:{peer[1]}" if isinstance(peer, tuple) else f"unix#{len(self.sensors) + 1}")
+        self.sensors.append(sensor)
+        self.active += 1
+        logger.info(f"Sensor {sensor.name} connected")
+        try:
+            endian, unit, linktype = parse_pcap_header(await reader.readexactly(24))
+            header = struct.Struct(endian + "IIII")
+            buffer = bytearray()
+            sampler: Optional[Sampler] = None
+            while not self._stop.is_set():
+                chunk = await reader.read(READ_CHUNK)
+                if not chunk:
+                    break
+                buffer += chunk
+                batch, used = [], 0
+                while len(buffer) - used >= 16:
+                    sec, frac, caplen, wirelen = header.unpack_from(buffer, used)
+                    if caplen > MAX_CAPLEN:
+                        raise ValueError(f"record of {caplen} bytes exceeds the snap length limit")
+                    if len(buffer) - used - 16 < caplen:
+                        break
+                    raw = bytes(buffer[used + 16:used + 16 + caplen])
+                    used += 16 + caplen
+                    if sampler is not None and not sampler.keep(raw, linktype):
+                        sensor.dropped_packets += 1
+                        sensor.dropped_bytes += wirelen
+                        sensor.sampled_packets += 1
+                        sensor.sampled_bytes += caplen
+                        continue
+                    batch.append((sec + frac * unit, raw, linktype, wirelen))
+                del buffer[:used]
+                if batch:
+                    sampler = await self._put(batch, sampler.rate if sampler is not None else 1, sensor, sampler)
+        except asyncio.IncompleteReadError:
+            pass
+        except (ValueError, ConnectionError) as e:
+            sensor.error = str(e)
+            logger.warning(f"Sensor {sensor.name}: {e}")
+        finally:
+            sensor.closed = time.time()
+            self.active -= 1
+            writer.close()
+            logger.info(f"Sensor {sensor.name} disconnected ({sensor.packets:,} packets, "
+                        f"{sensor.dropped_packets:,} dropped)")
+
+    async def _put(self, batch: List[Record], rate: int, sensor: SensorStats,
+                   sampler: Optional[Sampler]) -> Optional[Sampler]:
+        # Queues one batch, sampled 1 in `rate`, under the overload policy; returns the
+        # connection's sampler for the next batch, if any.
+        depth = self.queue.qsize()
+        if self.overload == "sample":
+            if sampler is None and depth >= self.high_water:
+                sampler = Sampler("flow", self.overload_rate, seed=len(self.sensors))
+                sensor.overloads += 1
+                logger.warning(f"Analysis is falling behind; sampling 1 in {self.overload_rate} conversations "
+                               f"from {sensor.name}")
+            elif sampler is not None and depth <= self.low_water:
+                sampler = None
+            try:
+                self.queue.put_nowait((rate, batch))
+            except queue.Full:
+                sensor.dropped_packets += len(batch)
+                sensor.dropped_bytes += sum(record[3] for record in batch)
+                return sampler
+        else:
+            blocked = time.perf_counter()
+            while True:
+                try:
+                    self.queue.put_nowait((rate, batch))
+                    break
+                except queue.Full:
+                    if self._stop.is_set():
+                        return sampler
+                    # Not reading lets the socket buffers fill, which throttles the sender.
+                    await asyncio.sleep(0.005)
+            sensor.blocked_s += time.perf_counter() - blocked
+        self.peak_queue = max(self.peak_queue, self.queue.qsize())
+        sensor.packets += len(batch)
+        sensor.bytes += sum(record[3] for record in batch)
+        return sampler
+
+    def _finished(self) -> bool:
+        if self._stop.is_set():
+            return True
+        if self.until_idle and self.sensors and not self.active:
+            return True
+        return bool(self.max_seconds) and time.monotonic() - self.started >= self.max_seconds
+
+    def stream(self) -> Iterator[Packet]:
+        prefilter, sampler = self.prefilter, self.sampler
+        weighted = self.overload == "sample"
+        layers = conf.l2types.num2layer
+        try:
+            while True:
+                try:
+                    rate, batch = self.queue.get(timeout=0.1)
+                except queue.Empty:
+                    if self._finished():
+                        return
+                    continue
+                for ts, raw, linktype, wirelen in batch:
+                    if prefilter is not None and not prefilter.keep(raw, linktype):
+                        yield FilteredRecord(ts, len(raw), rate)
+                        continue
+                    if sampler is not None and not sampler.keep(raw, linktype):
+                        continue
+                    try:
+                        pkt = layers.get(linktype, conf.raw_layer)(raw)
+                    except Exception:
+                        pkt = conf.raw_layer(raw)
+                    pkt.time = ts
+                    pkt.wirelen = wirelen
+                    if weighted:
+                        pkt.sample_weight = rate
+                    yield pkt
+        finally:
+            self.stop()
+            if self._thread is not None:
+                self._thread.join(timeout=5)
+
+    @property
+    def dropped_packets(self) -> int:
+        return sum(sensor.dropped_packets for sensor in self.sensors)
+
+    @property
+    def sampled_packets(self) -> int:
+        return sum(sensor.sampled_packets for sensor in self.sensors)
+
+    @property
+    def sampled_bytes(self) -> int:
+        return sum(sensor.sampled_bytes for sensor in self.sensors)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "address": self.address,
+            "overload": self.overload,
+            "overload_rate": self.overload_rate,
+            "queue_batches": self.queue.maxsize,
+            "peak_queue": self.peak_queue,
+            "packets": sum(sensor.packets for sensor in self.sensors),
+            "dropped_packets": self.dropped_packets,
+            "dropped_bytes": sum(sensor.dropped_bytes for sensor in self.sensors),
+            "sampled_packets": self.sampled_packets,
+            "sampled_bytes": self.sampled_bytes,
+            "sensors": [sensor.as_dict() for sensor in self.sensors],
+        }
@@ -0,0 +1,80 @@
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, Any, Iterable, Iterator, TypeVar
+
+T = TypeVar("T")
+
+
+class StageTimer:
+    def __init__(self):
+        self.wall: Dict[str, float] = defaultdict(float)
+        self.cpu: Dict[str, float] = defaultdict(float)
+        self.calls: Dict[str, int] = defaultdict(int)
+
+    def add(self, stage: str, seconds: float, cpu_seconds: float = 0.0, calls: int = 1) -> None:
+        self.wall[stage] += seconds
+        self.cpu[stage] += cpu_seconds
+        self.calls[stage] += calls
+
+    @contextmanager
+    def measure(self, stage: str):
+        start, cpu_start = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - start, time.process_time() - cpu_start)
+
+    def wrap_iter(self, stage: str, iterable: Iterable[T]) -> Iterator[T]:
+        # Charges the time spent producing each item (not consuming it) to `stage`.
+        iterator = iter(iterable)
+        perf_counter, process_time = time.perf_counter, time.process_time
+        wall, cpu, calls = self.wall, self.cpu, self.calls
+        while True:
+            start, cpu_start = perf_counter(), process_time()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                wall[stage] += perf_counter() - start
+                cpu[stage] += process_time() - cpu_start
+                return
+            wall[stage] += perf_counter() - start
+            cpu[stage] += process_time() - cpu_start
+            calls[stage] += 1
+            yield item
+
+    def reset(self) -> None:
+        self.wall.clear()
+        self.cpu.clear()
+        self.calls.clear()
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {stage: {"wall_s": self.wall[stage], "cpu_s": self.cpu[stage], "calls": self.calls[stage]}
+                for stage in self.wall}
+
+
+class ModelStats:
+    __slots__ = ("wall_s", "cpu_s", "windows", "packets", "detections", "state_size", "peak_state_size")
+
+    def __init__(self):
+        self.wall_s = 0.0
+        self.cpu_s = 0.0
+        self.windows = 0
+        self.packets = 0
+        self.detections = 0
+        self.state_size: Dict[str, int] = {}
+        self.peak_state_size: Dict[str, int] = {}
+
+    def record(self, wall_s: float, cpu_s: float, packets: int, detections: int, state_size: Dict[str, int]) -> None:
+        self.wall_s += wall_s
+        self.cpu_s += cpu_s
+        self.windows += 1
+        self.packets += packets
+        self.detections += detections
+        self.state_size = state_size
+        for key, size in state_size.items():
+            if size > self.peak_state_size.get(key, 0):
+                self.peak_state_size[key] = size
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {slot: getattr(self, slot) for slot in self.__slots__}
@@ -0,0 +1,94 @@
+import heapq
+import re
+from collections import defaultdict
+from operator import itemgetter
+from typing import Any, Dict, Iterator, List, Sequence, Tuple
+
+from loguru import logger
+
+# Approximate CPython sizes (measured with tracemalloc) used to estimate detector state. They
+# only need to be consistent across models so that the budget and the eviction order agree.
+ENTRY_BYTES = 100        # one dict slot with a short str key and a scalar or short str value
+SET_BYTES = 280          # empty set header
+SET_ITEM_BYTES = 75      # one int (e.g. a port) in a set, including the int object
+DEQUE_BYTES = 900        # deque header and first block
+DEQUE_ITEM_BYTES = 35    # one float in a deque, including the float object
+
+_SIZE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([kmgt]?)i?b?\s*$", re.IGNORECASE)
+_UNITS = {"": 1 << 20, "k": 1 << 10, "m": 1 << 20, "g": 1 << 30, "t": 1 << 40}
+
+
+def parse_size(text: str) -> int:
+    # "512M", "2G", "1.5GiB" -> bytes; a bare number is MiB.
+    match = _SIZE.match(str(text))
+    if not match:
+        raise ValueError(f"Invalid memory size '{text}' (expected e.g. 512M or 2G)")
+    return int(float(match.group(1)) * _UNITS[match.group(2).lower()])
+
+
+def _candidates(index: int, model: Any) -> Iterator[Tuple[float, int, Any, int]]:
+    # One model's entries, least recently active first, tagged with the model's position.
+    for last_active, key, size in sorted(model.eviction_candidates(), key=itemgetter(0)):
+        yield last_active, index, key, size
+
+
+class MemoryBudget:
+    # Caps the estimated cross-window state of all detectors together. When the total goes over
+    # the budget, entries are evicted least-recently-active first across every model (one global
+    # LRU order by last packet time) until the total is back under the low-water mark, so
+    # eviction runs in bursts rather than on every window.
+    def __init__(self, max_bytes: int, low_water: float = 0.8):
+        if max_bytes <= 0:
+            raise ValueError("Memory budget must be positive")
+        self.max_bytes = max_bytes
+        self.target_bytes = int(max_bytes * low_water)
+        self.current_bytes = 0
+        self.peak_bytes = 0
+        self.enforcements = 0
+        self.evicted_entries: Dict[str, int] = defaultdict(int)
+        self.evicted_bytes = 0
+        self.shortfalls = 0
+
+    def enforce(self, models: Sequence[Any], fixed_bytes: int = 0) -> int:
+        usage = fixed_bytes + sum(model.memory_usage() for model in models)
+        self.peak_bytes = max(self.peak_bytes, usage)
+        self.current_bytes = usage
+        if usage <= self.max_bytes:
+            return 0
+
+        self.enforcements += 1
+        needed = usage - self.target_bytes
+        streams = [_candidates(index, model) for index, model in enumerate(models)]
+        chosen: Dict[int, List[Any]] = defaultdict(list)
+        freed = 0
+        for _, index, key, size in heapq.merge(*streams, key=itemgetter(0, 1)):
+            chosen[index].append(key)
+            freed += size
+            if freed >= needed:
+                break
+
+        evicted = 0
+        for index, keys in chosen.items():
+            models[index].evict(keys)
+            self.evicted_entries[models[index].engine_name] += len(keys)
+            evicted += len(keys)
+        self.evicted_bytes += freed
+        self.current_bytes = usage - freed
+        if freed < needed:
+            if not self.shortfalls:
+                logger.warning(f"Memory budget of {self.max_bytes / 2**20:.0f} MiB is below the state that cannot "
+                               f"be evicted ({self.current_bytes / 2**20:.1f} MiB)")
+            self.shortfalls += 1
+        return evicted
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "budget_bytes": self.max_bytes,
+            "target_bytes": self.target_bytes,
+            "current_bytes": self.current_bytes,
+            "peak_bytes": self.peak_bytes,
+            "enforcements": self.enforcements,
+            "evicted_entries": dict(self.evicted_entries),
+            "evicted_bytes": self.evicted_bytes,
+            "shortfalls": self.shortfalls,
+        }
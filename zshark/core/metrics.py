@@ -0,0 +1,201 @@
+import bisect
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: LabelValues, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help_text, labelnames)
+        self.values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        self.values[key] = self.values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in list(self.values.items())]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels: str) -> None:
+        self.values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.series: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        series = self.series.get(key)
+        if series is None:
+            # Per-bucket (non-cumulative) counts, then +Inf, sum and count.
+            series = self.series[key] = [0.0] * (len(self.buckets) + 3)
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = []
+        for key, series in list(self.series.items()):
+            series = list(series)
+            cumulative = 0.0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-2]):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, ("le", _format_value(bound)))
+                lines.append(f"{self.name}_bucket{labels} {_format_value(cumulative)}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(series[-2])}")
+            lines.append(f"{self.name}_count{labels} {_format_value(series[-1])}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self.metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric):
+                    raise ValueError(f"Metric {metric.name} already registered as {existing.kind}")
+                return existing
+            self.metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help_text, labelnames))
+
+    def gauge(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, help_text, labelnames))
+
+    def histogram(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self.metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.header())
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class PipelineMetrics:
+    def __init__(self, registry: MetricsRegistry):
+        self.registry = registry
+        self.packets = registry.counter("zshark_packets_ingested_total", "Packets ingested into the window pipeline.")
+        self.bytes = registry.counter("zshark_bytes_ingested_total", "Bytes ingested into the window pipeline.")
+        self.windows = registry.counter("zshark_windows_processed_total", "Time windows fully processed by all models.")
+        self.packet_rate = registry.gauge("zshark_ingest_packets_per_second", "Packets per wall-clock second over the last window.")
+        self.lag = registry.gauge("zshark_window_lag_seconds",
+                                  "Wall-clock time elapsed minus packet time elapsed at the end of the last window "
+                                  "(positive means the pipeline is falling behind the capture).")
+        self.model_latency = registry.histogram("zshark_model_latency_seconds", "Per-window model analysis latency.", ("model",))
+        self.detections = registry.counter("zshark_detections_total", "Raw detections emitted by each model.", ("model",))
+        self.state = registry.gauge("zshark_model_state_entries", "Entries tracked in model state across windows.", ("model", "state"))
+        self.dropped = registry.counter("zshark_packets_dropped_total", "Packets dropped or skipped before analysis.", ("reason",))
+        self._run_start: Optional[float] = None
+        self._first_packet_time: Optional[float] = None
+        self._last_window_wall: Optional[float] = None
+
+    def start_run(self, first_packet_time: float) -> None:
+        self._run_start = self._last_window_wall = time.monotonic()
+        self._first_packet_time = first_packet_time
+
+    def record_window(self, packets: int, total_bytes: int, window_end_time: float) -> None:
+        now = time.monotonic()
+        self.packets.inc(packets)
+        self.bytes.inc(total_bytes)
+        self.windows.inc()
+        if self._last_window_wall is not None and now > self._last_window_wall:
+            self.packet_rate.set(packets / (now - self._last_window_wall))
+        self._last_window_wall = now
+        if self._run_start is not None and self._first_packet_time is not None:
+            self.lag.set((now - self._run_start) - (window_end_time - self._first_packet_time))
+
+    def record_model(self, engine_name: str, seconds: float, detections: int, state_size: Dict[str, int]) -> None:
+        self.model_latency.observe(seconds, model=engine_name)
+        if detections:
+            self.detections.inc(detections, model=engine_name)
+        for state, size in state_size.items():
+            self.state.set(size, model=engine_name, state=state)
+
+    def record_dropped(self, count: int, reason: str) -> None:
+        if count:
+            self.dropped.inc(count, reason=reason)
+
+
+def start_metrics_server(registry: MetricsRegistry, host: str = "127.0.0.1", port: int = 9108) -> ThreadingHTTPServer:
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/metrics", "/"):
+                self.send_error(404)
+                return
+            body = registry.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="zshark-metrics", daemon=True).start()
+    return server
@@ -0,0 +1,454 @@
+import queue
+import signal
+import socket
+import sys
+import time
+from array import array
+from collections import namedtuple
+from itertools import accumulate
+from multiprocessing import get_context, shared_memory
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from loguru import logger
+from scapy.config import conf
+from scapy.layers.dns import DNS
+from scapy.layers.inet import IP, TCP, UDP
+from scapy.layers.inet6 import IPv6
+from scapy.layers.l2 import ARP
+from scapy.packet import Packet
+
+from zshark.core.data_structures import ZSharkConfig
+from zshark.core.prefilter import PacketFilter
+from zshark.core.processor import FilteredRecord, PacketStreamer, PcapSource
+from zshark.core.sampling import Sampler
+
+# Packets per batch, and bytes of frames (reader -> parsers) per batch. A batch is cut at
+# whichever limit it reaches first; one frame is at most 64 KiB.
+BATCH_PACKETS = 1024
+HEAP_BYTES = 1 << 20
+# Longest DNS query name carried as a column value; longer ones go as raw frames.
+MAX_QNAME = 255
+
+RAW_COLUMNS = (("time", "d"), ("caplen", "I"), ("linktype", "H"), ("filtered", "B"))
+# Header fields the models, window statistics, top talkers and the cascade read. `src`/`dst`
+# hold the IPv4 (first 4 bytes) or IPv6 addresses; `extra` is the length of the record's heap
+# bytes: the DNS query name, or the whole frame for records sent raw.
+PARSED_COLUMNS = (("time", "d"), ("length", "I"), ("flags", "H"), ("proto", "B"), ("sport", "H"),
+                  ("dport", "H"), ("linktype", "H"), ("extra", "I"), ("src", "16s"), ("dst", "16s"),
+                  ("arp_op", "H"), ("arp_src", "4s"), ("arp_dst", "4s"), ("hwsrc", "6s"))
+
+F_FILTERED = 1
+# Header combinations the columns cannot describe exactly (tunnels, non-IPv4 ARP, odd field
+# values) are sent as raw frames and dissected again by the model stage.
+F_RAW = 2
+F_IP = 4
+F_IPV6 = 8
+F_TCP = 16
+F_UDP = 32
+F_ARP = 64
+F_DNS = 128
+F_DNS_RESPONSE = 256
+F_DNS_QUESTION = 512
+
+_ZERO16 = bytes(16)
+_ZERO6 = bytes(6)
+_ZERO4 = bytes(4)
+_IPHeader = namedtuple("_IPHeader", "src dst proto")
+_Ports = namedtuple("_Ports", "sport dport")
+_ARPHeader = namedtuple("_ARPHeader", "op psrc pdst hwsrc")
+_DNSHeader = namedtuple("_DNSHeader", "qr qd")
+_Question = namedtuple("_Question", "qname")
+
+
+class BatchLayout:
+    # Fixed offsets of the columns of one batch: `capacity` values per column, each column
+    # 8-byte aligned, followed by a heap of variable-length bytes.
+    def __init__(self, columns: Sequence[Tuple[str, str]], capacity: int, heap_bytes: int):
+        self.capacity = capacity
+        self.columns: List[Tuple[str, str, int, int]] = []
+        offset = 0
+        for name, code in columns:
+            width = int(code[:-1]) if code.endswith("s") else array(code).itemsize
+            self.columns.append((name, code, offset, width))
+            offset += (width * capacity + 7) & ~7
+        self.heap = offset
+        self.heap_bytes = heap_bytes
+        self.size = offset + heap_bytes
+
+    def write(self, buf: memoryview, columns: Sequence[Sequence[Any]], heap: bytes) -> None:
+        for (name, code, offset, width), values in zip(self.columns, columns):
+            data = b"".join(values) if code.endswith("s") else array(code, values).tobytes()
+            buf[offset:offset + len(data)] = data
+        buf[self.heap:self.heap + len(heap)] = heap
+
+    def read(self, buf: memoryview, count: int) -> Dict[str, Any]:
+        # Numeric columns as lists, fixed-width byte columns as one bytes object each.
+        out: Dict[str, Any] = {}
+        for name, code, offset, width in self.columns:
+            view = buf[offset:offset + width * count]
+            out[name] = bytes(view) if code.endswith("s") else view.cast(code).tolist()
+            view.release()
+        return out
+
+
+def _init_child(log_level: str) -> None:
+    # Ctrl-C is handled by the parent, which stops the pipeline in order.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    logger.remove()
+    logger.add(sys.stderr, level=log_level,
+               format="<green>{time:HH:mm:ss}</green> | {level} | {process.name} | {message}")
+
+
+def _reader_main(pcap_path: PcapSource, merge: bool, sampler: Optional[Sampler], prefilter: Optional[PacketFilter],
+                 shm_name: str, slot_size: int, raw: BatchLayout, free, work, done, parsers: int,
+                 log_level: str) -> None:
+    # Reads records and applies the packet filter and sampler (both depend on record order),
+    # then hands out batches of raw frames in sequence.
+    _init_child(log_level)
+    shm = shared_memory.SharedMemory(name=shm_name)
+    seq = 0
+    try:
+        streamer = PacketStreamer(pcap_path, merge=merge, sampler=sampler, prefilter=prefilter)
+        rows: List[Tuple[float, int, int, int]] = []
+        frames: List[bytes] = []
+        used = 0
+
+        def flush() -> None:
+            nonlocal seq, used
+            slot = free.get()
+            view = shm.buf[slot * slot_size:slot * slot_size + raw.size]
+            raw.write(view, list(zip(*rows)), b"".join(frames))
+            view.release()
+            work.put((seq, slot, len(rows)))
+            seq += 1
+            rows.clear()
+            frames.clear()
+            used = 0
+
+        for record in streamer.records():
+            if type(record) is FilteredRecord:
+                rows.append((record.time, record.size, 0, 1))
+            else:
+                ts, frame, linktype = record
+                if used + len(frame) > raw.heap_bytes:
+                    flush()
+                rows.append((ts, len(frame), linktype, 0))
+                frames.append(frame)
+                used += len(frame)
+            if len(rows) == raw.capacity:
+                flush()
+        if rows:
+            flush()
+        done.put(("end", seq, streamer.sampler, streamer.prefilter))
+    except Exception as e:
+        done.put(("error", str(e)))
+    finally:
+        for _ in range(parsers):
+            work.put(None)
+        shm.close()
+
+
+def _address(value: str, family: int, width: int) -> bytes:
+    return socket.inet_pton(family, value).ljust(width, b"\0")
+
+
+def _describe(pkt: Packet) -> Tuple[int, int, int, int, int, bytes, bytes, bytes, bytes, bytes, bytes]:
+    # Column values of one dissected packet, plus its DNS query name. Raises when the columns
+    # cannot describe the packet exactly.
+    flags = proto = sport = dport = arp_op = 0
+    src = dst = _ZERO16
+    arp_src = arp_dst = _ZERO4
+    hwsrc = _ZERO6
+    qname = b""
+    ip, ip6 = pkt.getlayer(IP), pkt.getlayer(IPv6)
+    if ip is not None and ip6 is not None:
+        raise ValueError("IP and IPv6 headers")
+    if ip is not None:
+        flags |= F_IP
+        proto = int(ip.proto)
+        src, dst = _address(ip.src, socket.AF_INET, 16), _address(ip.dst, socket.AF_INET, 16)
+    elif ip6 is not None:
+        flags |= F_IPV6
+        proto = int(ip6.nh)
+        src, dst = _address(ip6.src, socket.AF_INET6, 16), _address(ip6.dst, socket.AF_INET6, 16)
+    tcp, udp = pkt.getlayer(TCP), pkt.getlayer(UDP)
+    if tcp is not None and udp is not None:
+        raise ValueError("TCP and UDP headers")
+    transport = tcp if tcp is not None else udp
+    if transport is not None:
+        flags |= F_TCP if tcp is not None else F_UDP
+        sport, dport = int(transport.sport), int(transport.dport)
+    arp = pkt.getlayer(ARP)
+    if arp is not None:
+        if flags & (F_IP | F_IPV6):
+            raise ValueError("ARP and IP headers")
+        flags |= F_ARP
+        arp_op = int(arp.op)
+        arp_src, arp_dst = _address(arp.psrc, socket.AF_INET, 4), _address(arp.pdst, socket.AF_INET, 4)
+        hwsrc = bytes.fromhex(arp.hwsrc.replace(":", ""))
+        if len(hwsrc) != 6:
+            raise ValueError("hardware address length")
+    dns = pkt.getlayer(DNS)
+    if dns is not None:
+        flags |= F_DNS | (F_DNS_RESPONSE if dns.qr else 0)
+        if dns.qd is not None:
+            flags |= F_DNS_QUESTION
+            qname = getattr(dns.qd, "qname", None) or b""
+            if not isinstance(qname, bytes) or len(qname) > MAX_QNAME:
+                raise ValueError("query name")
+    return flags, proto, sport, dport, arp_op, src, dst, arp_src, arp_dst, hwsrc, qname
+
+
+def parse_batch(columns: Dict[str, Any], frames: memoryview, count: int) -> Tuple[List[tuple], bytes]:
+    # Dissects one batch of raw records into parsed rows (in PARSED_COLUMNS order) and their heap.
+    layers = conf.l2types.num2layer
+    rows: List[tuple] = []
+    heap: List[bytes] = []
+    offset = 0
+    times, caplens, linktypes, filtered = columns["time"], columns["caplen"], columns["linktype"], columns["filtered"]
+    for i in range(count):
+        ts, caplen, linktype = times[i], caplens[i], linktypes[i]
+        if filtered[i]:
+            rows.append((ts, caplen, F_FILTERED, 0, 0, 0, 0, 0, _ZERO16, _ZERO16, 0, _ZERO4, _ZERO4, _ZERO6))
+            continue
+        frame = bytes(frames[offset:offset + caplen])
+        offset += caplen
+        try:
+            pkt = layers.get(linktype, conf.raw_layer)(frame)
+        except Exception:
+            pkt = conf.raw_layer(frame)
+        try:
+            flags, proto, sport, dport, arp_op, src, dst, arp_src, arp_dst, hwsrc, qname = _describe(pkt)
+            length = len(pkt)
+            rows.append((ts, length, flags, proto, sport, dport, linktype, len(qname), src, dst, arp_op,
+                         arp_src, arp_dst, hwsrc))
+            if qname:
+                heap.append(qname)
+        except Exception:
+            rows.append((ts, caplen, F_RAW, 0, 0, 0, linktype, caplen, _ZERO16, _ZERO16, 0, _ZERO4, _ZERO4, _ZERO6))
+            heap.append(frame)
+    return rows, b"".join(heap)
+
+
+def _parser_main(config_json: str, shm_name: str, slot_size: int, raw: BatchLayout, parsed: BatchLayout,
+                 work, done, log_level: str) -> None:
+    _init_child(log_level)
+    # The model modules register the same Scapy layer bindings as in the model stage.
+    from zshark.models import load_models
+    load_models(ZSharkConfig.model_validate_json(config_json))
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        while True:
+            task = work.get()
+            if task is None:
+                return
+            seq, slot, count = task
+            base = slot * slot_size
+            source = shm.buf[base:base + raw.size]
+            frames = source[raw.heap:]
+            rows, heap = parse_batch(raw.read(source, count), frames, count)
+            frames.release()
+            source.release()
+            target = shm.buf[base + raw.size:base + raw.size + parsed.size]
+            parsed.write(target, list(zip(*rows)), heap)
+            target.release()
+            done.put(("batch", seq, slot, count))
+    except Exception as e:
+        done.put(("error", f"Parser failed: {e}"))
+    finally:
+        shm.close()
+
+
+class PacketView:
+    # Stands in for a dissected Scapy packet in the model stage. It carries the header fields
+    # read by the models, window statistics, top talkers and the cascade, and answers
+    # `layer in pkt`, pkt[layer], haslayer() and getlayer() for them.
+    __slots__ = ("time", "_length", "_layers")
+
+    def __init__(self, time: float, length: int, layers: Dict[type, Any]):
+        self.time = time
+        self._length = length
+        self._layers = layers
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __bool__(self) -> bool:
+        return True
+
+    def __contains__(self, layer: type) -> bool:
+        return layer in self._layers
+
+    def haslayer(self, layer: type) -> bool:
+        return layer in self._layers
+
+    def getlayer(self, layer: type) -> Any:
+        return self._layers.get(layer)
+
+    def __getitem__(self, layer: type) -> Any:
+        try:
+            return self._layers[layer]
+        except KeyError:
+            raise IndexError(f"Layer [{layer.__name__}] not found") from None
+
+
+class _AddressNames:
+    # Packed address -> text, cached: the same hosts recur in almost every batch.
+    def __init__(self, limit: int = 1 << 16):
+        self.limit = limit
+        self.names: Dict[bytes, str] = {}
+
+    def __call__(self, packed: bytes) -> str:
+        name = self.names.get(packed)
+        if name is None:
+            if len(self.names) >= self.limit:
+                self.names.clear()
+            name = self.names[packed] = socket.inet_ntop(socket.AF_INET if len(packed) == 4 else socket.AF_INET6,
+                                                         packed)
+        return name
+
+
+def packet_views(columns: Dict[str, Any], heap: memoryview, count: int,
+                 names: _AddressNames) -> List[Union[PacketView, FilteredRecord, Packet]]:
+    # The model stage's side of parse_batch.
+    layers = conf.l2types.num2layer
+    out: List[Union[PacketView, FilteredRecord, Packet]] = []
+    times, lengths, flag_values = columns["time"], columns["length"], columns["flags"]
+    protos, sports, dports, linktypes = columns["proto"], columns["sport"], columns["dport"], columns["linktype"]
+    src, dst, arp_ops = columns["src"], columns["dst"], columns["arp_op"]
+    arp_src, arp_dst, hwsrc = columns["arp_src"], columns["arp_dst"], columns["hwsrc"]
+    ends = list(accumulate(columns["extra"]))
+    for i in range(count):
+        flags, ts = flag_values[i], times[i]
+        if flags & F_FILTERED:
+            out.append(FilteredRecord(ts, lengths[i]))
+            continue
+        start = ends[i - 1] if i else 0
+        if flags & F_RAW:
+            frame = bytes(heap[start:ends[i]])
+            try:
+                pkt = layers.get(linktypes[i], conf.raw_layer)(frame)
+            except Exception:
+                pkt = conf.raw_layer(frame)
+            pkt.time = ts
+            out.append(pkt)
+            continue
+        found: Dict[type, Any] = {}
+        if flags & F_IP:
+            at = i * 16
+            found[IP] = _IPHeader(names(src[at:at + 4]), names(dst[at:at + 4]), protos[i])
+        elif flags & F_IPV6:
+            at = i * 16
+            found[IPv6] = _IPHeader(names(src[at:at + 16]), names(dst[at:at + 16]), protos[i])
+        if flags & F_TCP:
+            found[TCP] = _Ports(sports[i], dports[i])
+        elif flags & F_UDP:
+            found[UDP] = _Ports(sports[i], dports[i])
+        if flags & F_ARP:
+            at = i * 4
+            mac = hwsrc[i * 6:i * 6 + 6]
+            found[ARP] = _ARPHeader(arp_ops[i], names(arp_src[at:at + 4]), names(arp_dst[at:at + 4]),
+                                    ":".join(f"{byte:02x}" for byte in mac))
+        if flags & F_DNS:
+            question = _Question(bytes(heap[start:ends[i]])) if flags & F_DNS_QUESTION else None
+            found[DNS] = _DNSHeader(1 if flags & F_DNS_RESPONSE else 0, question)
+        out.append(PacketView(ts, lengths[i], found))
+    return out
+
+
+class ParallelStreamer:
+    # Staged replacement for PacketStreamer: a reader process reads records and applies the
+    # packet filter and sampler, `parsers` processes dissect batches of them, and stream()
+    # yields the results to the models in this process. Batches travel through a pool of
+    # shared-memory slots (raw frames in, fixed-layout header columns out); the queues only
+    # carry slot numbers. Batches are numbered by the reader and released in that order, so
+    # the model stage sees exactly the packet sequence PacketStreamer would produce.
+    def __init__(self, pcap_path: PcapSource, config: ZSharkConfig, parsers: int, merge: bool = False,
+                 sampler: Optional[Sampler] = None, prefilter: Optional[PacketFilter] = None,
+                 batch_packets: int = BATCH_PACKETS, heap_bytes: int = HEAP_BYTES, log_level: str = "WARNING"):
+        if parsers < 1:
+            raise ValueError("The pipeline needs at least one parser process")
+        self.source = pcap_path
+        self.pcap_paths = [pcap_path] if isinstance(pcap_path, str) else list(pcap_path)
+        self.pcap_path = self.pcap_paths[0]
+        self.config_json = config.model_dump_json()
+        self.parsers = parsers
+        self.merge = merge and len(self.pcap_paths) > 1
+        self.sampler = sampler
+        self.prefilter = prefilter
+        self.log_level = log_level
+        self.raw = BatchLayout(RAW_COLUMNS, batch_packets, heap_bytes)
+        # Every frame may come back whole, plus a query name per packet.
+        self.parsed = BatchLayout(PARSED_COLUMNS, batch_packets, heap_bytes + batch_packets * MAX_QNAME)
+        self.slots = 2 * parsers + 2
+        self.slot_size = self.raw.size + self.parsed.size
+        self.batches = 0
+        self.wait_s = 0.0
+
+    def stream(self) -> Iterator[Union[PacketView, FilteredRecord, Packet]]:
+        context = get_context("spawn")
+        shm = shared_memory.SharedMemory(create=True, size=self.slots * self.slot_size)
+        free, work, done = context.Queue(), context.Queue(), context.Queue()
+        for slot in range(self.slots):
+            free.put(slot)
+        processes = [context.Process(target=_reader_main, name="zshark-reader", daemon=True,
+                                     args=(self.source, self.merge, self.sampler, self.prefilter, shm.name,
+                                           self.slot_size, self.raw, free, work, done, self.parsers, self.log_level))]
+        processes += [context.Process(target=_parser_main, name=f"zshark-parser-{index}", daemon=True,
+                                      args=(self.config_json, shm.name, self.slot_size, self.raw, self.parsed,
+                                            work, done, self.log_level))
+                      for index in range(self.parsers)]
+        for process in processes:
+            process.start()
+        logger.info(f"Parsing in {self.parsers} process(es) with {self.slots} shared batch slots "
+                    f"of {self.slot_size / 2**20:.1f} MiB")
+        names = _AddressNames()
+        pending: Dict[int, Tuple[int, int]] = {}
+        expected = 0
+        total: Optional[int] = None
+        try:
+            while total is None or expected < total:
+                if expected in pending:
+                    slot, count = pending.pop(expected)
+                    base = slot * self.slot_size + self.raw.size
+                    view = shm.buf[base:base + self.parsed.size]
+                    heap = view[self.parsed.heap:]
+                    packets = packet_views(self.parsed.read(view, count), heap, count, names)
+                    heap.release()
+                    view.release()
+                    free.put(slot)
+                    expected += 1
+                    self.batches += 1
+                    yield from packets
+                    continue
+                waited = time.perf_counter()
+                try:
+                    message = done.get(timeout=1.0)
+                except queue.Empty:
+                    for process in processes:
+                        if process.exitcode not in (None, 0):
+                            raise RuntimeError(f"{process.name} exited with code {process.exitcode}")
+                    continue
+                finally:
+                    self.wait_s += time.perf_counter() - waited
+                if message[0] == "batch":
+                    pending[message[1]] = message[2:]
+                elif message[0] == "end":
+                    # The reader's filter and sampler hold the record counts.
+                    total, self.sampler, self.prefilter = message[1:]
+                else:
+                    raise RuntimeError(message[1])
+        finally:
+            for process in processes:
+                if process.is_alive():
+                    process.terminate()
+                process.join()
+            for channel in (free, work, done):
+                channel.cancel_join_thread()
+                channel.close()
+            shm.close()
+            shm.unlink()
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"parsers": self.parsers, "slots": self.slots, "batch_packets": self.raw.capacity,
+                "slot_bytes": self.slot_size, "batches": self.batches, "model_wait_s": self.wait_s}
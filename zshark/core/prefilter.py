@@ -0,0 +1,202 @@
+import ipaddress
+import re
+from typing import Any, Callable, Dict, List, Optional
+
+from zshark.core.headers import (ETH_P_ARP, ETH_P_IP, ETH_P_IPV6, IPPROTO_TCP, IPPROTO_UDP, HeaderSummary,
+                                 summarize)
+
+Predicate = Callable[[HeaderSummary], bool]
+
+# Filter grammar, a subset of BPF:
+#   expr      := term ("or" term)*
+#   term      := factor ("and" factor)*
+#   factor    := "not" factor | "(" expr ")" | primitive
+#   primitive := ip | ip6 | arp | tcp | udp | icmp | icmp6 | [ip] proto N
+#              | [src|dst] host ADDR | [src|dst] net CIDR
+#              | [src|dst] port N | [src|dst] portrange N-M
+# "&&", "||" and "!" are accepted for and/or/not.
+_TOKEN = re.compile(r"\s*(\(|\)|&&|\|\||!|[^\s()!&|]+)")
+_ALIASES = {"&&": "and", "||": "or", "!": "not"}
+_PROTOCOLS = {
+    "ip": lambda h: h.ethertype == ETH_P_IP,
+    "ip6": lambda h: h.ethertype == ETH_P_IPV6,
+    "arp": lambda h: h.ethertype == ETH_P_ARP,
+    "tcp": lambda h: h.proto == IPPROTO_TCP,
+    "udp": lambda h: h.proto == IPPROTO_UDP,
+    "icmp": lambda h: h.proto == 1 and h.ethertype == ETH_P_IP,
+    "icmp6": lambda h: h.proto == 58 and h.ethertype == ETH_P_IPV6,
+}
+
+
+def _tokenize(expression: str) -> List[str]:
+    tokens = []
+    position = 0
+    expression = expression.strip()
+    while position < len(expression):
+        match = _TOKEN.match(expression, position)
+        if match is None:
+            raise ValueError(f"Invalid packet filter near '{expression[position:]}'")
+        token = match.group(1)
+        tokens.append(_ALIASES.get(token, token.lower()))
+        position = match.end()
+    return tokens
+
+
+def _port(value: str) -> int:
+    if not value.isdigit() or int(value) > 0xFFFF:
+        raise ValueError(f"Invalid port in packet filter: '{value}'")
+    return int(value)
+
+
+def _directed(direction: Optional[str], test: Callable[[Any], bool], src: str, dst: str) -> Predicate:
+    if direction == "src":
+        return lambda h: test(getattr(h, src))
+    if direction == "dst":
+        return lambda h: test(getattr(h, dst))
+    return lambda h: test(getattr(h, src)) or test(getattr(h, dst))
+
+
+def _either(first: Predicate, second: Predicate) -> Predicate:
+    return lambda h: first(h) or second(h)
+
+
+def _both(first: Predicate, second: Predicate) -> Predicate:
+    return lambda h: first(h) and second(h)
+
+
+class _Parser:
+    def __init__(self, expression: str):
+        self.tokens = _tokenize(expression)
+        self.position = 0
+
+    def peek(self) -> Optional[str]:
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def take(self) -> str:
+        token = self.peek()
+        if token is None:
+            raise ValueError("Packet filter ends unexpectedly")
+        self.position += 1
+        return token
+
+    def parse(self) -> Predicate:
+        predicate = self.expr()
+        if self.peek() is not None:
+            raise ValueError(f"Unexpected '{self.peek()}' in packet filter")
+        return predicate
+
+    def expr(self) -> Predicate:
+        predicate = self.term()
+        while self.peek() == "or":
+            self.take()
+            predicate = _either(predicate, self.term())
+        return predicate
+
+    def term(self) -> Predicate:
+        predicate = self.factor()
+        while self.peek() == "and":
+            self.take()
+            predicate = _both(predicate, self.factor())
+        return predicate
+
+    def factor(self) -> Predicate:
+        token = self.take()
+        if token == "not":
+            inner = self.factor()
+            return lambda h: not inner(h)
+        if token == "(":
+            inner = self.expr()
+            if self.take() != ")":
+                raise ValueError("Missing ')' in packet filter")
+            return inner
+        return self.primitive(token)
+
+    def primitive(self, token: str) -> Predicate:
+        direction = None
+        if token in ("src", "dst"):
+            direction, token = token, self.take()
+        if token == "ip" and self.peek() == "proto" and direction is None:
+            token = self.take()
+        if token in _PROTOCOLS and direction is None:
+            return _PROTOCOLS[token]
+        if token == "proto" and direction is None:
+            value = self.take()
+            if not value.isdigit() or int(value) > 255:
+                raise ValueError(f"Invalid protocol number in packet filter: '{value}'")
+            number = int(value)
+            return lambda h: h.proto == number
+        if token == "host":
+            value = self.take()
+            try:
+                address = ipaddress.ip_address(value).packed
+            except ValueError:
+                raise ValueError(f"Invalid host address in packet filter: '{value}'") from None
+            return _directed(direction, lambda a: a == address, "src", "dst")
+        if token == "net":
+            value = self.take()
+            try:
+                network = ipaddress.ip_network(value, strict=False)
+            except ValueError:
+                raise ValueError(f"Invalid network in packet filter: '{value}'") from None
+            size = len(network.network_address.packed)
+            prefix = int(network.network_address)
+            mask = int(network.netmask)
+            return _directed(direction, lambda a: len(a) == size and int.from_bytes(a, "big") & mask == prefix,
+                             "src", "dst")
+        if token == "port":
+            number = _port(self.take())
+            return _directed(direction, lambda p: p == number, "sport", "dport")
+        if token == "portrange":
+            low, _, high = self.take().partition("-")
+            first, last = _port(low), _port(high)
+            return _directed(direction, lambda p: p is not None and first <= p <= last, "sport", "dport")
+        raise ValueError(f"Unknown packet filter primitive '{token}'")
+
+
+def compile_filter(expression: str) -> Predicate:
+    if not expression.strip():
+        raise ValueError("Packet filter is empty")
+    return _Parser(expression).parse()
+
+
+class PacketFilter:
+    # Matches raw records on their link/IP/transport headers, so records no model needs
+    # are skipped without Scapy dissection. Every record is counted, matched or not.
+    def __init__(self, expression: str):
+        self.expression = expression
+        self._match = compile_filter(expression)
+        self.packets_seen = 0
+        self.bytes_seen = 0
+        self.packets_matched = 0
+        self.bytes_matched = 0
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # The compiled predicate is a closure tree; checkpoints store the expression instead.
+        state = dict(self.__dict__)
+        del state["_match"]
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._match = compile_filter(self.expression)
+
+    def matches(self, raw: bytes, linktype: int) -> bool:
+        return self._match(summarize(raw, linktype))
+
+    def keep(self, raw: bytes, linktype: int) -> bool:
+        self.packets_seen += 1
+        self.bytes_seen += len(raw)
+        if self._match(summarize(raw, linktype)):
+            self.packets_matched += 1
+            self.bytes_matched += len(raw)
+            return True
+        return False
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "expression": self.expression,
+            "packets_seen": self.packets_seen,
+            "bytes_seen": self.bytes_seen,
+            "packets_matched": self.packets_matched,
+            "bytes_matched": self.bytes_matched,
+        }
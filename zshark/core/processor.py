@@ -1,103 +1,563 @@
-from scapy.all import PcapReader, Packet
-from typing import Iterator, List, Dict, Any, Tuple, Optional
+from scapy.config import conf
+from scapy.data import MTU
+from scapy.packet import Packet
+from scapy.utils import PcapReader, PcapNgReader, EDecimal
+from typing import Iterator, List, Dict, Any, Tuple, Optional, Iterable, Sequence, Union
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from decimal import Decimal
+import heapq
+import os
+import stat
+import time
 from loguru import logger
-from zshark.core.utils import calculate_window_stats
-from zshark.core.data_structures import ZSharkConfig, AnalysisResult, Detection, WindowStats
-from zshark.models import load_models
+from zshark.core.instrumentation import StageTimer, ModelStats
+from zshark.core.memory import MemoryBudget
+from zshark.core.metrics import MetricsRegistry, PipelineMetrics
+from zshark.core.checkpoint import load_checkpoint, save_checkpoint
+from zshark.core.baseline import load_baseline
+from zshark.core.cascade import CascadeScheduler, model_tier, resolve_profile
+from zshark.core.scoring import FusionEngine
+from zshark.core.sketches import HeavyHitters, top_counts
+from zshark.core.prefilter import PacketFilter, compile_filter
+from zshark.core.sampling import Sampler
+from zshark.core.utils import calculate_window_stats, ALL_FEATURES, REPORT_FEATURES
+from zshark.core.data_structures import ZSharkConfig, AnalysisResult
+from zshark.core.records import DetectionRecord, WindowRecord
+from zshark.models import load_models, packet_filter, required_features
+from zshark.models.base import BaseDetectionModel
 from collections import defaultdict
 from scapy.layers.inet import IP, TCP, UDP
 
+PcapSource = Union[str, Sequence[str]]
+
+
+def is_stream(path: str) -> bool:
+    # Named pipes and other non-seekable inputs (e.g. /dev/stdin) can only be read once, as they arrive.
+    try:
+        return not stat.S_ISREG(os.stat(path).st_mode)
+    except OSError:
+        return False
+
+
+def _open_capture(path: str) -> PcapReader:
+    if is_stream(path):
+        # Scapy probes a path for gzip first, which would consume the head of a stream.
+        return PcapReader(open(path, "rb"))
+    reader = PcapReader(path)
+    try:
+        # Ask the kernel to start reading the file ahead of the parser.
+        os.posix_fadvise(reader.f.fileno(), 0, 0, os.POSIX_FADV_WILLNEED)
+    except (AttributeError, OSError, ValueError):
+        pass
+    return reader
+
+
+def _packet_time(pkt: Packet) -> float:
+    return float(pkt.time)
+
+
+def _raw_record_time(record: Union[Tuple[float, bytes, int], "FilteredRecord"]) -> float:
+    return record.time if type(record) is FilteredRecord else record[0]
+
+
+def _read_records(reader: PcapReader) -> Iterator[Tuple[bytes, int, Any]]:
+    # Raw (bytes, linktype, metadata) records, without Scapy dissection.
+    ng = isinstance(reader, PcapNgReader)
+    while True:
+        try:
+            record = reader._read_packet(MTU)
+        except EOFError:
+            return
+        if record is None:
+            return
+        raw, info = record
+        yield raw, (info[0] if ng else reader.linktype), info
+
+
+def _record_time(reader: PcapReader, info: Any) -> EDecimal:
+    if isinstance(reader, PcapNgReader):
+        _, tsresol, tshigh, tslow = info[:4]
+        return EDecimal((tshigh << 32) + tslow) / tsresol
+    power = Decimal(10) ** Decimal(-9 if reader.nano else -6)
+    return EDecimal(info.sec + power * info.usec)
+
+
+def _dissect(reader: PcapReader, raw: bytes, linktype: int, info: Any) -> Packet:
+    # Same result as PcapReader.read_packet, for records that were already read raw.
+    cls = conf.l2types.num2layer.get(linktype) if isinstance(reader, PcapNgReader) else reader.LLcls
+    try:
+        pkt = cls(raw)
+    except KeyboardInterrupt:
+        raise
+    except Exception:
+        pkt = conf.raw_layer(raw)
+    pkt.time = _record_time(reader, info)
+    pkt.wirelen = info.wirelen
+    return pkt
+
+
+class FilteredRecord:
+    # Stands in for a record the packet filter skipped: it keeps window boundaries and
+    # volume counters exact but is never passed to the models.
+    __slots__ = ("time", "size", "sample_weight")
+
+    def __init__(self, time: float, size: int, sample_weight: int = 1):
+        self.time = time
+        self.size = size
+        self.sample_weight = sample_weight
+
+
+def first_packet_time(path: str) -> float:
+    reader = PcapReader(path)
+    try:
+        pkt = next(iter(reader), None)
+        return float(pkt.time) if pkt is not None else float("inf")
+    finally:
+        reader.close()
+
+
+def order_captures(paths: Sequence[str]) -> List[str]:
+    # Rotated files are ordered by their first packet, not by name (file10 < file2).
+    return sorted(paths, key=first_packet_time)
+
+
 class PacketStreamer:
-    def __init__(self, pcap_path: str):
-        self.pcap_path = pcap_path
+    def __init__(self, pcap_path: PcapSource, start_offset: int = 0, track_offsets: bool = False,
+                 start_file: int = 0, merge: bool = False, sampler: Optional[Sampler] = None,
+                 prefilter: Optional[PacketFilter] = None):
+        self.pcap_paths = [pcap_path] if isinstance(pcap_path, str) else list(pcap_path)
+        self.merge = merge and len(self.pcap_paths) > 1
+        if self.merge and (track_offsets or start_offset or start_file):
+            raise ValueError("Checkpoints are not supported when merging captures")
+        self.pcap_path = self.pcap_paths[0]
+        self.start_offset = start_offset
+        self.start_file = start_file
+        self.track_offsets = track_offsets
+        self.sampler = sampler
+        self.prefilter = prefilter
+        # Position of the most recently yielded packet record (only with track_offsets).
+        self.file_index = start_file
+        self.offset = start_offset
 
     def stream(self) -> Iterator[Packet]:
+        if self.merge:
+            yield from self._merged_stream()
+            return
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="zshark-prefetch") as prefetch:
+            pending = prefetch.submit(_open_capture, self.pcap_paths[self.start_file])
+            for index in range(self.start_file, len(self.pcap_paths)):
+                path = self.pcap_paths[index]
+                try:
+                    reader = pending.result()
+                    # Open the next file in the background while this one is consumed.
+                    if index + 1 < len(self.pcap_paths):
+                        pending = prefetch.submit(_open_capture, self.pcap_paths[index + 1])
+                    logger.info(f"Starting to stream packets from: {path}")
+                    yield from self._stream_file(reader, index)
+                except Exception as e:
+                    logger.error(f"Error reading PCAP file {path}: {e}")
+                    raise
+
+    def _merged_stream(self) -> Iterator[Packet]:
+        # k-way merge by timestamp: one open reader and one pending packet per input.
+        readers = []
         try:
-            logger.info(f"Starting to stream packets from: {self.pcap_path}")
-            for pkt in PcapReader(self.pcap_path):
-                yield pkt
+            for path in self.pcap_paths:
+                logger.info(f"Merging packets from: {path}")
+                readers.append(_open_capture(path))
+            inputs = readers if not self._selective else [self._admitted(reader) for reader in readers]
+            yield from heapq.merge(*inputs, key=_packet_time)
         except Exception as e:
-            logger.error(f"Error reading PCAP file {self.pcap_path}: {e}")
+            logger.error(f"Error merging PCAP files {', '.join(self.pcap_paths)}: {e}")
             raise
+        finally:
+            for reader in readers:
+                reader.close()
+
+    @property
+    def _selective(self) -> bool:
+        return self.sampler is not None or self.prefilter is not None
+
+    def records(self) -> Iterator[Union[Tuple[float, bytes, int], FilteredRecord]]:
+        # The records stream() would yield, in the same order, as (time, frame, linktype) without
+        # dissection; zshark.core.pipeline dissects them in parser processes.
+        readers = []
+        try:
+            if self.merge:
+                readers = [_open_capture(path) for path in self.pcap_paths]
+                yield from heapq.merge(*(self._raw_records(reader) for reader in readers), key=_raw_record_time)
+                return
+            for path in self.pcap_paths:
+                readers = [_open_capture(path)]
+                logger.info(f"Starting to stream packets from: {path}")
+                yield from self._raw_records(readers[0])
+                readers[0].close()
+        except Exception as e:
+            logger.error(f"Error reading PCAP file(s) {', '.join(self.pcap_paths)}: {e}")
+            raise
+        finally:
+            for reader in readers:
+                reader.close()
+
+    def _raw_records(self, reader: PcapReader) -> Iterator[Union[Tuple[float, bytes, int], FilteredRecord]]:
+        if self._selective:
+            yield from self._admitted(reader, dissect=False)
+            return
+        for raw, linktype, info in _read_records(reader):
+            yield float(_record_time(reader, info)), raw, linktype
+
+    def _admitted(self, reader: PcapReader, resumed: bool = False,
+                  dissect: bool = True) -> Iterator[Union[Packet, FilteredRecord]]:
+        # Only records that pass the packet filter and the sampler are dissected. Filtered
+        # records become FilteredRecord placeholders; unsampled ones are dropped.
+        prefilter, sampler = self.prefilter, self.sampler
+        tell = reader.f.tell
+        offset = tell()
+        for raw, linktype, info in _read_records(reader):
+            if resumed:
+                # The record a checkpoint resumes at was already counted; repeat its outcome.
+                resumed = False
+                matched = prefilter is None or prefilter.matches(raw, linktype)
+                kept = True
+            else:
+                matched = prefilter is None or prefilter.keep(raw, linktype)
+                kept = matched and (sampler is None or sampler.keep(raw, linktype))
+            if not matched:
+                self.offset = offset
+                yield FilteredRecord(float(_record_time(reader, info)), len(raw))
+            elif kept:
+                self.offset = offset
+                yield (_dissect(reader, raw, linktype, info) if dissect
+                       else (float(_record_time(reader, info)), raw, linktype))
+            offset = tell()
+
+    def _stream_file(self, reader: PcapReader, index: int) -> Iterator[Packet]:
+        try:
+            resumed = index == self.start_file and self.start_offset > 0
+            if resumed:
+                if isinstance(reader, PcapNgReader):
+                    raise ValueError("Resuming at a file offset is only supported for classic pcap files")
+                reader.f.seek(self.start_offset)
+            if self._selective:
+                self.file_index = index
+                yield from self._admitted(reader, resumed)
+                return
+            if not self.track_offsets:
+                yield from reader
+                return
+            self.file_index = index
+            tell = reader.f.tell
+            next_offset = tell()
+            for pkt in reader:
+                self.offset = next_offset
+                next_offset = tell()
+                yield pkt
+        finally:
+            reader.close()
 
 class WindowProcessor:
-    def __init__(self, config: ZSharkConfig):
+    def __init__(self, config: ZSharkConfig, features: Optional[Iterable[str]] = None, timer: Optional[StageTimer] = None):
         self.window_size = config.models.get("ddos_volume", ZSharkConfig.default().models["ddos_volume"]).window_size_s
+        self.reorder_window = config.reorder_window_s
+        self.reorder_max_packets = config.reorder_max_packets
+        self.sample_rate = config.sampling_rate if config.sampling_mode != "none" else 1
+        self.features = None if features is None else frozenset(features)
+        self.timer = timer
         self.current_window: List[Packet] = []
         self.window_start_time: Optional[float] = None
+        self.window_last_time: Optional[float] = None
+        # Records of the current window skipped by the packet filter (counted, not dissected).
+        self.filtered_packets = 0
+        self.filtered_bytes = 0
+        # Set when records carry a `sample_weight` (SocketIngest overload sampling): each one stands
+        # for that many records, and the estimated remainder is added to the window rates.
+        self.weighted = False
+        self.sampled_packets = 0.0
+        self.sampled_bytes = 0.0
+        self.sampled_windows = 0
+        self.skipped_packets = 0
+        self.late_packets = 0
+        self.exhausted = False
+
+    def _reorder(self, packet_stream: Iterator[Packet]) -> Iterator[Packet]:
+        # Holds packets until they are reorder_window seconds older than the newest one seen,
+        # then releases them in timestamp order. Packets older than the last released one are late.
+        heap: List[Tuple[float, int, Packet]] = []
+        newest = released = float("-inf")
+        for seq, pkt in enumerate(packet_stream):
+            try:
+                pkt_time = float(pkt.time)
+            except Exception:
+                self.skipped_packets += 1
+                continue
+            if pkt_time < released:
+                self.late_packets += 1
+                continue
+            heapq.heappush(heap, (pkt_time, seq, pkt))
+            newest = max(newest, pkt_time)
+            horizon = newest - self.reorder_window
+            while heap and (heap[0][0] <= horizon or len(heap) > self.reorder_max_packets):
+                released, _, ready = heapq.heappop(heap)
+                yield ready
+        while heap:
+            yield heapq.heappop(heap)[2]
+
+    def _build_stats(self) -> WindowRecord:
+        start, cpu_start = time.perf_counter(), time.process_time()
+        stats_dict = calculate_window_stats(self.current_window, self.features, self.sample_rate,
+                                            filtered=(self.filtered_packets, self.filtered_bytes),
+                                            span=(self.window_start_time, self.window_last_time),
+                                            sampled=(self.sampled_packets, self.sampled_bytes))
+        if self.sampled_packets:
+            self.sampled_windows += 1
+        # The window spans [start, start + window size), not just its first and last packet.
+        del stats_dict['start_time'], stats_dict['end_time']
+        stats = WindowRecord(self.window_start_time, self.window_start_time + self.window_size, **stats_dict)
+        if self.timer is not None:
+            self.timer.add("window_stats", time.perf_counter() - start, time.process_time() - cpu_start)
+        return stats
+
+    def process_stream(self, packet_stream: Iterator[Packet]) -> Iterator[Tuple[WindowRecord, List[Packet]]]:
+        self.current_window = []
+        self.window_start_time = None
+        self.window_last_time = None
+        self.filtered_packets = self.filtered_bytes = 0
+        self.sampled_packets = self.sampled_bytes = 0.0
+        self.sampled_windows = 0
+        self.skipped_packets = 0
+        self.late_packets = 0
+        self.exhausted = False
+        if self.reorder_window > 0:
+            packet_stream = self._reorder(packet_stream)
 
-    def process_stream(self, packet_stream: Iterator[Packet]) -> Iterator[Tuple[WindowStats, List[Packet]]]:
         for pkt in packet_stream:
             try:
                 pkt_time = float(pkt.time)
             except Exception:
+                self.skipped_packets += 1
                 continue
 
             if self.window_start_time is None:
                 self.window_start_time = pkt_time
 
             if pkt_time >= self.window_start_time + self.window_size:
-                if self.current_window:
-                    stats_dict = calculate_window_stats(self.current_window)
-                    stats_dict['start_time'] = datetime.fromtimestamp(self.window_start_time).isoformat()
-                    stats_dict['end_time'] = datetime.fromtimestamp(self.window_start_time + self.window_size).isoformat()
-                    
-                    stats = WindowStats(**stats_dict)
-                    yield (stats, self.current_window)
-
-                self.current_window = [pkt]
+                if self.current_window or self.filtered_packets:
+                    yield (self._build_stats(), self.current_window)
+
+                self.current_window = []
+                self.filtered_packets = self.filtered_bytes = 0
+                self.sampled_packets = self.sampled_bytes = 0.0
                 self.window_start_time = pkt_time
+
+            self.window_last_time = pkt_time
+            if type(pkt) is FilteredRecord:
+                self.filtered_packets += 1
+                self.filtered_bytes += pkt.size
+                if self.weighted and pkt.sample_weight > 1:
+                    self.sampled_packets += pkt.sample_weight - 1
+                    self.sampled_bytes += (pkt.sample_weight - 1) * pkt.size
             else:
                 self.current_window.append(pkt)
+                if self.weighted and pkt.sample_weight > 1:
+                    # The configured sampler runs after overload sampling, so the two rates multiply.
+                    extra = (pkt.sample_weight - 1) * self.sample_rate
+                    self.sampled_packets += extra
+                    self.sampled_bytes += extra * len(pkt)
 
-        if self.current_window and self.window_start_time is not None:
-            stats_dict = calculate_window_stats(self.current_window)
-            stats_dict['start_time'] = datetime.fromtimestamp(self.window_start_time).isoformat()
-            stats_dict['end_time'] = datetime.fromtimestamp(self.window_start_time + self.window_size).isoformat()
-            stats = WindowStats(**stats_dict)
-            yield (stats, self.current_window)
+        self.exhausted = True
+        if (self.current_window or self.filtered_packets) and self.window_start_time is not None:
+            yield (self._build_stats(), self.current_window)
 
 class Analyzer:
-    def __init__(self, config: ZSharkConfig):
+    def __init__(self, config: ZSharkConfig, metrics: Optional[MetricsRegistry] = None):
         self.config = config
-        self.window_processor = WindowProcessor(config)
-        self.detection_models = load_models(config)
+        extra_features = REPORT_FEATURES if config.features is None else config.features
+        unknown = set(extra_features) - ALL_FEATURES
+        if unknown:
+            raise ValueError(f"Unknown window features requested: {', '.join(sorted(unknown))}")
+        self.baseline = load_baseline(config.baseline_path) if config.baseline_path else None
+        self.detection_models = self._load_models()
+        self.features = required_features(self.detection_models, extra_features)
+        self.timer = StageTimer()
+        self.window_processor = WindowProcessor(config, self.features, self.timer)
+        self.packet_filter = self._resolve_packet_filter(config.packet_filter)
+        self.cascade_every, self.cascade_hold_s = resolve_profile(config)
+        self.metrics = PipelineMetrics(metrics) if metrics is not None else None
+        self.models_restored = False
+
+    def _load_models(self) -> List[BaseDetectionModel]:
+        models = load_models(self.config)
+        if self.baseline is not None:
+            for model in models:
+                if hasattr(model, 'load_baseline'):
+                    model.load_baseline(self.baseline)
+        return models
+
+    def _resolve_packet_filter(self, setting: str) -> Optional[str]:
+        if setting == "auto":
+            # Window features describe all traffic, so only skip packets when none are computed.
+            return None if self.features else packet_filter(self.detection_models)
+        if setting.strip().lower() in ("", "none"):
+            return None
+        compile_filter(setting)
+        return setting
+
+    def reset(self) -> None:
+        # Fresh model state for an unrelated capture; model modules stay imported.
+        self.detection_models = self._load_models()
+        self.timer.reset()
+        self.models_restored = False
+
+    def snapshot_models(self) -> Dict[str, Any]:
+        return {model.engine_name: model.snapshot() for model in self.detection_models}
+
+    def restore_models(self, states: Dict[str, Any]) -> int:
+        restored = 0
+        for model in self.detection_models:
+            if model.engine_name in states:
+                model.restore(states[model.engine_name])
+                restored += 1
+        # Restored histories already hold a baseline, so skip the global baseline pass.
+        self.models_restored = self.models_restored or restored > 0
+        return restored
     
-    def get_global_baseline(self, pcap_path: str) -> float:
-        streamer = PacketStreamer(pcap_path)
+    @staticmethod
+    def _count_talkers(window_packets: List[Packet], weighted: bool = False) -> Tuple[Dict, Dict, Dict, Dict]:
+        # Exact counts for one window only; they are folded into the sketches afterwards.
+        # With `weighted`, a packet kept by overload sampling counts for its sample_weight.
+        src_packets, src_bytes = defaultdict(int), defaultdict(int)
+        port_packets, port_bytes = defaultdict(int), defaultdict(int)
+        for pkt in window_packets:
+            weight = pkt.sample_weight if weighted else 1
+            size = len(pkt) * weight
+            if IP in pkt:
+                ip_src = pkt[IP].src
+                src_packets[ip_src] += weight
+                src_bytes[ip_src] += size
+            if TCP in pkt:
+                port_dst = pkt[TCP].dport
+                port_packets[port_dst] += weight
+                port_bytes[port_dst] += size
+            elif UDP in pkt:
+                port_dst = pkt[UDP].dport
+                port_packets[port_dst] += weight
+                port_bytes[port_dst] += size
+        return src_packets, src_bytes, port_packets, port_bytes
+
+    def get_global_baseline(self, pcap_path: PcapSource) -> float:
+        # Only record headers are needed: count and time span, no dissection and no sampling.
+        paths = [pcap_path] if isinstance(pcap_path, str) else list(pcap_path)
+        # Every record counts, filtered or not, as in the window packet rates it is compared against.
         packet_count = 0
         start_time = None
         end_time = None
-        
-        for pkt in streamer.stream():
+
+        for path in paths:
+            reader = _open_capture(path)
             try:
-                ts = float(pkt.time)
-                if start_time is None: start_time = ts
-                end_time = ts
-                packet_count += 1
-            except:
-                continue
-            
+                for _, _, info in _read_records(reader):
+                    ts = float(_record_time(reader, info))
+                    start_time = ts if start_time is None else min(start_time, ts)
+                    end_time = ts if end_time is None else max(end_time, ts)
+                    packet_count += 1
+            finally:
+                reader.close()
+
         if start_time and end_time and end_time > start_time:
             duration = end_time - start_time
             return packet_count / duration
         return 0.0
 
-    def analyze_pcap(self, pcap_path: str) -> AnalysisResult:
-        global_avg_pps = self.get_global_baseline(pcap_path)
-        
-        for model in self.detection_models:
-            if hasattr(model, 'set_global_baseline'):
+    def analyze_pcap(self, pcap_path: PcapSource, checkpoint_path: Optional[str] = None,
+                     checkpoint_interval_s: float = 60.0, resume: bool = False, merge: bool = False,
+                     ingest=None) -> AnalysisResult:
+        # `ingest` (zshark.core.ingest.SocketIngest) replaces the file reader with live sensor feeds.
+        if checkpoint_path and self.window_processor.reorder_window > 0:
+            raise ValueError("Checkpoints are not supported together with a reorder window")
+        streaming = ingest is not None or any(
+            is_stream(path) for path in ([pcap_path] if isinstance(pcap_path, str) else pcap_path))
+        if checkpoint_path and streaming:
+            raise ValueError("Checkpoints need a capture file; a stream cannot be resumed")
+        if checkpoint_path and self.config.parallel_workers > 1:
+            raise ValueError("Checkpoints are not supported together with parallel parsing")
+        timer = self.timer
+        timer.reset()
+        model_stats = {model.engine_name: ModelStats() for model in self.detection_models}
+        run_start, run_cpu_start = time.perf_counter(), time.process_time()
+
+        checkpoint = None
+        if resume and checkpoint_path and os.path.exists(checkpoint_path):
+            checkpoint = load_checkpoint(checkpoint_path, pcap_path, self.config)
+            self.restore_models(checkpoint["models"])
+            logger.info(f"Resuming from checkpoint {checkpoint_path} ({checkpoint['total_packets']} packets, "
+                        f"{len(checkpoint['window_stats'])} windows done)")
+
+        sampler = checkpoint["sampler"] if checkpoint else Sampler.from_config(self.config)
+        budget = checkpoint["memory"] if checkpoint else (
+            MemoryBudget(self.config.max_memory_bytes) if self.config.max_memory_bytes > 0 else None)
+        cascade = checkpoint["cascade"] if checkpoint else (
+            CascadeScheduler(self.cascade_every, self.cascade_hold_s) if self.cascade_every > 0 else None)
+        if cascade is not None:
+            # Cheap models run first so their detections can flag hosts within the same window.
+            cheap_models = [m for m in self.detection_models if model_tier(m) == "cheap"]
+            expensive_models = [m for m in self.detection_models if model_tier(m) == "expensive"]
+            logger.info(f"Cascade: {', '.join(m.engine_name for m in expensive_models) or 'no model'} on every "
+                        f"{cascade.every}th window and on hosts flagged by "
+                        f"{', '.join(m.engine_name for m in cheap_models) or 'no model'}")
+        else:
+            cheap_models, expensive_models = self.detection_models, []
+        prefilter = checkpoint["prefilter"] if checkpoint else (
+            PacketFilter(self.packet_filter) if self.packet_filter else None)
+        if prefilter is not None:
+            logger.info(f"Dissecting only packets matching: {prefilter.expression}")
+        if sampler is not None:
+            for model in self.detection_models:
+                if hasattr(model, 'set_sampling_rate'):
+                    model.set_sampling_rate(sampler.rate, self.window_processor.window_size)
+
+        baseline_models = [m for m in self.detection_models if hasattr(m, 'set_global_baseline')]
+        # A trained baseline profile replaces the extra pass over the capture; a stream cannot be
+        # read twice, so its DDoS baseline builds up from the first windows instead.
+        if baseline_models and not self.models_restored and self.baseline is None and not streaming:
+            with timer.measure("baseline"):
+                global_avg_pps = self.get_global_baseline(pcap_path)
+            for model in baseline_models:
                 model.set_global_baseline(global_avg_pps)
 
-        streamer = PacketStreamer(pcap_path)
-        packet_stream = streamer.stream()
+        pipeline = None
+        self.window_processor.weighted = ingest is not None and ingest.overload == "sample"
+        if ingest is not None:
+            streamer = ingest
+            streamer.sampler, streamer.prefilter = sampler, prefilter
+        elif self.config.parallel_workers > 1 and not streaming:
+            from zshark.core.pipeline import ParallelStreamer
+            streamer = pipeline = ParallelStreamer(pcap_path, self.config, self.config.parallel_workers, merge=merge,
+                                                   sampler=sampler, prefilter=prefilter)
+        else:
+            if self.config.parallel_workers > 1:
+                # Parser processes cannot open /dev/stdin, and a pipe has a single reader anyway.
+                logger.info("Parallel parsing needs a capture file; parsing the stream in-process")
+            streamer = PacketStreamer(pcap_path, checkpoint["offset"] if checkpoint else 0,
+                                      track_offsets=checkpoint_path is not None,
+                                      start_file=checkpoint["file_index"] if checkpoint else 0, merge=merge,
+                                      sampler=sampler, prefilter=prefilter)
+        source_files = streamer.pcap_paths if len(streamer.pcap_paths) > 1 else []
+        packet_stream = timer.wrap_iter("ingest", streamer.stream())
   
         first_packet = next(packet_stream, None)
         if not first_packet:
-             logger.warning(f"PCAP file {pcap_path} is empty.")
-             return AnalysisResult(pcap_path=pcap_path, start_time=datetime.now(), end_time=datetime.now(), total_packets=0, total_bytes=0)
+             sampler, prefilter = streamer.sampler, streamer.prefilter
+             # The first record-level stage counted every record, including the skipped ones.
+             counter = prefilter if prefilter is not None else sampler
+             if counter is not None and counter.packets_seen:
+                 logger.warning(f"No packets in {streamer.pcap_path} passed the packet filter or sampling.")
+                 return AnalysisResult(pcap_path=streamer.pcap_path, source_files=source_files, start_time=datetime.now(), end_time=datetime.now(),
+                                       total_packets=counter.packets_seen, total_bytes=counter.bytes_seen,
+                                       sampling=sampler.as_dict() if sampler is not None else {},
+                                       prefilter=prefilter.as_dict() if prefilter is not None else {})
+             logger.warning(f"PCAP file {streamer.pcap_path} is empty.")
+             return AnalysisResult(pcap_path=streamer.pcap_path, source_files=source_files, start_time=datetime.now(), end_time=datetime.now(), total_packets=0, total_bytes=0)
 
         def full_stream():
             yield first_packet
@@ -105,56 +565,208 @@ class Analyzer:
 
         window_iterator = self.window_processor.process_stream(full_stream())
 
-        all_detections: List[Detection] = []
-        all_window_stats: List[WindowStats] = []
+        fusion = FusionEngine(self.config.fusion_expiry_s)
+        all_window_stats: List[WindowRecord] = []
         total_packets = 0
         total_bytes = 0
-        start_time = datetime.fromtimestamp(float(first_packet.time))
-        end_time = start_time
-        source_ip_stats = defaultdict(lambda: {"packets": 0, "bytes": 0})
-        dest_port_stats = defaultdict(lambda: {"packets": 0, "bytes": 0})
+        start_ts = end_ts = float(first_packet.time)
+        config = self.config
+        source_talkers = HeavyHitters(config.talkers_capacity, config.talkers_cms_width, config.talkers_cms_depth)
+        port_talkers = HeavyHitters(config.talkers_capacity, config.talkers_cms_width, config.talkers_cms_depth)
+        if checkpoint:
+            fusion = checkpoint["fusion"]
+            all_window_stats = checkpoint["window_stats"]
+            total_packets = checkpoint["total_packets"]
+            total_bytes = checkpoint["total_bytes"]
+            start_ts = checkpoint["start_time"]
+            end_ts = checkpoint["end_time"]
+            source_talkers = checkpoint["source_talkers"]
+            port_talkers = checkpoint["port_talkers"]
+        last_checkpoint = time.monotonic()
+        window_top_n = config.window_top_talkers
+        track_talkers = "top_talkers" in self.features or window_top_n > 0
+        metrics = self.metrics
+        skipped_reported = late_reported = overload_reported = 0
+        if metrics is not None:
+            metrics.start_run(float(first_packet.time))
+
+        def run_model(model, window_stats: WindowRecord, packets: List[Packet]) -> List[DetectionRecord]:
+            model_start, model_cpu_start = time.perf_counter(), time.process_time()
+            detections = model.analyze(window_stats, packets)
+            model_wall = time.perf_counter() - model_start
+            state_size = model.state_size()
+            model_stats[model.engine_name].record(model_wall, time.process_time() - model_cpu_start,
+                                                  len(packets), len(detections), state_size)
+            if metrics is not None:
+                metrics.record_model(model.engine_name, model_wall, len(detections), state_size)
+            with timer.measure("fusion"):
+                fusion.add_all(detections)
+            return detections
 
         for window_stats, window_packets in window_iterator:
             all_window_stats.append(window_stats)
             total_packets += window_stats.packet_count
             total_bytes += window_stats.total_bytes
-            end_time = datetime.fromisoformat(window_stats.end_time)
+            end_ts = window_stats.end
 
-            for model in self.detection_models:
-                detections = model.analyze(window_stats, window_packets)
-                all_detections.extend(detections)
-
-            for pkt in window_packets:
-                if IP in pkt:
-                    ip_src = pkt[IP].src
-                    source_ip_stats[ip_src]["packets"] += 1
-                    source_ip_stats[ip_src]["bytes"] += len(pkt)
-                if TCP in pkt:
-                    port_dst = pkt[TCP].dport
-                    dest_port_stats[port_dst]["packets"] += 1
-                    dest_port_stats[port_dst]["bytes"] += len(pkt)
-                elif UDP in pkt:
-                    port_dst = pkt[UDP].dport
-                    dest_port_stats[port_dst]["packets"] += 1
-                    dest_port_stats[port_dst]["bytes"] += len(pkt)
+            for model in cheap_models:
+                detections = run_model(model, window_stats, window_packets)
+                if cascade is not None and detections:
+                    cascade.observe(detections, window_stats)
+            if expensive_models:
+                tier_packets = cascade.select(window_stats, window_packets)
+                if tier_packets is not None:
+                    for model in expensive_models:
+                        run_model(model, window_stats, tier_packets)
+
+            if fusion.expiry is not None:
+                with timer.measure("fusion"):
+                    fusion.expire(end_ts)
+
+            if metrics is not None:
+                metrics.record_window(window_stats.packet_count, window_stats.total_bytes,
+                                      self.window_processor.window_last_time)
+                skipped = self.window_processor.skipped_packets
+                metrics.record_dropped(skipped - skipped_reported, "bad_timestamp")
+                skipped_reported = skipped
+                late = self.window_processor.late_packets
+                metrics.record_dropped(late - late_reported, "late")
+                late_reported = late
+                if ingest is not None:
+                    overload = ingest.dropped_packets
+                    metrics.record_dropped(overload - overload_reported, "overload")
+                    overload_reported = overload
+
+            if track_talkers:
+                talkers_start, talkers_cpu_start = time.perf_counter(), time.process_time()
+                src_packets, src_bytes, port_packets, port_bytes = self._count_talkers(
+                    window_packets, self.window_processor.weighted)
+                source_talkers.update_counts(src_packets, src_bytes)
+                port_talkers.update_counts(port_packets, port_bytes)
+                if window_top_n > 0:
+                    window_stats.top_source_ips = top_counts(src_packets, src_bytes, window_top_n, "ip")
+                    window_stats.top_dest_ports = top_counts(port_packets, port_bytes, window_top_n, "port")
+                timer.add("top_talkers", time.perf_counter() - talkers_start, time.process_time() - talkers_cpu_start)
+
+            if budget is not None:
+                with timer.measure("memory"):
+                    fixed = source_talkers.memory_usage() + port_talkers.memory_usage() if track_talkers else 0
+                    if budget.enforce(self.detection_models, fixed):
+                        logger.debug(f"Memory budget exceeded; state is now {budget.current_bytes / 2**20:.1f} MiB")
+
+            # A checkpoint is taken between windows: the streamer has just read the packet
+            # that opens the next window, so resuming at its offset replays the stream exactly.
+            if (checkpoint_path and not self.window_processor.exhausted
+                    and time.monotonic() - last_checkpoint >= checkpoint_interval_s):
+                with timer.measure("checkpoint"):
+                    save_checkpoint(checkpoint_path, pcap_path, self.config, {
+                        "file_index": streamer.file_index,
+                        "offset": streamer.offset,
+                        "start_time": start_ts,
+                        "end_time": end_ts,
+                        "total_packets": total_packets,
+                        "total_bytes": total_bytes,
+                        "window_stats": all_window_stats,
+                        "fusion": fusion,
+                        "source_talkers": source_talkers,
+                        "port_talkers": port_talkers,
+                        "sampler": sampler,
+                        "prefilter": prefilter,
+                        "cascade": cascade,
+                        "memory": budget,
+                        "models": self.snapshot_models(),
+                    })
+                last_checkpoint = time.monotonic()
+                logger.debug(f"Checkpoint written at offset {streamer.offset} ({total_packets} packets)")
         
-        from zshark.core.scoring import score_and_fuse
-        final_detections = score_and_fuse(all_detections)
+        # Counters live in the reader process when parsing in parallel.
+        sampler, prefilter = streamer.sampler, streamer.prefilter
+
+        with timer.measure("fusion"):
+            final_detections = fusion.detections()
+            incidents = fusion.incidents()
+
+        with timer.measure("top_talkers"):
+            top_source_ips = source_talkers.top(config.talkers_top_n, "ip")
+            top_dest_ports = port_talkers.top(config.talkers_top_n, "port")
+
+        sampling = {}
+        if sampler is not None:
+            # Every packet header was read, so capture totals stay exact; talker counts are scaled estimates.
+            total_packets, total_bytes = sampler.packets_seen, sampler.bytes_seen
+            for entry in top_source_ips + top_dest_ports:
+                for field in ("packets", "bytes", "error"):
+                    entry[field] *= sampler.rate
+            sampling = sampler.as_dict()
+        prefilter_stats = {}
+        if prefilter is not None:
+            # The filter runs before the sampler and sees every record.
+            total_packets, total_bytes = prefilter.packets_seen, prefilter.bytes_seen
+            prefilter_stats = prefilter.as_dict()
+        packets_analyzed = (sampler.packets_kept if sampler is not None
+                            else prefilter.packets_matched if prefilter is not None else total_packets)
+        if ingest is not None:
+            # Records overload sampling dropped before the queue reached neither the filter nor the windows.
+            total_packets += ingest.sampled_packets
+            total_bytes += ingest.sampled_bytes
+
+        cascade_stats = {}
+        if cascade is not None:
+            cascade_stats = {"profile": self.config.analysis_profile, **cascade.as_dict(), "models": {}}
+            for model in self.detection_models:
+                stats = model_stats[model.engine_name]
+                tier = model_tier(model)
+                entry = {"tier": tier, "windows": stats.windows,
+                         "us_per_window": stats.wall_s / stats.windows * 1e6 if stats.windows else 0.0,
+                         "us_per_packet": stats.wall_s / stats.packets * 1e6 if stats.packets else 0.0}
+                if tier == "expensive":
+                    # Measured per-packet cost applied to the packets the cascade held back.
+                    entry["estimated_saved_s"] = entry["us_per_packet"] * cascade.packets_withheld / 1e6
+                cascade_stats["models"][model.engine_name] = entry
+
+        analysis_stats = {
+            "wall_s": time.perf_counter() - run_start,
+            "cpu_s": time.process_time() - run_cpu_start,
+            "windows": len(all_window_stats),
+            "packets": total_packets,
+            "packets_analyzed": packets_analyzed,
+            "raw_detections": fusion.raw_count,
+            "fusion": fusion.stats(),
+            "top_talkers": {"source_ips": source_talkers.stats(), "dest_ports": port_talkers.stats()},
+            "stages": timer.as_dict(),
+            "models": {name: stats.as_dict() for name, stats in model_stats.items()},
+        }
+        if budget is not None:
+            analysis_stats["memory"] = budget.as_dict()
+        if pipeline is not None:
+            analysis_stats["pipeline"] = pipeline.as_dict()
+        if ingest is not None:
+            analysis_stats["ingest"] = {**ingest.as_dict(), "late_packets": self.window_processor.late_packets,
+                                        "sampled_windows": self.window_processor.sampled_windows}
+        if self.baseline is not None:
+            analysis_stats["baseline"] = {"path": self.config.baseline_path, "files": len(self.baseline["files"]),
+                                          "windows": self.baseline["windows"], "created": self.baseline["created"]}
 
-        top_source_ips = sorted([{"ip": ip, **stats} for ip, stats in source_ip_stats.items()], key=lambda x: x["packets"], reverse=True)[:5]
-        top_dest_ports = sorted([{"port": port, **stats} for port, stats in dest_port_stats.items()], key=lambda x: x["packets"], reverse=True)[:5]
+        if checkpoint_path and os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
 
         logger.info(f"Analysis complete. Total packets: {total_packets}")
 
         return AnalysisResult(
-            pcap_path=pcap_path,
-            start_time=start_time.isoformat(),
-            end_time=end_time.isoformat(),
+            pcap_path=streamer.pcap_path,
+            source_files=source_files,
+            start_time=datetime.fromtimestamp(start_ts),
+            end_time=datetime.fromtimestamp(end_ts),
             total_packets=total_packets,
             total_bytes=total_bytes,
-            detections=final_detections, 
-            window_stats=all_window_stats,
+            detections=[detection.to_model() for detection in final_detections],
+            incidents=incidents,
+            window_stats=[window.to_model() for window in all_window_stats],
             top_source_ips=top_source_ips,
             top_dest_ports=top_dest_ports,
-            summary_stats={"total_packets": total_packets, "total_bytes": total_bytes}
+            sampling=sampling,
+            prefilter=prefilter_stats,
+            cascade=cascade_stats,
+            summary_stats={"total_packets": total_packets, "total_bytes": total_bytes},
+            analysis_stats=analysis_stats
         )
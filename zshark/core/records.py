@@ -0,0 +1,70 @@
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from zshark.core.data_structures import Detection, WindowStats
+
+# Slotted records passed between the window processor, the models and fusion. Times are
+# float epoch seconds; they become the pydantic WindowStats/Detection models only when
+# the AnalysisResult is built.
+
+
+@dataclass(slots=True)
+class WindowRecord:
+    start: float
+    end: float
+    packet_count: int
+    total_bytes: int
+    pps: float = 0.0
+    bps: float = 0.0
+    src_ip_entropy: Optional[float] = None
+    dst_ip_entropy: Optional[float] = None
+    dst_port_entropy: Optional[float] = None
+    top_source_ips: Optional[List[Dict[str, Any]]] = None
+    top_dest_ports: Optional[List[Dict[str, Any]]] = None
+
+    @property
+    def start_time(self) -> str:
+        return datetime.fromtimestamp(self.start).isoformat()
+
+    @property
+    def end_time(self) -> str:
+        return datetime.fromtimestamp(self.end).isoformat()
+
+    def get(self, key: str, default=None):
+        return getattr(self, key, default)
+
+    def __getitem__(self, key):
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        setattr(self, key, value)
+
+    def to_model(self) -> WindowStats:
+        return WindowStats(start_time=self.start_time, end_time=self.end_time, packet_count=self.packet_count,
+                           total_bytes=self.total_bytes, pps=self.pps, bps=self.bps,
+                           src_ip_entropy=self.src_ip_entropy, dst_ip_entropy=self.dst_ip_entropy,
+                           dst_port_entropy=self.dst_port_entropy, top_source_ips=self.top_source_ips,
+                           top_dest_ports=self.top_dest_ports)
+
+
+@dataclass(slots=True)
+class DetectionRecord:
+    engine_name: str
+    timestamp: float
+    severity: float
+    score: float
+    label: str
+    justification: str
+    evidence: Dict[str, Any] = field(default_factory=dict)
+    flow_key: Optional[str] = None
+
+    @classmethod
+    def from_model(cls, detection: Detection) -> "DetectionRecord":
+        return cls(detection.engine_name, detection.timestamp.timestamp(), detection.severity, detection.score,
+                   detection.label, detection.justification, detection.evidence, detection.flow_key)
+
+    def to_model(self) -> Detection:
+        return Detection(engine_name=self.engine_name, timestamp=datetime.fromtimestamp(self.timestamp),
+                         severity=self.severity, score=self.score, label=self.label,
+                         justification=self.justification, evidence=self.evidence, flow_key=self.flow_key)
@@ -0,0 +1,67 @@
+import random
+import zlib
+from typing import Any, Dict, Optional
+
+from zshark.core.data_structures import ZSharkConfig
+from zshark.core.headers import conversation_key
+
+SAMPLING_MODES = ("none", "systematic", "random", "flow")
+
+
+class Sampler:
+    # Decides per raw record, before any dissection, whether a packet is kept.
+    # Every mode keeps a packet with probability 1/rate, so volume estimates scale by rate.
+    def __init__(self, mode: str = "none", rate: int = 1, seed: int = 0):
+        if mode not in SAMPLING_MODES:
+            raise ValueError(f"Unknown sampling mode '{mode}'. Choose from: {', '.join(SAMPLING_MODES)}")
+        if rate < 1:
+            raise ValueError("Sampling rate must be at least 1 (keep 1 in N packets)")
+        self.mode = mode if rate > 1 else "none"
+        self.rate = rate if self.mode != "none" else 1
+        self.seed = seed
+        self._counter = 0
+        self._rng = random.Random(seed)
+        # Flow mode keeps a conversation when its CRC-32 falls below this threshold.
+        self._flow_threshold = (1 << 32) // self.rate
+        self.packets_seen = 0
+        self.bytes_seen = 0
+        self.packets_kept = 0
+        self.bytes_kept = 0
+
+    @classmethod
+    def from_config(cls, config: ZSharkConfig) -> Optional["Sampler"]:
+        sampler = cls(config.sampling_mode, config.sampling_rate, config.sampling_seed)
+        return sampler if sampler.active else None
+
+    @property
+    def active(self) -> bool:
+        return self.mode != "none"
+
+    def keep(self, raw: bytes, linktype: int) -> bool:
+        self.packets_seen += 1
+        self.bytes_seen += len(raw)
+        if self.mode == "systematic":
+            keep = self._counter == 0
+            self._counter = (self._counter + 1) % self.rate
+        elif self.mode == "random":
+            keep = self._rng.random() * self.rate < 1.0
+        elif self.mode == "flow":
+            keep = zlib.crc32(conversation_key(raw, linktype), self.seed & 0xFFFFFFFF) < self._flow_threshold
+        else:
+            keep = True
+        if keep:
+            self.packets_kept += 1
+            self.bytes_kept += len(raw)
+        return keep
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "rate": self.rate,
+            "seed": self.seed,
+            "packets_seen": self.packets_seen,
+            "bytes_seen": self.bytes_seen,
+            "packets_sampled": self.packets_kept,
+            "bytes_sampled": self.bytes_kept,
+            "effective_rate": self.packets_seen / self.packets_kept if self.packets_kept else None,
+        }
@@ -1,41 +1,140 @@
-from typing import List, Dict
-from zshark.core.data_structures import Detection
+from collections import OrderedDict
+from datetime import datetime
+from typing import List, Dict, Any, Iterable, Tuple
+from zshark.core.data_structures import Detection, Incident
+from zshark.core.records import DetectionRecord
 
 def calculate_final_severity(detections: List[Detection]) -> float:
     if not detections:
         return 0.0
-  
+
     max_severity = max(d.severity for d in detections)
     return max_severity
 
-def score_and_fuse(detections: List[Detection]) -> List[Detection]:
+def fusion_key(det: DetectionRecord) -> str:
+    key_parts = [det.label]
+    if det.evidence:
+        if 'ip' in det.evidence:
+            key_parts.append(str(det.evidence['ip']))
+        elif 'source_ip' in det.evidence:
+            key_parts.append(str(det.evidence['source_ip']))
+        elif 'domain' in det.evidence:
+            key_parts.append(str(det.evidence['domain']))
+        elif 'flow_key' in det.evidence:
+            key_parts.append(str(det.evidence['flow_key']))
+    return "_".join(key_parts)
 
-    if not detections:
-        return []
-
-    fused_map: Dict[str, Detection] = {}
-
-    for det in detections:
-       
-        key_parts = [det.label]
-        
-        
-        if det.evidence:
-            if 'ip' in det.evidence:
-                key_parts.append(str(det.evidence['ip']))
-            elif 'source_ip' in det.evidence:
-                key_parts.append(str(det.evidence['source_ip']))
-            elif 'domain' in det.evidence:
-                key_parts.append(str(det.evidence['domain']))
-            elif 'flow_key' in det.evidence:
-                key_parts.append(str(det.evidence['flow_key']))
-        
-        unique_key = "_".join(key_parts)
-
-        if unique_key in fused_map:
-            if det.score > fused_map[unique_key].score:
-                fused_map[unique_key] = det
+def detection_entities(det: DetectionRecord) -> List[str]:
+    evidence = det.evidence or {}
+    for key in ('ip', 'source_ip', 'client_ip'):
+        if evidence.get(key):
+            return [str(evidence[key])]
+    flow_key = evidence.get('flow_key') or det.flow_key
+    if flow_key:
+        # "a-b:pa-pb:proto" from get_flow_key; both endpoints take part in the flow.
+        return [ip for ip in str(flow_key).split(':', 1)[0].split('-') if ip]
+    return []
+
+
+class _OpenIncident:
+    __slots__ = ("first_seen", "last_seen", "engines", "labels", "count")
+
+    def __init__(self, timestamp: float):
+        self.first_seen = timestamp
+        self.last_seen = timestamp
+        self.engines: Dict[str, float] = {}
+        self.labels: Dict[str, None] = {}
+        self.count = 0
+
+    def close(self, entity: str) -> Incident:
+        combined = 1.0
+        for severity in self.engines.values():
+            combined *= 1.0 - min(1.0, max(0.0, severity))
+        return Incident(entity=entity, first_seen=datetime.fromtimestamp(self.first_seen),
+                        last_seen=datetime.fromtimestamp(self.last_seen),
+                        severity=1.0 - combined, max_severity=max(self.engines.values()),
+                        engines=list(self.engines), labels=list(self.labels), detection_count=self.count)
+
+
+class FusionEngine:
+    # Folds detections in as they are emitted. Open entries are kept in last-activity
+    # order so expiry only looks at the oldest ones; closed entries hold just the result.
+    # Works on DetectionRecords, so timestamps and the expiry are epoch seconds.
+    def __init__(self, expiry_s: float = 0.0):
+        self.expiry = float(expiry_s) if expiry_s > 0 else None
+        self.raw_count = 0
+        self.peak_open = 0
+        self._seq = 0
+        self._open: "OrderedDict[str, Tuple[int, DetectionRecord, float]]" = OrderedDict()
+        self._incidents: "OrderedDict[str, _OpenIncident]" = OrderedDict()
+        self._closed: List[Tuple[int, DetectionRecord]] = []
+        self._closed_incidents: List[Incident] = []
+
+    def add(self, det: DetectionRecord) -> None:
+        self.raw_count += 1
+        key = fusion_key(det)
+        entry = self._open.get(key)
+        if entry is None:
+            self._seq += 1
+            self._open[key] = (self._seq, det, det.timestamp)
         else:
-            fused_map[unique_key] = det
+            seq, best, _ = entry
+            self._open[key] = (seq, det if det.score > best.score else best, max(entry[2], det.timestamp))
+            self._open.move_to_end(key)
 
-    return list(fused_map.values())
+        for entity in detection_entities(det):
+            incident = self._incidents.get(entity)
+            if incident is None:
+                incident = self._incidents[entity] = _OpenIncident(det.timestamp)
+            else:
+                self._incidents.move_to_end(entity)
+            incident.first_seen = min(incident.first_seen, det.timestamp)
+            incident.last_seen = max(incident.last_seen, det.timestamp)
+            incident.engines[det.engine_name] = max(incident.engines.get(det.engine_name, 0.0), det.severity)
+            incident.labels[det.label] = None
+            incident.count += 1
+
+        self.peak_open = max(self.peak_open, len(self._open) + len(self._incidents))
+
+    def add_all(self, detections: Iterable[DetectionRecord]) -> None:
+        for det in detections:
+            self.add(det)
+
+    def expire(self, now: float) -> int:
+        if self.expiry is None:
+            return 0
+        cutoff = now - self.expiry
+        closed = 0
+        while self._open:
+            key, (seq, det, last_seen) = next(iter(self._open.items()))
+            if last_seen >= cutoff:
+                break
+            del self._open[key]
+            self._closed.append((seq, det))
+            closed += 1
+        while self._incidents:
+            entity, incident = next(iter(self._incidents.items()))
+            if incident.last_seen >= cutoff:
+                break
+            del self._incidents[entity]
+            self._closed_incidents.append(incident.close(entity))
+        return closed
+
+    def detections(self) -> List[DetectionRecord]:
+        # First-seen order, as the original whole-capture fusion produced.
+        entries = self._closed + [(seq, det) for seq, det, _ in self._open.values()]
+        return [det for _, det in sorted(entries, key=lambda entry: entry[0])]
+
+    def incidents(self) -> List[Incident]:
+        incidents = self._closed_incidents + [incident.close(entity) for entity, incident in self._incidents.items()]
+        return sorted(incidents, key=lambda incident: (-incident.severity, -len(incident.engines), incident.first_seen))
+
+    def stats(self) -> Dict[str, Any]:
+        return {"raw": self.raw_count, "fused": len(self._closed) + len(self._open),
+                "incidents": len(self._closed_incidents) + len(self._incidents), "peak_open": self.peak_open}
+
+
+def score_and_fuse(detections: List[Detection]) -> List[Detection]:
+    engine = FusionEngine()
+    engine.add_all(DetectionRecord.from_model(det) for det in detections)
+    return [det.to_model() for det in engine.detections()]
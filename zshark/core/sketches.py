@@ -0,0 +1,121 @@
+import hashlib
+import heapq
+from typing import Any, Dict, Hashable, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+
+def _hash_pair(key: Hashable) -> Tuple[int, int]:
+    # Stable across processes (unlike hash()), so sketches survive checkpoints.
+    digest = hashlib.blake2b(str(key).encode(), digest_size=16).digest()
+    return int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+
+
+class CountMinSketch:
+    # Estimates never undercount; with width w and depth d the overcount is at most
+    # e/w * total with probability 1 - e^-d.
+    def __init__(self, width: int = 2048, depth: int = 4):
+        if width < 1 or depth < 1:
+            raise ValueError("Count-Min width and depth must be positive")
+        self.width = width
+        self.depth = depth
+        self.table = np.zeros((depth, width), dtype=np.int64)
+        self.total = 0
+
+    def columns(self, keys: List[Hashable]) -> np.ndarray:
+        pairs = np.array([_hash_pair(key) for key in keys], dtype=np.uint64).reshape(-1, 2)
+        rows = np.arange(self.depth, dtype=np.uint64)[:, None]
+        # Kirsch-Mitzenmacher: d indexes from two hashes.
+        return ((pairs[:, 0][None, :] + rows * pairs[:, 1][None, :]) % np.uint64(self.width)).astype(np.intp)
+
+    def add(self, columns: np.ndarray, weights: np.ndarray) -> np.ndarray:
+        # Returns the estimates of the added keys, this update included.
+        for row in range(self.depth):
+            np.add.at(self.table[row], columns[row], weights)
+        self.total += int(weights.sum())
+        return self.estimates(columns)
+
+    def estimates(self, columns: np.ndarray) -> np.ndarray:
+        return np.take_along_axis(self.table, columns, axis=1).min(axis=0)
+
+    def estimate(self, key: Hashable) -> int:
+        return int(self.estimates(self.columns([key]))[0])
+
+
+class HeavyHitters:
+    # Space-Saving over packet counts: at most `capacity` keys are monitored and a key's
+    # count overestimates the truth by at most its `error` (<= total / capacity). A key
+    # that takes over an evicted slot starts from the smaller of the evicted count and
+    # its Count-Min estimate, both upper bounds. Bytes follow the same rules.
+    def __init__(self, capacity: int = 1000, cms_width: int = 2048, cms_depth: int = 4):
+        if capacity < 1:
+            raise ValueError("Heavy-hitter capacity must be positive")
+        self.capacity = capacity
+        self.entries: Dict[Hashable, List[int]] = {}
+        self._heap: List[Tuple[int, Any]] = []
+        self.packet_sketch = CountMinSketch(cms_width, cms_depth)
+        self.byte_sketch = CountMinSketch(cms_width, cms_depth)
+        self.total_packets = 0
+
+    def update_counts(self, packets: Mapping[Hashable, int], byte_counts: Mapping[Hashable, int]) -> None:
+        if not packets:
+            return
+        keys = list(packets)
+        # Both sketches share their shape, so each key is hashed once per window.
+        columns = self.packet_sketch.columns(keys)
+        counts = np.fromiter(packets.values(), dtype=np.int64, count=len(keys))
+        sizes = np.fromiter((byte_counts.get(key, 0) for key in keys), dtype=np.int64, count=len(keys))
+        packet_bounds = self.packet_sketch.add(columns, counts).tolist()
+        byte_bounds = self.byte_sketch.add(columns, sizes).tolist()
+        self.total_packets += int(counts.sum())
+
+        entries = self.entries
+        for key, count, size, packet_bound, byte_bound in zip(keys, counts.tolist(), sizes.tolist(),
+                                                              packet_bounds, byte_bounds):
+            entry = entries.get(key)
+            if entry is not None:
+                entry[0] += count
+                entry[1] += size
+            elif len(entries) < self.capacity:
+                entries[key] = [count, size, 0]
+                heapq.heappush(self._heap, (count, key))
+            else:
+                min_count, min_bytes = self._evict_min()
+                estimate = min(min_count + count, packet_bound)
+                entries[key] = [estimate, min(min_bytes + size, byte_bound), estimate - count]
+                heapq.heappush(self._heap, (estimate, key))
+
+    def _evict_min(self) -> Tuple[int, int]:
+        # Heap entries go stale as counts grow; refresh them lazily until the top is current.
+        while True:
+            count, key = heapq.heappop(self._heap)
+            entry = self.entries[key]
+            if entry[0] == count:
+                del self.entries[key]
+                return entry[0], entry[1]
+            heapq.heappush(self._heap, (entry[0], key))
+
+    def top(self, n: int, key_name: str) -> List[Dict[str, Any]]:
+        ranked = heapq.nlargest(n, self.entries.items(), key=lambda item: item[1][0])
+        return [{key_name: key, "packets": packets, "bytes": size, "error": error}
+                for key, (packets, size, error) in ranked]
+
+    def memory_usage(self) -> int:
+        # Fixed by capacity and sketch shape: a dict entry plus a [packets, bytes, error] list per key.
+        return (self.packet_sketch.table.nbytes + self.byte_sketch.table.nbytes
+                + len(self.entries) * 220 + len(self._heap) * 100)
+
+    def max_error(self) -> int:
+        return max((entry[2] for entry in self.entries.values()), default=0)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"tracked": len(self.entries), "capacity": self.capacity, "max_error": self.max_error(),
+                "error_bound": self.total_packets // self.capacity}
+
+
+def top_counts(packets: Mapping[Hashable, int], byte_counts: Mapping[Hashable, int], n: int,
+               key_name: str) -> Optional[List[Dict[str, Any]]]:
+    if n <= 0:
+        return None
+    ranked = heapq.nlargest(n, packets.items(), key=lambda item: item[1])
+    return [{key_name: key, "packets": count, "bytes": byte_counts.get(key, 0)} for key, count in ranked]
@@ -1,8 +1,18 @@
 import math
-from typing import Dict, Any, Optional
-from scapy.all import Packet, IP, TCP, UDP
+from typing import Dict, Any, Optional, Iterable, FrozenSet, Tuple
+from scapy.packet import Packet
+from scapy.layers.inet import IP, TCP, UDP
 from datetime import datetime
 
+# Features that may be requested on top of the always-present volume counters
+# (packet_count, total_bytes, pps, bps).
+WINDOW_FEATURES: FrozenSet[str] = frozenset({"src_ip_entropy", "dst_ip_entropy", "dst_port_entropy"})
+AGGREGATE_FEATURES: FrozenSet[str] = frozenset({"top_talkers"})
+ALL_FEATURES: FrozenSet[str] = WINDOW_FEATURES | AGGREGATE_FEATURES
+# Features the report generators read from an AnalysisResult; computed when
+# ZSharkConfig.features is left unset.
+REPORT_FEATURES: FrozenSet[str] = frozenset({"top_talkers"})
+
 def get_flow_key(pkt: Packet) -> Optional[str]:
 
     if IP in pkt:
@@ -50,47 +60,63 @@ def shannon_entropy(data: list) -> float:
 
     return entropy
 
-def calculate_window_stats(window_packets: list) -> Dict[str, Any]:
-
-    if not window_packets:
+def calculate_window_stats(window_packets: list, features: Optional[Iterable[str]] = None,
+                           sample_rate: int = 1, filtered: Tuple[int, int] = (0, 0),
+                           span: Optional[Tuple[float, float]] = None,
+                           sampled: Tuple[float, float] = (0, 0)) -> Dict[str, Any]:
+    # filtered: (packets, bytes) skipped by the packet filter, counted in the volume
+    # counters only; span: (first, last) record time when it differs from window_packets;
+    # sampled: estimated (packets, bytes) that ingest overload sampling dropped, added to the rates.
+
+    filtered_packets, filtered_bytes = filtered
+    sampled_packets, sampled_bytes = sampled
+    if not window_packets and not filtered_packets:
         return {}
 
-    start_time = float(window_packets[0].time)
-    end_time = float(window_packets[-1].time)
+    wanted = WINDOW_FEATURES if features is None else WINDOW_FEATURES.intersection(features)
+
+    start_time, end_time = span if span is not None else (float(window_packets[0].time),
+                                                          float(window_packets[-1].time))
     duration = end_time - start_time if end_time > start_time else 1e-6
+    dissected_bytes = sum(len(pkt) for pkt in window_packets)
 
     stats = {
         "start_time": datetime.fromtimestamp(start_time),
         "end_time": datetime.fromtimestamp(end_time),
-        "duration_s": duration,
-        "packet_count": len(window_packets),
-        "total_bytes": sum(len(pkt) for pkt in window_packets),
-        "pps": len(window_packets) / duration,
-        "bps": sum(len(pkt) for pkt in window_packets) * 8 / duration,
+        "packet_count": len(window_packets) + filtered_packets,
+        "total_bytes": dissected_bytes + filtered_bytes,
+        # With 1-in-N sampling each kept packet stands for N on the wire; filtered
+        # packets are counted exactly since the filter runs before the sampler.
+        "pps": (len(window_packets) * sample_rate + filtered_packets + sampled_packets) / duration,
+        "bps": (dissected_bytes * sample_rate + filtered_bytes + sampled_bytes) * 8 / duration,
     }
 
+    if not wanted:
+        return stats
+
+    want_ips = "src_ip_entropy" in wanted or "dst_ip_entropy" in wanted
+    want_ports = "dst_port_entropy" in wanted
+
     src_ips = []
     dst_ips = []
     dst_ports = []
-    inter_arrival_times = []
 
-    prev_time = start_time
     for pkt in window_packets:
-        if IP in pkt:
+        if want_ips and IP in pkt:
             src_ips.append(pkt[IP].src)
             dst_ips.append(pkt[IP].dst)
 
-        if TCP in pkt:
-            dst_ports.append(pkt[TCP].dport)
-        elif UDP in pkt:
-            dst_ports.append(pkt[UDP].dport)
-
-        inter_arrival_times.append(float(pkt.time) - prev_time)
-        prev_time = float(pkt.time)
-
-    stats["src_ip_entropy"] = shannon_entropy(src_ips)
-    stats["dst_ip_entropy"] = shannon_entropy(dst_ips)
-    stats["dst_port_entropy"] = shannon_entropy(dst_ports)
-    stats["inter_arrival_times"] = inter_arrival_times
+        if want_ports:
+            if TCP in pkt:
+                dst_ports.append(pkt[TCP].dport)
+            elif UDP in pkt:
+                dst_ports.append(pkt[UDP].dport)
+
+    if "src_ip_entropy" in wanted:
+        stats["src_ip_entropy"] = shannon_entropy(src_ips)
+    if "dst_ip_entropy" in wanted:
+        stats["dst_ip_entropy"] = shannon_entropy(dst_ips)
+    if "dst_port_entropy" in wanted:
+        stats["dst_port_entropy"] = shannon_entropy(dst_ports)
 
     return stats
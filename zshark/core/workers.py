@@ -0,0 +1,79 @@
+import os
+import signal
+import sys
+import time
+from collections import Counter
+from typing import Dict, Any, Optional
+
+from loguru import logger
+
+from zshark.core.data_structures import ZSharkConfig, AnalysisResult
+
+TOP_DETECTIONS = 20
+
+_analyzers: Dict[str, Any] = {}
+
+
+def init_worker(log_level: str = "WARNING", config_json: Optional[str] = None) -> None:
+    # Runs once per pool process: pay the Scapy/NumPy import and model module
+    # import cost up front so that individual jobs only pay for analysis.
+    # Ctrl-C is handled by the parent, which shuts the pool down in order.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    logger.remove()
+    logger.add(sys.stderr, level=log_level, format="<green>{time:HH:mm:ss}</green> | {level} | worker {process} | {message}")
+
+    from zshark.core import processor  # noqa: F401
+    from zshark.models import load_models
+    if config_json is not None:
+        get_analyzer(config_json)
+    else:
+        load_models(ZSharkConfig.default())
+
+
+def get_analyzer(config_json: str):
+    # One warm Analyzer per worker and configuration, reset between files.
+    analyzer = _analyzers.get(config_json)
+    if analyzer is None:
+        from zshark.core.processor import Analyzer
+        analyzer = _analyzers[config_json] = Analyzer(ZSharkConfig.model_validate_json(config_json))
+    return analyzer
+
+
+def warm_up(hold_s: float = 0.0) -> int:
+    # Holding briefly makes concurrent warm-up calls land on distinct workers.
+    if hold_s:
+        time.sleep(hold_s)
+    return os.getpid()
+
+
+def summarize_result(result: AnalysisResult, output_path: Optional[str] = None) -> Dict[str, Any]:
+    return {
+        "pcap_path": result.pcap_path,
+        "output_path": output_path,
+        "start_time": result.start_time.isoformat(),
+        "end_time": result.end_time.isoformat(),
+        "total_packets": result.total_packets,
+        "total_bytes": result.total_bytes,
+        "detections": len(result.detections),
+        "labels": dict(Counter(det.label for det in result.detections)),
+        "wall_s": result.analysis_stats.get("wall_s", 0.0),
+        "top_source_ips": result.top_source_ips,
+        "top_dest_ports": result.top_dest_ports,
+        "top_detections": [det.model_dump(mode="json", exclude={"evidence"})
+                           for det in sorted(result.detections, key=lambda d: (d.severity, d.score),
+                                             reverse=True)[:TOP_DETECTIONS]],
+    }
+
+
+def run_analysis(pcap_path: str, config_json: str, output_path: Optional[str] = None) -> Dict[str, Any]:
+    analyzer = get_analyzer(config_json)
+    analyzer.reset()
+    result = analyzer.analyze_pcap(pcap_path)
+
+    if output_path:
+        with open(output_path, "w") as f:
+            f.write(result.model_dump_json(indent=4))
+
+    summary = summarize_result(result, output_path)
+    summary["worker_pid"] = os.getpid()
+    return summary
@@ -1,29 +1,66 @@
-from typing import List, Dict, Type
+from importlib import import_module
+from typing import List, Dict, Type, Set, Iterable, Optional
 from zshark.core.data_structures import ZSharkConfig, ModelConfig
 from zshark.models.base import BaseDetectionModel
-from zshark.models.ddos_detector import DDoSDetector
-from zshark.models.port_scan_detector import PortScanDetector
-from zshark.models.arp_spoof_detector import ARPSpoofDetector
-from zshark.models.dns_detector import DNSAnomalyDetector
-from zshark.models.beaconing_detector import BeaconingDetector
-
-MODEL_REGISTRY: Dict[str, Type[BaseDetectionModel]] = {
-    "ddos_volume": DDoSDetector,
-    "port_scan": PortScanDetector,
-    "arp_spoof": ARPSpoofDetector,
-    "dns_anomaly": DNSAnomalyDetector,
-    "beaconing": BeaconingDetector,
+
+# Engine name -> "module:Class". Model modules (and their NumPy/Scapy layer
+# imports) are only imported once the engine is actually enabled.
+MODEL_REGISTRY: Dict[str, str] = {
+    "ddos_volume": "zshark.models.ddos_detector:DDoSDetector",
+    "port_scan": "zshark.models.port_scan_detector:PortScanDetector",
+    "arp_spoof": "zshark.models.arp_spoof_detector:ARPSpoofDetector",
+    "dns_anomaly": "zshark.models.dns_detector:DNSAnomalyDetector",
+    "beaconing": "zshark.models.beaconing_detector:BeaconingDetector",
 }
 
+def get_model_class(engine_name: str) -> Type[BaseDetectionModel]:
+    try:
+        target = MODEL_REGISTRY[engine_name]
+    except KeyError:
+        raise KeyError(f"Unknown detection model: {engine_name}") from None
+    module_name, class_name = target.split(":")
+    return getattr(import_module(module_name), class_name)
+
+def enable_models(config: ZSharkConfig, engine_names: Iterable[str]) -> ZSharkConfig:
+    enabled = {name.strip() for name in engine_names if name.strip()}
+    unknown = enabled - set(MODEL_REGISTRY)
+    if unknown:
+        raise ValueError(f"Unknown model(s): {', '.join(sorted(unknown))}. Available: {', '.join(MODEL_REGISTRY)}")
+    default_config = ZSharkConfig.default()
+    for engine_name in MODEL_REGISTRY:
+        if engine_name not in config.models:
+            config.models[engine_name] = default_config.models.get(engine_name, ModelConfig())
+        model_config = config.models[engine_name]
+        model_config.enabled = engine_name in enabled
+    return config
+
 def load_models(config: ZSharkConfig) -> List[BaseDetectionModel]:
     loaded_models: List[BaseDetectionModel] = []
     default_config = ZSharkConfig.default()
 
-    for engine_name, model_class in MODEL_REGISTRY.items():
+    for engine_name in MODEL_REGISTRY:
         model_config = config.models.get(engine_name)
         if model_config is None:
             model_config = default_config.models.get(engine_name, ModelConfig())
         if model_config.enabled:
-            loaded_models.append(model_class(model_config))
+            loaded_models.append(get_model_class(engine_name)(model_config))
 
     return loaded_models
+
+def required_features(models: List[BaseDetectionModel], extra: Iterable[str] = ()) -> Set[str]:
+    features: Set[str] = set(extra)
+    for model in models:
+        features.update(model.required_features)
+    return features
+
+def packet_filter(models: List[BaseDetectionModel]) -> Optional[str]:
+    # Union of the models' packet filters, or None when some model needs all traffic.
+    expressions: List[str] = []
+    for model in models:
+        if model.packet_filter is None:
+            return None
+        if model.packet_filter not in expressions:
+            expressions.append(model.packet_filter)
+    if not expressions:
+        return None
+    return " or ".join(f"({expression})" for expression in expressions) if len(expressions) > 1 else expressions[0]
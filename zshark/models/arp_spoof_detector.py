@@ -1,26 +1,30 @@
-from typing import List, Dict
+from typing import List, Dict, Any
 from collections import defaultdict
-from scapy.all import Packet, ARP
+from scapy.packet import Packet
+from scapy.layers.l2 import ARP
 from zshark.models.base import BaseDetectionModel
-from zshark.core.data_structures import Detection, WindowStats, ModelConfig
-import time
-from datetime import datetime
+from zshark.core.data_structures import ModelConfig
+from zshark.core.records import DetectionRecord, WindowRecord
+from zshark.core.memory import ENTRY_BYTES
 
 class ARPSpoofDetector(BaseDetectionModel):
+
+    packet_filter = "arp"
+    cost_tier = "expensive"
+
     def __init__(self, config: ModelConfig):
         super().__init__(config)
         self.ip_mac_map: Dict[str, str] = {}
+        # Bindings from a trained baseline; they never expire.
+        self.known_bindings: Dict[str, str] = {}
         self.last_seen: Dict[str, float] = {}
         self.max_gratuitous_arp = self.config.params.get("max_gratuitous_arp_per_window", 5)
 
-    def analyze(self, window_stats: WindowStats, window_packets: List[Packet]) -> List[Detection]:
-        detections: List[Detection] = []
+    def analyze(self, window_stats: WindowRecord, window_packets: List[Packet]) -> List[DetectionRecord]:
+        detections: List[DetectionRecord] = []
         gratuitous_arp_count: Dict[str, int] = defaultdict(int)
 
-        try:
-            current_ts = float(datetime.fromisoformat(window_stats.end_time).timestamp())
-        except:
-            current_ts = time.time()
+        current_ts = window_stats.end
 
         for pkt in window_packets:
             if ARP not in pkt:
@@ -32,17 +36,20 @@ class ARPSpoofDetector(BaseDetectionModel):
 
             self.last_seen[sender_ip] = current_ts
 
-            if sender_ip in self.ip_mac_map:
-                known_mac = self.ip_mac_map[sender_ip]
+            known_mac = self.ip_mac_map.get(sender_ip) or self.known_bindings.get(sender_ip)
+            if known_mac is not None:
                 if known_mac != sender_mac:
-                    detections.append(Detection(
+                    evidence = {"ip": sender_ip, "old_mac": known_mac, "new_mac": sender_mac}
+                    if sender_ip in self.known_bindings:
+                        evidence["baseline_mac"] = self.known_bindings[sender_ip]
+                    detections.append(DetectionRecord(
                         engine_name=self.engine_name,
-                        timestamp=getattr(window_stats, "end_time", None),
+                        timestamp=window_stats.end,
                         severity=1.0,
                         score=1.0,
                         label="ARP Spoofing Detected (MAC Conflict)",
                         justification=f"IP {sender_ip} changed MAC from {known_mac} to {sender_mac}.",
-                        evidence={"ip": sender_ip, "old_mac": known_mac, "new_mac": sender_mac}
+                        evidence=evidence
                     ))
                    
                     self.ip_mac_map[sender_ip] = sender_mac 
@@ -54,9 +61,9 @@ class ARPSpoofDetector(BaseDetectionModel):
        
         for ip, count in gratuitous_arp_count.items():
             if count > self.max_gratuitous_arp:
-                detections.append(Detection(
+                detections.append(DetectionRecord(
                     engine_name=self.engine_name,
-                    timestamp=getattr(window_stats, "end_time", None),
+                    timestamp=window_stats.end,
                     severity=min(1.0, (count - self.max_gratuitous_arp)/5.0),
                     score=count,
                     label="Excessive Gratuitous ARP",
@@ -72,5 +79,31 @@ class ARPSpoofDetector(BaseDetectionModel):
 
         return detections
 
-    def update_baseline(self, window_stats: WindowStats, window_packets: List[Packet]) -> None:
+    def state_size(self) -> Dict[str, int]:
+        return {"ip_mac_map": len(self.ip_mac_map), "last_seen": len(self.last_seen)}
+
+    def memory_usage(self) -> int:
+        return (len(self.ip_mac_map) + len(self.last_seen) + len(self.known_bindings)) * ENTRY_BYTES
+
+    def eviction_candidates(self):
+        # Trained bindings are not evicted; they are fixed by the baseline profile.
+        for ip, ts in self.last_seen.items():
+            yield ts, ip, 2 * ENTRY_BYTES
+
+    def evict(self, keys) -> None:
+        for ip in keys:
+            self.ip_mac_map.pop(ip, None)
+            self.last_seen.pop(ip, None)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"ip_mac_map": dict(self.ip_mac_map), "last_seen": dict(self.last_seen)}
+
+    def restore(self, state: Dict[str, Any]) -> None:
+        self.ip_mac_map = dict(state.get("ip_mac_map", {}))
+        self.last_seen = dict(state.get("last_seen", {}))
+
+    def load_baseline(self, profile: Dict[str, Any]) -> None:
+        self.known_bindings = dict(profile.get("ip_mac", {}))
+
+    def update_baseline(self, window_stats: WindowRecord, window_packets: List[Packet]) -> None:
         pass
@@ -1,18 +1,49 @@
 from abc import ABC, abstractmethod
-from typing import List
-from scapy.all import Packet
-from zshark.core.data_structures import Detection, ModelConfig, WindowStats
+from typing import List, FrozenSet, Dict, Any, Optional, Iterable, Tuple, Hashable
+from scapy.packet import Packet
+from zshark.core.data_structures import ModelConfig
+from zshark.core.records import DetectionRecord, WindowRecord
 
 class BaseDetectionModel(ABC):
 
+    # Window features (see zshark.core.utils.ALL_FEATURES) read from WindowRecord.
+    required_features: FrozenSet[str] = frozenset()
+    # Packet filter (zshark.core.prefilter) covering every packet analyze() reads; None means all traffic.
+    packet_filter: Optional[str] = None
+    # Cascade tier (zshark.core.cascade): cheap models see every window and flag hosts for the
+    # expensive ones, which may be deferred. ModelConfig.tier overrides it.
+    cost_tier: str = "cheap"
+
     def __init__(self, config: ModelConfig):
         self.config = config
         self.engine_name = self.__class__.__name__
 
     @abstractmethod
-    def analyze(self, window_stats: WindowStats, window_packets: List[Packet]) -> List[Detection]:
+    def analyze(self, window_stats: WindowRecord, window_packets: List[Packet]) -> List[DetectionRecord]:
         pass
 
     @abstractmethod
-    def update_baseline(self, window_stats: WindowStats, window_packets: List[Packet]) -> None:
+    def update_baseline(self, window_stats: WindowRecord, window_packets: List[Packet]) -> None:
+        pass
+
+    def state_size(self) -> Dict[str, int]:
+        # Number of entries held in each piece of cross-window state (flows, IPs, ...).
+        return {}
+
+    def memory_usage(self) -> int:
+        # Estimated bytes of cross-window state (see zshark.core.memory), checked against --max-memory.
+        return 0
+
+    def eviction_candidates(self) -> Iterable[Tuple[float, Hashable, int]]:
+        # (last activity time, key, estimated bytes) for every entry evict() can drop.
+        return ()
+
+    def evict(self, keys: Iterable[Hashable]) -> None:
+        pass
+
+    def snapshot(self) -> Dict[str, Any]:
+        # Picklable copy of the cross-window state, restored with restore().
+        return {}
+
+    def restore(self, state: Dict[str, Any]) -> None:
         pass
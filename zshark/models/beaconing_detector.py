@@ -1,13 +1,18 @@
-from typing import List
+from typing import List, Dict, Any
 from collections import deque, defaultdict
 import numpy as np
-from scapy.all import Packet
+from scapy.packet import Packet
 from zshark.models.base import BaseDetectionModel
-from zshark.core.data_structures import Detection, WindowStats, ModelConfig
+from zshark.core.data_structures import ModelConfig
+from zshark.core.records import DetectionRecord, WindowRecord
 from zshark.core.utils import get_flow_key 
+from zshark.core.memory import ENTRY_BYTES, DEQUE_BYTES, DEQUE_ITEM_BYTES
 
 class BeaconingDetector(BaseDetectionModel):
 
+    packet_filter = "ip"
+    cost_tier = "expensive"
+
     def __init__(self, config: ModelConfig):
         super().__init__(config)
         self.history_size = int(self.config.params.get('history_size', 100))
@@ -31,11 +36,45 @@ class BeaconingDetector(BaseDetectionModel):
             if key in self.flow_iat_histories:
                 del self.flow_iat_histories[key]
 
-    def update_baseline(self, window_stats: WindowStats, window_packets: List[Packet]) -> None:
+    def state_size(self) -> Dict[str, int]:
+        return {"flow_iat_histories": len(self.flow_iat_histories), "last_packet_times": len(self.last_packet_times)}
+
+    def memory_usage(self) -> int:
+        iats = sum(len(history) for history in self.flow_iat_histories.values())
+        return (len(self.last_packet_times) * ENTRY_BYTES
+                + len(self.flow_iat_histories) * (ENTRY_BYTES + DEQUE_BYTES) + iats * DEQUE_ITEM_BYTES)
+
+    def eviction_candidates(self):
+        histories = self.flow_iat_histories
+        for flow_key, last_time in self.last_packet_times.items():
+            history = histories.get(flow_key)
+            size = ENTRY_BYTES
+            if history is not None:
+                size += ENTRY_BYTES + DEQUE_BYTES + len(history) * DEQUE_ITEM_BYTES
+            yield last_time, flow_key, size
+
+    def evict(self, keys) -> None:
+        for flow_key in keys:
+            self.last_packet_times.pop(flow_key, None)
+            self.flow_iat_histories.pop(flow_key, None)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"flow_iat_histories": {key: list(history) for key, history in self.flow_iat_histories.items()},
+                "last_packet_times": dict(self.last_packet_times),
+                "cleanup_counter": self.cleanup_counter}
+
+    def restore(self, state: Dict[str, Any]) -> None:
+        self.flow_iat_histories = defaultdict(lambda: deque(maxlen=self.history_size))
+        for key, history in state.get("flow_iat_histories", {}).items():
+            self.flow_iat_histories[key].extend(history)
+        self.last_packet_times = dict(state.get("last_packet_times", {}))
+        self.cleanup_counter = state.get("cleanup_counter", 0)
+
+    def update_baseline(self, window_stats: WindowRecord, window_packets: List[Packet]) -> None:
         pass
 
-    def analyze(self, window_stats: WindowStats, window_packets: List[Packet]) -> List[Detection]:
-        detections: List[Detection] = []
+    def analyze(self, window_stats: WindowRecord, window_packets: List[Packet]) -> List[DetectionRecord]:
+        detections: List[DetectionRecord] = []
         
        
         try:
@@ -82,9 +121,9 @@ class BeaconingDetector(BaseDetectionModel):
                 peak_magnitude = magnitude[peak_index]
 
                 if peak_magnitude > self.fft_threshold:
-                    detections.append(Detection(
+                    detections.append(DetectionRecord(
                         engine_name=self.engine_name,
-                        timestamp=getattr(window_stats, "end_time", None),
+                        timestamp=window_stats.end,
                         severity=min(1.0, peak_magnitude / self.fft_threshold),
                         score=peak_magnitude,
                         label="C2 Beaconing Suspect (FFT)",
@@ -1,24 +1,66 @@
-from typing import List
+from typing import List, Dict, Any, Optional, Tuple
 from collections import deque
-from scapy.all import Packet
+import math
+from scapy.packet import Packet
 import numpy as np
 from zshark.models.base import BaseDetectionModel
-from zshark.core.data_structures import Detection, ModelConfig, WindowStats
+from zshark.core.data_structures import ModelConfig
+from zshark.core.records import DetectionRecord, WindowRecord
+from zshark.core.baseline import bucket_stats
+from zshark.core.memory import DEQUE_BYTES, DEQUE_ITEM_BYTES
 
 class DDoSDetector(BaseDetectionModel):
 
+    required_features = frozenset({"src_ip_entropy"})
+
     def __init__(self, config: ModelConfig):
         super().__init__(config)
         self.history_size = int(self.config.params.get("history_size", 100))
         self.pps_history = deque(maxlen=self.history_size)
         self.entropy_history = deque(maxlen=self.history_size)     
+        self.sample_rate = 1
+        self.window_s = float(self.config.window_size_s)
+        self.baseline: Optional[Dict[str, Any]] = None
+        self.min_bucket_windows = int(self.config.params.get("min_bucket_windows", 10))
+
+    def load_baseline(self, profile: Dict[str, Any]) -> None:
+        self.baseline = profile
+
+    def _reference(self, timestamp: float, metric: str) -> Optional[Tuple[float, float]]:
+        # Mean and spread of the trained profile for this hour of day, if it has enough windows.
+        if self.baseline is None:
+            return None
+        stats = bucket_stats(self.baseline, timestamp, metric, self.min_bucket_windows)
+        if stats is None:
+            return None
+        # Rates vary less over longer windows; rescale the spread to this run's window size.
+        trained_s = float(self.baseline.get("window_size_s") or self.window_s)
+        return stats["mean"], stats["std"] * math.sqrt(trained_s / self.window_s)
 
     def set_global_baseline(self, avg_pps: float):
         if avg_pps > 0:
             for _ in range(20):
                 self.pps_history.append(avg_pps)
 
-    def update_baseline(self, window_stats: WindowStats, window_packets: List[Packet]) -> None:
+    def set_sampling_rate(self, rate: int, window_s: float):
+        self.sample_rate = rate
+        self.window_s = float(window_s) or 1.0
+
+    def state_size(self) -> Dict[str, int]:
+        return {"pps_history": len(self.pps_history), "entropy_history": len(self.entropy_history)}
+
+    def memory_usage(self) -> int:
+        # Bounded by history_size; counted but never evicted.
+        return 2 * DEQUE_BYTES + (len(self.pps_history) + len(self.entropy_history)) * DEQUE_ITEM_BYTES
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"pps_history": list(self.pps_history), "entropy_history": list(self.entropy_history)}
+
+    def restore(self, state: Dict[str, Any]) -> None:
+        self.pps_history = deque(state.get("pps_history", ()), maxlen=self.history_size)
+        self.entropy_history = deque(state.get("entropy_history", ()), maxlen=self.history_size)
+
+    def update_baseline(self, window_stats: WindowRecord, window_packets: List[Packet]) -> None:
         try:
             curr_pps = float(getattr(window_stats, "pps", 0.0))
         except Exception:
@@ -32,30 +74,38 @@ class DDoSDetector(BaseDetectionModel):
         self.pps_history.append(curr_pps)
         self.entropy_history.append(curr_entropy)
 
-    def analyze(self, window_stats: WindowStats, window_packets: List[Packet]) -> List[Detection]:
-        detections: List[Detection] = []
+    def analyze(self, window_stats: WindowRecord, window_packets: List[Packet]) -> List[DetectionRecord]:
+        detections: List[DetectionRecord] = []
         
         self.update_baseline(window_stats, window_packets)
 
         current_pps = self.pps_history[-1] if self.pps_history else 0.0
         current_entropy = self.entropy_history[-1] if self.entropy_history else 0.0
 
-        pps_list = list(self.pps_history)[:-1]
-        if not pps_list: return detections
-        
-        pps_array = np.array(pps_list, dtype=float)
-        mean_pps = float(np.mean(pps_array))
-        std_pps = float(np.std(pps_array))
+        reference = self._reference(window_stats.start, "pps")
+        if reference is not None:
+            mean_pps, std_pps = reference
+        else:
+            pps_list = list(self.pps_history)[:-1]
+            if not pps_list: return detections
+            
+            pps_array = np.array(pps_list, dtype=float)
+            mean_pps = float(np.mean(pps_array))
+            std_pps = float(np.std(pps_array))
         
         if std_pps == 0.0: std_pps = 1.0 
+        if self.sample_rate > 1:
+            # 1-in-N sampling adds binomial noise to the scaled PPS: var ~= pps * (N - 1) / window.
+            # Never let the spread fall below it, or sampling noise alone would trip the threshold.
+            std_pps = max(std_pps, (max(mean_pps, 0.0) * (self.sample_rate - 1) / self.window_s) ** 0.5)
 
         pps_z_score = (current_pps - mean_pps) / std_pps
         pps_threshold = float(self.config.params.get("pps_z_threshold", 5.0))
 
         if pps_z_score > pps_threshold:
-            detections.append(Detection(
+            detections.append(DetectionRecord(
                 engine_name=self.engine_name,
-                timestamp=getattr(window_stats, "end_time", None),
+                timestamp=window_stats.end,
                 severity=min(1.0, (pps_z_score - pps_threshold) / max(pps_threshold, 1.0)),
                 score=pps_z_score,
                 label="High Volume Anomaly (DDoS Suspect)",
@@ -63,14 +113,15 @@ class DDoSDetector(BaseDetectionModel):
                 evidence={"current_pps": current_pps, "mean_pps": mean_pps, "z_score": pps_z_score}
             ))
 
+        entropy_reference = self._reference(window_stats.start, "src_ip_entropy")
         entropy_array = np.array(list(self.entropy_history)[:-1], dtype=float)
-        if entropy_array.size > 0:
-            mean_entropy = float(np.mean(entropy_array))
+        if entropy_reference is not None or entropy_array.size > 0:
+            mean_entropy = entropy_reference[0] if entropy_reference is not None else float(np.mean(entropy_array))
           
             if current_entropy < mean_entropy * 0.5 and mean_entropy > 1.0:
-                detections.append(Detection(
+                detections.append(DetectionRecord(
                     engine_name=self.engine_name,
-                    timestamp=getattr(window_stats, "end_time", None),
+                    timestamp=window_stats.end,
                     severity=0.8,
                     score=current_entropy,
                     label="Source IP Entropy Collapse",
@@ -1,18 +1,54 @@
-from typing import List
+from typing import List, Dict, Any, Optional
 import math
-from scapy.all import Packet, DNS
+from scapy.packet import Packet
+from scapy.layers.dns import DNS
+from scapy.layers.inet import IP
+from scapy.layers.inet6 import IPv6
 from loguru import logger
 from zshark.models.base import BaseDetectionModel
-from zshark.core.data_structures import Detection, ModelConfig, WindowStats
+from zshark.core.data_structures import ModelConfig
+from zshark.core.records import DetectionRecord, WindowRecord
+from zshark.core.baseline import NgramModel
+from zshark.core.memory import ENTRY_BYTES
+
+def query_name(packet: Packet) -> Optional[str]:
+    # Name asked by a DNS query packet, or None for responses and non-DNS packets.
+    if not packet.haslayer(DNS) or packet.getlayer(DNS).qr != 0:
+        return None
+    qr = packet.getlayer(DNS)
+    if qr.qd is None:
+        return None
+    raw_qname = getattr(qr.qd, "qname", None)
+    if not raw_qname:
+        return None
+    if isinstance(raw_qname, bytes):
+        return raw_qname.decode("utf-8", errors="ignore").rstrip(".")
+    return str(raw_qname).rstrip(".")
+
+def domain_label(qname: str) -> str:
+    # Registered name without the public suffix: "mail.example.co.uk" -> "example".
+    parts = qname.split(".")
+    if len(parts) >= 3 and len(parts[-1]) == 2 and len(parts[-2]) <= 3:
+        return parts[-3]
+    if len(parts) >= 2:
+        return parts[-2]
+    return parts[0]
 
 class DNSAnomalyDetector(BaseDetectionModel):
 
+    packet_filter = "port 53 or port 5353"
+    cost_tier = "expensive"
+
     def __init__(self, config: ModelConfig):
         super().__init__(config)
         self.entropy_threshold = float(self.config.params.get('entropy_threshold', 3.8))
      
         self.max_seen_domains = 50000 
-        self.seen_domains = set()
+        # Label -> time it was last queried.
+        self.seen_domains: Dict[str, float] = {}
+        self.benign_domains = set()
+        self.ngram: Optional[NgramModel] = None
+        self.ngram_z = float(self.config.params.get('ngram_z_threshold', 2.0))
 
     def _calculate_char_entropy(self, text: str) -> float:
         if not text:
@@ -28,58 +64,78 @@ class DNSAnomalyDetector(BaseDetectionModel):
             entropy -= p * math.log2(p)
         return entropy
 
-    def update_baseline(self, window_stats: WindowStats, window_packets: List[Packet]) -> None:
+    def state_size(self) -> Dict[str, int]:
+        return {"seen_domains": len(self.seen_domains)}
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"seen_domains": dict(self.seen_domains)}
+
+    def restore(self, state: Dict[str, Any]) -> None:
+        seen = state.get("seen_domains", {})
+        # State saved before labels carried their last query time.
+        self.seen_domains = dict(seen) if isinstance(seen, dict) else dict.fromkeys(seen, 0.0)
+
+    def memory_usage(self) -> int:
+        return len(self.seen_domains) * ENTRY_BYTES
+
+    def eviction_candidates(self):
+        for label, last_seen in self.seen_domains.items():
+            yield last_seen, label, ENTRY_BYTES
+
+    def evict(self, keys) -> None:
+        for label in keys:
+            self.seen_domains.pop(label, None)
+
+    def load_baseline(self, profile: Dict[str, Any]) -> None:
+        self.benign_domains = set(profile.get("domains", {}))
+        self.ngram = NgramModel.from_profile(profile)
+
+    def update_baseline(self, window_stats: WindowRecord, window_packets: List[Packet]) -> None:
         pass
 
-    def analyze(self, window_stats: WindowStats, window_packets: List[Packet]) -> List[Detection]:
+    def analyze(self, window_stats: WindowRecord, window_packets: List[Packet]) -> List[DetectionRecord]:
 
         if len(self.seen_domains) > self.max_seen_domains:
             self.seen_domains.clear()
             
-        detections: List[Detection] = []
+        detections: List[DetectionRecord] = []
 
         for packet in window_packets:
             try:
-                if packet.haslayer(DNS) and packet.getlayer(DNS).qr == 0:
-                    qr = packet.getlayer(DNS)
-                    if qr.qd is not None:
-                        raw_qname = getattr(qr.qd, "qname", None)
-                        if raw_qname:
-                            if isinstance(raw_qname, bytes):
-                                qname = raw_qname.decode("utf-8", errors="ignore").rstrip(".")
-                            else:
-                                qname = str(raw_qname).rstrip(".")
-                            
-                            parts = qname.split(".")
-                            domain_label = ""
-                            
-                            if len(parts) >= 3 and len(parts[-1]) == 2 and len(parts[-2]) <= 3:
-                              
-                                domain_label = parts[-3]
-                            elif len(parts) >= 2:
-                                domain_label = parts[-2]
-                            else:
-                                domain_label = parts[0]
-
-                            if domain_label in self.seen_domains:
-                                continue
-                            self.seen_domains.add(domain_label)
-
-                            if len(domain_label) < 5:
-                                continue
-
-                            entropy = self._calculate_char_entropy(domain_label)
-                            
-                            if entropy > self.entropy_threshold:
-                                detections.append(Detection(
-                                    engine_name=self.engine_name,
-                                    timestamp=getattr(window_stats, "end_time", None),
-                                    severity=min(1.0, entropy / 5.0),
-                                    score=entropy,
-                                    label="DNS High Entropy (DGA Suspect)",
-                                    justification=f"Domain '{qname}' (Label: {domain_label}) has high entropy ({entropy:.2f}).",
-                                    evidence={"domain": qname, "entropy": entropy}
-                                ))
+                qname = query_name(packet)
+                if qname is None:
+                    continue
+                label = domain_label(qname)
+
+                seen = label in self.seen_domains
+                self.seen_domains[label] = window_stats.end
+                if seen:
+                    continue
+
+                if len(label) < 5 or label.lower() in self.benign_domains:
+                    continue
+
+                entropy = self._calculate_char_entropy(label)
+                
+                if entropy > self.entropy_threshold:
+                    evidence = {}
+                    if self.ngram is not None:
+                        # Character bigrams typical of the benign corpus: random-looking but not a DGA.
+                        ngram_z = self.ngram.z_score(label)
+                        if ngram_z > -self.ngram_z:
+                            continue
+                        evidence["ngram_z"] = ngram_z
+                    client = packet.getlayer(IP) or packet.getlayer(IPv6)
+                    detections.append(DetectionRecord(
+                        engine_name=self.engine_name,
+                        timestamp=window_stats.end,
+                        severity=min(1.0, entropy / 5.0),
+                        score=entropy,
+                        label="DNS High Entropy (DGA Suspect)",
+                        justification=f"Domain '{qname}' (Label: {label}) has high entropy ({entropy:.2f}).",
+                        evidence={"domain": qname, "entropy": entropy,
+                                  "client_ip": client.src if client is not None else None, **evidence}
+                    ))
             except Exception as e:
                 continue
 
@@ -1,11 +1,16 @@
-from typing import List, Dict, Set
+from typing import List, Dict, Set, Any
 from collections import defaultdict
-from datetime import datetime
-from scapy.all import Packet, IP, TCP, UDP
+from scapy.packet import Packet
+from scapy.layers.inet import IP, TCP, UDP
 from zshark.models.base import BaseDetectionModel
-from zshark.core.data_structures import Detection, WindowStats, ModelConfig
+from zshark.core.data_structures import ModelConfig
+from zshark.core.records import DetectionRecord, WindowRecord
+from zshark.core.memory import ENTRY_BYTES, SET_BYTES, SET_ITEM_BYTES
 
 class PortScanDetector(BaseDetectionModel):
+
+    packet_filter = "ip"
+
     def __init__(self, config: ModelConfig):
         super().__init__(config)
         self.min_unique_ports = self.config.params.get("min_unique_ports", 10)
@@ -13,16 +18,38 @@ class PortScanDetector(BaseDetectionModel):
         self.scan_history: Dict[str, Set[int]] = defaultdict(set)
         self.last_seen: Dict[str, float] = {}
 
-    def update_baseline(self, window_stats: WindowStats, window_packets: List[Packet]) -> None:
+    def state_size(self) -> Dict[str, int]:
+        return {"scan_history": len(self.scan_history), "last_seen": len(self.last_seen)}
+
+    def memory_usage(self) -> int:
+        ports = sum(len(ports) for ports in self.scan_history.values())
+        return (len(self.last_seen) * ENTRY_BYTES + len(self.scan_history) * (ENTRY_BYTES + SET_BYTES)
+                + ports * SET_ITEM_BYTES)
+
+    def eviction_candidates(self):
+        for src_ip, ports in self.scan_history.items():
+            yield self.last_seen.get(src_ip, 0.0), src_ip, 2 * ENTRY_BYTES + SET_BYTES + len(ports) * SET_ITEM_BYTES
+
+    def evict(self, keys) -> None:
+        for src_ip in keys:
+            self.scan_history.pop(src_ip, None)
+            self.last_seen.pop(src_ip, None)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"scan_history": {ip: set(ports) for ip, ports in self.scan_history.items()},
+                "last_seen": dict(self.last_seen)}
+
+    def restore(self, state: Dict[str, Any]) -> None:
+        self.scan_history = defaultdict(set, {ip: set(ports) for ip, ports in state.get("scan_history", {}).items()})
+        self.last_seen = dict(state.get("last_seen", {}))
+
+    def update_baseline(self, window_stats: WindowRecord, window_packets: List[Packet]) -> None:
         pass
 
-    def analyze(self, window_stats: WindowStats, window_packets: List[Packet]) -> List[Detection]:
-        detections: List[Detection] = []
+    def analyze(self, window_stats: WindowRecord, window_packets: List[Packet]) -> List[DetectionRecord]:
+        detections: List[DetectionRecord] = []
         
-        try:
-            current_ts = datetime.fromisoformat(window_stats.end_time).timestamp()
-        except:
-            current_ts = datetime.now().timestamp()
+        current_ts = window_stats.end
 
         for pkt in window_packets:
             if IP in pkt:
@@ -52,9 +79,9 @@ class PortScanDetector(BaseDetectionModel):
             if unique_ports_count >= self.min_unique_ports:
                 score = unique_ports_count
                 severity = min(1.0, (unique_ports_count - self.min_unique_ports) / 20.0)
-                detections.append(Detection(
+                detections.append(DetectionRecord(
                     engine_name=self.engine_name,
-                    timestamp=window_stats.end_time,
+                    timestamp=window_stats.end,
                     severity=severity,
                     score=score,
                     label="Port Scan Suspect (Stateful)",
@@ -0,0 +1,17 @@
+from importlib import import_module
+
+# The report feature set is defined in the core (the analyzer computes it by default) and
+# re-exported lazily, so rendering a report does not pull in Scapy via zshark.core.utils.
+_EXPORTS = {
+    "REPORT_FEATURES": "zshark.core.utils",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        value = getattr(import_module(_EXPORTS[name]), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,88 @@
+import json
+from json.decoder import WHITESPACE
+from typing import Any, Collection, Iterator, Tuple, TextIO
+
+CHUNK_SIZE = 1 << 20
+_NUMBER_TAIL = frozenset("0123456789.eE+-")
+
+_decoder = json.JSONDecoder()
+
+
+class _Reader:
+    def __init__(self, f: TextIO, chunk_size: int):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        if self.eof:
+            return False
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        # Drop what has been consumed so the buffer only holds the value being decoded.
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        while True:
+            self.pos = WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                return ""
+
+    def expect(self, chars: str) -> str:
+        char = self.peek()
+        if not char or char not in chars:
+            found = repr(char) if char else "end of file"
+            raise ValueError(f"Expected one of {chars!r} but found {found}")
+        self.pos += 1
+        return char
+
+    def value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self.fill():
+                    continue
+                raise
+            # A number cut by the chunk edge ("12" of "12.5e3") still decodes; read on to be sure.
+            if (end == len(self.buf) or self.buf[end] in _NUMBER_TAIL) and self.fill():
+                continue
+            self.pos = end
+            return value
+
+
+def iter_object(path: str, streamed: Collection[str] = (), chunk_size: int = CHUNK_SIZE) -> Iterator[Tuple[str, Any]]:
+    # Yields (key, value) for each member of the top-level object. Arrays under a
+    # key in `streamed` are yielded one (key, element) pair at a time instead.
+    with open(path, "r", encoding="utf-8") as f:
+        reader = _Reader(f, chunk_size)
+        reader.expect("{")
+        if reader.peek() == "}":
+            return
+        while True:
+            if reader.peek() != '"':
+                raise ValueError("Expected an object key")
+            key = reader.value()
+            reader.expect(":")
+            if key in streamed and reader.peek() == "[":
+                reader.pos += 1
+                if reader.peek() == "]":
+                    reader.pos += 1
+                else:
+                    while True:
+                        yield key, reader.value()
+                        if reader.expect(",]") == "]":
+                            break
+            else:
+                yield key, reader.value()
+            if reader.expect(",}") == "}":
+                return
@@ -1,7 +1,10 @@
-import json
+from array import array
 from pathlib import Path
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple, Sequence
+from collections import Counter, defaultdict
+from operator import itemgetter
+import heapq
 import re
 
 from reportlab.lib import colors
@@ -11,30 +14,78 @@ from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.graphics.shapes import Drawing
-from reportlab.graphics.charts.linecharts import VerticalLineChart
-from reportlab.graphics.charts.axes import XCategoryAxis
-from reportlab.graphics.charts.axes import XValueAxis
-
-
-try:
-    pdfmetrics.registerFont(TTFont('Arial', 'Arial.ttf'))
-    pdfmetrics.registerFont(TTFont('Arial-Bold', 'Arialbd.ttf'))
-    FONT_NAME = 'Arial'
-    FONT_NAME_BOLD = 'Arial-Bold'
-except:
-    FONT_NAME = 'Helvetica'
-    FONT_NAME_BOLD = 'Helvetica-Bold'
-
-styles = getSampleStyleSheet()
-styles.add(ParagraphStyle(name='TitleStyle', fontName=FONT_NAME_BOLD, fontSize=18, leading=22, alignment=1))
-styles.add(ParagraphStyle(name='SectionTitle', fontName=FONT_NAME_BOLD, fontSize=14, leading=18, spaceBefore=12, spaceAfter=6))
-styles['Normal'].fontName = FONT_NAME
-styles['Normal'].fontSize = 10
-styles['Normal'].leading = 12
-styles.add(ParagraphStyle(name='Monospace', fontName='Courier', fontSize=9, leading=11, backColor=colors.lightgrey))
-styles.add(ParagraphStyle(name='Justified', fontName=FONT_NAME, fontSize=10, leading=12, alignment=4, wordWrap='LTR'))
-styles.add(ParagraphStyle(name='Footer', fontName=FONT_NAME, fontSize=8, alignment=1))
+from reportlab.graphics.shapes import Drawing, String
+from reportlab.graphics.charts.lineplots import LinePlot
+
+from zshark.reports.json_stream import iter_object
+
+
+FONT_NAME = 'Helvetica'
+FONT_NAME_BOLD = 'Helvetica-Bold'
+styles = None
+table_styles = {}
+
+MAX_CHART_POINTS = 300
+DETECTION_ROWS_PER_TABLE = 40
+APPENDIX_ROWS_PER_TABLE = 60
+DEFAULT_MAX_DETAIL_ROWS = 500
+DEFAULT_MAX_APPENDIX_ROWS = 1000
+GROUP_BY_CHOICES = ("label", "entity", "none")
+ENTITY_KEYS = ("source_ip", "client_ip", "ip", "flow_key")
+STREAMED_KEYS = ("detections", "window_stats")
+
+def setup_fonts_and_styles():
+    # Font registration and stylesheet construction are deferred until a
+    # report is actually rendered, keeping module import cheap.
+    global FONT_NAME, FONT_NAME_BOLD, styles
+    if styles is not None:
+        return styles
+
+    try:
+        pdfmetrics.registerFont(TTFont('Arial', 'Arial.ttf'))
+        pdfmetrics.registerFont(TTFont('Arial-Bold', 'Arialbd.ttf'))
+        FONT_NAME = 'Arial'
+        FONT_NAME_BOLD = 'Arial-Bold'
+    except:
+        FONT_NAME = 'Helvetica'
+        FONT_NAME_BOLD = 'Helvetica-Bold'
+
+    sheet = getSampleStyleSheet()
+    sheet.add(ParagraphStyle(name='TitleStyle', fontName=FONT_NAME_BOLD, fontSize=18, leading=22, alignment=1))
+    sheet.add(ParagraphStyle(name='SectionTitle', fontName=FONT_NAME_BOLD, fontSize=14, leading=18, spaceBefore=12, spaceAfter=6))
+    sheet['Normal'].fontName = FONT_NAME
+    sheet['Normal'].fontSize = 10
+    sheet['Normal'].leading = 12
+    sheet.add(ParagraphStyle(name='Monospace', fontName='Courier', fontSize=9, leading=11, backColor=colors.lightgrey))
+    sheet.add(ParagraphStyle(name='Justified', fontName=FONT_NAME, fontSize=10, leading=12, alignment=4, wordWrap='LTR'))
+    sheet.add(ParagraphStyle(name='Footer', fontName=FONT_NAME, fontSize=8, alignment=1))
+    sheet.add(ParagraphStyle(name='GroupTitle', fontName=FONT_NAME_BOLD, fontSize=11, leading=14, spaceBefore=8, spaceAfter=4))
+    for severity, color in (('HIGH', colors.red), ('MEDIUM', colors.orange), ('LOW', colors.green), ('INFO', colors.black)):
+        sheet.add(ParagraphStyle(name=f'Severity{severity}', fontName=FONT_NAME_BOLD, fontSize=10, textColor=color))
+
+    table_styles['detections'] = TableStyle([
+        ('BACKGROUND',(0,0),(-1,0),colors.Color(153/255,204/255,255/255)),
+        ('GRID',(0,0),(-1,-1),0.5,colors.grey),
+        ('FONTNAME',(0,0),(-1,0),FONT_NAME_BOLD),
+        ('FONTNAME',(0,1),(-1,-1),FONT_NAME),
+        ('FONTSIZE',(0,0),(-1,-1),9),
+        ('VALIGN',(0,0),(-1,-1),'TOP'),
+        ('LEFTPADDING',(0,0),(-1,-1),4),
+        ('RIGHTPADDING',(0,0),(-1,-1),4),
+    ])
+    table_styles['compact'] = TableStyle([
+        ('BACKGROUND',(0,0),(-1,0),colors.Color(204/255,229/255,255/255)),
+        ('GRID',(0,0),(-1,-1),0.25,colors.grey),
+        ('FONTNAME',(0,0),(-1,0),FONT_NAME_BOLD),
+        ('FONTNAME',(0,1),(-1,-1),FONT_NAME),
+        ('FONTSIZE',(0,0),(-1,-1),7),
+        ('TOPPADDING',(0,0),(-1,-1),1),
+        ('BOTTOMPADDING',(0,0),(-1,-1),1),
+        ('LEFTPADDING',(0,0),(-1,-1),3),
+        ('RIGHTPADDING',(0,0),(-1,-1),3),
+    ])
+    styles = sheet
+    return styles
 
 SEVERITY_COLORS = {
     'HIGH': colors.Color(255 / 255, 102 / 255, 102 / 255, alpha=0.3),
@@ -78,47 +129,100 @@ def header_footer_template(canvas, doc):
     canvas.drawCentredString(doc.width / 2 + doc.leftMargin, 0.75 * inch, signature_line)
     canvas.restoreState()
 
-def create_rate_chart(analysis_data: Dict[str, Any], rate_type: str):
-    window_stats = analysis_data.get('window_stats', [])
-    if not window_stats:
+def lttb(points: Sequence[Tuple[float, float]], threshold: int) -> List[Tuple[float, float]]:
+    # Largest-Triangle-Three-Buckets: keeps the first and last points and, per bucket,
+    # the point forming the largest triangle with the previous pick and the next bucket's mean.
+    n = len(points)
+    if threshold >= n or threshold < 3:
+        return list(points)
+
+    sampled = [points[0]]
+    bucket_size = (n - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        avg_start = int((i + 1) * bucket_size) + 1
+        avg_end = min(int((i + 2) * bucket_size) + 1, n)
+        avg_x = sum(p[0] for p in points[avg_start:avg_end]) / (avg_end - avg_start)
+        avg_y = sum(p[1] for p in points[avg_start:avg_end]) / (avg_end - avg_start)
+
+        ax, ay = points[a]
+        max_area = -1.0
+        next_a = range_start = int(i * bucket_size) + 1
+        for j in range(range_start, int((i + 1) * bucket_size) + 1):
+            area = abs((ax - avg_x) * (points[j][1] - ay) - (ax - points[j][0]) * (avg_y - ay))
+            if area > max_area:
+                max_area = area
+                next_a = j
+        sampled.append(points[next_a])
+        a = next_a
+
+    sampled.append(points[-1])
+    return sampled
+
+class RateSeries:
+    # Two flat float arrays instead of one dict per window: 16 bytes per point.
+    def __init__(self):
+        self.origin = None
+        self.offsets = array('d')
+        self.values = array('d')
+
+    def append(self, start_time: str, value: float):
+        ts = datetime.fromisoformat(start_time).timestamp()
+        if self.origin is None:
+            self.origin = ts
+        self.offsets.append(ts - self.origin)
+        self.values.append(float(value or 0))
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(zip(self.offsets[index], self.values[index]))
+        return self.offsets[index], self.values[index]
+
+def create_rate_chart(series: RateSeries, rate_type: str, max_points: int = MAX_CHART_POINTS):
+    setup_fonts_and_styles()
+    if not len(series):
         return Paragraph(f"<i>No window statistics available to generate {rate_type} chart.</i>", styles['Normal'])
 
-    rate_key = 'pps' if rate_type == 'PPS' else 'bps'
     line_color = colors.blue if rate_type == 'PPS' else colors.red
-
-    rate_data = [[]]
-    time_labels = []
-    for i, window in enumerate(window_stats):
-        time_labels.append(f"W{i+1}")
-        rate_data[0].append(window.get(rate_key, 0))
+    origin = series.origin
+    points = lttb(series, max_points)
 
     drawing = Drawing(450, 200)
-    chart = VerticalLineChart()
+    chart = LinePlot()
     chart.x = 50
     chart.y = 30
     chart.height = 150
     chart.width = 350
-    chart.data = rate_data
-
-    max_rate = max(rate_data[0]) if rate_data[0] else 10
-    chart.valueAxis.valueMin = 0
-    chart.valueAxis.valueMax = max_rate * 1.1
-    chart.valueAxis.valueStep = max(1, int(max_rate / 5))
-    chart.valueAxis.labels.fontName = FONT_NAME
-    chart.valueAxis.labels.fontSize = 8
-
-    chart.categoryAxis.categoryNames = time_labels
-    chart.categoryAxis.labels.angle = 30
-    chart.categoryAxis.labels.fontName = FONT_NAME
-    chart.categoryAxis.labels.fontSize = 6
-    chart.categoryAxis.labels.boxAnchor = 'n'
+    chart.data = [points]
+
+    max_rate = max(value for _, value in points) or 10
+    chart.yValueAxis.valueMin = 0
+    chart.yValueAxis.valueMax = max_rate * 1.1
+    chart.yValueAxis.valueStep = max(1, int(max_rate / 5))
+    chart.yValueAxis.labels.fontName = FONT_NAME
+    chart.yValueAxis.labels.fontSize = 8
+
+    chart.xValueAxis.valueMin = 0
+    chart.xValueAxis.valueMax = max(points[-1][0], 1)
+    chart.xValueAxis.labelTextFormat = lambda offset: datetime.fromtimestamp(origin + offset).strftime("%H:%M:%S")
+    chart.xValueAxis.labels.angle = 30
+    chart.xValueAxis.labels.fontName = FONT_NAME
+    chart.xValueAxis.labels.fontSize = 6
+    chart.xValueAxis.labels.boxAnchor = 'ne'
 
     chart.lines[0].strokeColor = line_color
     chart.lines[0].strokeWidth = 2
     drawing.add(chart)
+    if len(points) < len(series):
+        drawing.add(String(400, 185, f"{len(points)} of {len(series)} windows (LTTB)", fontName=FONT_NAME,
+                           fontSize=6, textAnchor='end', fillColor=colors.grey))
     return drawing
 
 def create_top_talkers_table(analysis_data: Dict[str, Any], key: str, title: str, top_n: int = 5):
+    setup_fonts_and_styles()
     if key == 'top_source_ips':
         stats = analysis_data.get('top_source_ips', [])
         header = ["Source IP", "Packets", "Bytes"]
@@ -153,11 +257,173 @@ def create_top_talkers_table(analysis_data: Dict[str, Any], key: str, title: str
     story = [Paragraph(title, styles['SectionTitle']), table, Spacer(1, 0.2 * inch)]
     return story
 
+def detection_entity(det: dict) -> str:
+    evidence = det.get('evidence') or {}
+    for key in ENTITY_KEYS:
+        if evidence.get(key):
+            return str(evidence[key])
+    return det.get('flow_key') or '-'
+
+def _severity_order(det: dict) -> Tuple[float, str]:
+    return (-float(det.get('severity', 0.0)), det.get('timestamp', ''))
+
+def split_detections(detections: List[dict], max_rows: int) -> Tuple[List[dict], List[dict]]:
+    if len(detections) <= max_rows:
+        return detections, []
+    ranked = sorted(detections, key=_severity_order)
+    return ranked[:max_rows], ranked[max_rows:]
+
+def create_detection_summary_table(counts: Dict[str, Counter]):
+    if not counts:
+        return [Paragraph("<i>No incidents were detected.</i>", styles['Normal'])]
+
+    levels = ['HIGH', 'MEDIUM', 'LOW', 'INFO']
+    table_data = [["Label", *levels, "Total"]]
+    for label, by_severity in sorted(counts.items(), key=lambda item: -sum(item[1].values())):
+        table_data.append([label, *(f"{by_severity[level]:,}" for level in levels), f"{sum(by_severity.values()):,}"])
+
+    table = Table(table_data, colWidths=[3.0*inch, 0.75*inch, 0.75*inch, 0.75*inch, 0.75*inch, 0.8*inch], repeatRows=1)
+    table.setStyle(table_styles['compact'])
+    return [table, Spacer(1, 0.15*inch)]
+
+def _detection_row(det: dict) -> List[Any]:
+    sev = get_severity_from_json(det)
+    justification_text = format_long_numbers(det.get('justification','N/A'))
+    if len(justification_text) > 500:
+        justification_text = justification_text[:500] + "..."
+    return [
+        Paragraph(datetime.fromisoformat(det['timestamp']).strftime("%H:%M:%S"), styles['Normal']),
+        Paragraph(sev, styles[f'Severity{sev}']),
+        Paragraph(det.get('label','N/A'), styles['Normal']),
+        Paragraph(det.get('engine_name', det.get('model','N/A')), styles['Normal']),
+        Paragraph(justification_text, styles['Justified'])
+    ]
+
+def _detection_header() -> List[Any]:
+    return [Paragraph(title, styles['Normal']) for title in ("Time", "Severity", "Label", "Model", "Justification")]
+
+def create_incident_table(incidents: List[dict], top_n: int = 20):
+    # Only hosts flagged by more than one engine; single-engine incidents repeat the tables below.
+    correlated = [incident for incident in incidents if len(incident.get('engines', [])) > 1]
+    if not correlated:
+        return []
+    rows = [[Paragraph(title, styles['Normal']) for title in ("First Seen", "Host", "Severity", "Labels", "Detections")]]
+    for incident in correlated[:top_n]:
+        sev = get_severity_from_json(incident)
+        rows.append([
+            Paragraph(datetime.fromisoformat(incident['first_seen']).strftime("%H:%M:%S"), styles['Normal']),
+            Paragraph(incident['entity'], styles['Normal']),
+            Paragraph(f"{sev} ({incident['severity']:.2f})", styles[f'Severity{sev}']),
+            Paragraph(", ".join(incident.get('labels', [])), styles['Justified']),
+            Paragraph(f"{incident.get('detection_count', 0):,}", styles['Normal']),
+        ])
+    table = Table(rows, colWidths=[0.8*inch, 1.2*inch, 1.0*inch, 3.6*inch, 0.8*inch], repeatRows=1)
+    table.setStyle(table_styles['detections'])
+    return [Paragraph(f"Correlated Incidents ({len(correlated):,} host(s) flagged by more than one engine)",
+                      styles['GroupTitle']), table, Spacer(1, 0.15*inch)]
+
+def create_detection_tables(detections: List[dict], group_by: str = "label"):
+    # Page-sized tables keep ReportLab's layout cost linear in the number of rows.
+    if group_by == "none":
+        groups = [(None, sorted(detections, key=lambda det: det.get('timestamp', '')))]
+    else:
+        key_func = (lambda det: det.get('label', 'N/A')) if group_by == "label" else detection_entity
+        grouped = defaultdict(list)
+        for det in detections:
+            grouped[key_func(det)].append(det)
+        groups = sorted(((key, sorted(dets, key=_severity_order)) for key, dets in grouped.items()),
+                        key=lambda item: (_severity_order(item[1][0])[0], -len(item[1])))
+
+    col_widths = [0.8*inch,0.8*inch,1.5*inch,1.5*inch,3.0*inch]
+    story = []
+    for key, dets in groups:
+        if key is not None:
+            story.append(Paragraph(f"{key} ({len(dets):,})", styles['GroupTitle']))
+        for start in range(0, len(dets), DETECTION_ROWS_PER_TABLE):
+            rows = [_detection_header()] + [_detection_row(det) for det in dets[start:start + DETECTION_ROWS_PER_TABLE]]
+            table = Table(rows, colWidths=col_widths, repeatRows=1)
+            table.setStyle(table_styles['detections'])
+            story.append(table)
+    return story
+
+def appendix_row(det: dict) -> Tuple[str, ...]:
+    return (
+        datetime.fromisoformat(det['timestamp']).strftime("%Y-%m-%d %H:%M:%S"),
+        get_severity_from_json(det),
+        det.get('label', 'N/A')[:48],
+        detection_entity(det)[:40],
+        f"{float(det.get('score', 0.0)):.3f}",
+    )
+
+def create_overflow_appendix(rows: List[Tuple[str, ...]], omitted: int = 0):
+    # Plain-string cells: no paragraph wrapping, so thousands of rows stay cheap.
+    story = [Paragraph("Appendix A. Additional Detections", styles['SectionTitle'])]
+    header = ["Time", "Severity", "Label", "Entity", "Score"]
+    col_widths = [1.2*inch, 0.7*inch, 2.4*inch, 1.9*inch, 0.8*inch]
+    for start in range(0, len(rows), APPENDIX_ROWS_PER_TABLE):
+        chunk = [header] + [list(row) for row in rows[start:start + APPENDIX_ROWS_PER_TABLE]]
+        table = Table(chunk, colWidths=col_widths, repeatRows=1)
+        table.setStyle(table_styles['compact'])
+        story.append(table)
+    if omitted:
+        story.append(Paragraph(f"<i>{omitted:,} further lower-severity detection(s) are not listed; they are counted "
+                               f"in the summary table of section 4.</i>", styles['Normal']))
+    return story
+
+def load_report_data(analysis_json_path: str, max_detail_rows: int = DEFAULT_MAX_DETAIL_ROWS,
+                     max_appendix_rows: int = DEFAULT_MAX_APPENDIX_ROWS) -> Dict[str, Any]:
+    # Streams windows and detections so only per-section aggregates stay in memory:
+    # the rate series, label x severity counts, the top detections and compact appendix rows.
+    # Both detection lists are bounded (at most 2x their row limit at once); detections
+    # beyond the appendix limit are only counted.
+    data: Dict[str, Any] = {}
+    series = RateSeries()
+    counts = defaultdict(Counter)
+    total = 0
+    shown: List[dict] = []
+    overflow: List[Tuple[Tuple[float, str], Tuple[str, ...]]] = []
+    overflow_total = 0
+
+    def spill(dets: List[dict]):
+        nonlocal overflow, overflow_total
+        overflow_total += len(dets)
+        overflow.extend((_severity_order(det), appendix_row(det)) for det in dets[:max_appendix_rows])
+        if len(overflow) > 2 * max_appendix_rows:
+            overflow = heapq.nsmallest(max_appendix_rows, overflow, key=itemgetter(0))
+
+    for key, value in iter_object(analysis_json_path, STREAMED_KEYS):
+        if key == 'window_stats':
+            if isinstance(value, dict):
+                series.append(value['start_time'], value.get('pps'))
+        elif key == 'detections':
+            if not isinstance(value, dict):
+                continue
+            total += 1
+            counts[value.get('label', 'N/A')][get_severity_from_json(value)] += 1
+            shown.append(value)
+            if len(shown) > 2 * max_detail_rows:
+                shown, extra = split_detections(shown, max_detail_rows)
+                spill(extra)
+        else:
+            data[key] = value
+
+    shown, extra = split_detections(shown, max_detail_rows)
+    spill(extra)
+    overflow = heapq.nsmallest(max_appendix_rows, overflow, key=itemgetter(0))
+    data.update(rate_series=series, detection_counts=counts, detection_total=total,
+                detections=shown, overflow_rows=[row for _, row in overflow], overflow_total=overflow_total)
+    return data
+
 # --- MAIN FUNCTION ---
-def generate_pdf_report(analysis_json_path: str, pdf_output_path: str):
+def generate_pdf_report(analysis_json_path: str, pdf_output_path: str, max_detail_rows: int = DEFAULT_MAX_DETAIL_ROWS,
+                        group_by: str = "label", max_chart_points: int = MAX_CHART_POINTS,
+                        max_appendix_rows: int = DEFAULT_MAX_APPENDIX_ROWS):
+    setup_fonts_and_styles()
+    if group_by not in GROUP_BY_CHOICES:
+        raise ValueError(f"Unknown grouping '{group_by}'. Choose from: {', '.join(GROUP_BY_CHOICES)}")
+
     try:
-        with open(analysis_json_path, 'r') as f:
-            analysis_data = json.load(f)
+        analysis_data = load_report_data(analysis_json_path, max_detail_rows, max_appendix_rows)
     except Exception as e:
         raise IOError(f"Could not load analysis JSON file: {e}")
 
@@ -188,7 +454,7 @@ def generate_pdf_report(analysis_json_path: str, pdf_output_path: str):
         ["Total Duration", f"{duration:.2f} seconds"],
         ["Total Packets", f"{analysis_data.get('total_packets',0):,}"],
         ["Total Bytes", f"{analysis_data.get('total_bytes',0)/(1024*1024):.2f} MB"],
-        ["Incidents Detected", len(analysis_data.get('detections', []))]
+        ["Incidents Detected", analysis_data['detection_total']]
     ]
 
     summary_table = Table(summary_data, colWidths=[2.5*inch,4.5*inch])
@@ -205,7 +471,7 @@ def generate_pdf_report(analysis_json_path: str, pdf_output_path: str):
     story.append(Spacer(1,0.2*inch))
 
     story.append(Paragraph("2. Packet Rate Over Time (PPS)", styles['SectionTitle']))
-    story.append(create_rate_chart(analysis_data,'PPS'))
+    story.append(create_rate_chart(analysis_data['rate_series'],'PPS',max_chart_points))
     story.append(Spacer(1,0.2*inch))
 
     story.append(Paragraph("3. Network Flow Statistics", styles['SectionTitle']))
@@ -214,56 +480,20 @@ def generate_pdf_report(analysis_json_path: str, pdf_output_path: str):
     story.append(Spacer(1,0.2*inch))
 
     story.append(Paragraph("4. Detected Incidents", styles['SectionTitle']))
-    detections = analysis_data.get('detections', [])
-
-    table_data = [[
-        Paragraph("Time", styles['Normal']),
-        Paragraph("Severity", styles['Normal']),
-        Paragraph("Label", styles['Normal']),
-        Paragraph("Model", styles['Normal']),
-        Paragraph("Justification", styles['Normal'])
-    ]]
-
-    for det in detections:
-        score = det.get('score',0.0)
-        sev = get_severity_from_json(det)
-        justification_text = format_long_numbers(det.get('justification','N/A'))
-        if len(justification_text) > 500:
-            justification_text = justification_text[:500] + "..."
-        justification_paragraph = Paragraph(justification_text, styles['Justified'])
-
-        if sev == 'HIGH':
-            severity_style = ParagraphStyle(name='SeverityStyle', fontName=FONT_NAME_BOLD, fontSize=10, textColor=colors.red)
-        elif sev == 'MEDIUM':
-            severity_style = ParagraphStyle(name='SeverityStyle', fontName=FONT_NAME_BOLD, fontSize=10, textColor=colors.orange)
-        elif sev == 'LOW':
-            severity_style = ParagraphStyle(name='SeverityStyle', fontName=FONT_NAME_BOLD, fontSize=10, textColor=colors.green)
+    overflow = analysis_data['overflow_rows']
+    overflow_total = analysis_data['overflow_total']
+    story.extend(create_detection_summary_table(analysis_data['detection_counts']))
+    story.extend(create_incident_table(analysis_data.get('incidents', [])))
+    story.extend(create_detection_tables(analysis_data['detections'], group_by))
+    if overflow_total:
+        if not overflow:
+            listed = "they are counted in the summary table only"
+        elif len(overflow) < overflow_total:
+            listed = f"the {len(overflow):,} most severe are listed in Appendix A"
         else:
-            severity_style = ParagraphStyle(name='SeverityStyle', fontName=FONT_NAME_BOLD, fontSize=10, textColor=colors.black)
-
-        row = [
-            Paragraph(datetime.fromisoformat(det['timestamp']).strftime("%H:%M:%S"), styles['Normal']),
-            Paragraph(sev, severity_style),
-            Paragraph(det.get('label','N/A'), styles['Normal']),
-            Paragraph(det.get('engine_name', det.get('model','N/A')), styles['Normal']),
-            justification_paragraph
-        ]
-        table_data.append(row)
-
-    col_widths = [0.8*inch,0.8*inch,1.5*inch,1.5*inch,3.0*inch]
-    detection_table = Table(table_data, colWidths=col_widths)
-
-    detection_table.setStyle(TableStyle([
-        ('BACKGROUND',(0,0),(-1,0),colors.Color(153/255,204/255,255/255)),
-        ('GRID',(0,0),(-1,-1),0.5,colors.grey),
-        ('FONTNAME',(0,0),(-1,0),FONT_NAME_BOLD),
-        ('FONTNAME',(0,1),(-1,-1),FONT_NAME),
-        ('FONTSIZE',(0,0),(-1,-1),9),
-        ('VALIGN',(0,0),(-1,-1),'TOP'),
-        ('LEFTPADDING',(0,0),(-1,-1),4),
-        ('RIGHTPADDING',(0,0),(-1,-1),4),
-    ]))
-    story.append(detection_table)
+            listed = "they are listed in Appendix A"
+        story.append(Paragraph(f"<i>{overflow_total:,} lower-severity detection(s) are beyond the {max_detail_rows:,}-row "
+                               f"limit; {listed}.</i>", styles['Normal']))
     story.append(Spacer(1,0.2*inch))
 
     story.append(Paragraph("5. Mitigation Recommendations", styles['SectionTitle']))
@@ -278,4 +508,7 @@ def generate_pdf_report(analysis_json_path: str, pdf_output_path: str):
         story.append(Paragraph(f"• {rec}", styles['Normal']))
         story.append(Spacer(1,0.05*inch))
 
+    if overflow:
+        story.extend(create_overflow_appendix(overflow, overflow_total - len(overflow)))
+
     doc.build(story, onFirstPage=header_footer_template, onLaterPages=header_footer_template)
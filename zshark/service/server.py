@@ -0,0 +1,289 @@
+import asyncio
+import functools
+import json
+import os
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from http import HTTPStatus
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Dict, Any, Optional, Tuple
+from urllib.parse import urlsplit, parse_qs
+
+from loguru import logger
+
+from zshark.core.data_structures import ZSharkConfig
+from zshark.core.workers import init_worker, warm_up, run_analysis
+
+MAX_HEADER_LINE = 8192
+MAX_HEADERS = 100
+UPLOAD_CHUNK = 1 << 20
+
+
+class HTTPError(Exception):
+    def __init__(self, status: HTTPStatus, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class Job:
+    __slots__ = ("id", "source", "config_json", "output_path", "status", "submitted", "started", "finished",
+                 "summary", "error", "upload")
+
+    def __init__(self, source: str, config_json: str, output_path: str, upload: bool):
+        self.id = uuid.uuid4().hex[:12]
+        self.source = source
+        self.config_json = config_json
+        self.output_path = output_path
+        self.upload = upload
+        self.status = "queued"
+        self.submitted = datetime.now()
+        self.started: Optional[datetime] = None
+        self.finished: Optional[datetime] = None
+        self.summary: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "status": self.status,
+            "source": self.source,
+            "submitted": self.submitted.isoformat(),
+            "started": self.started.isoformat() if self.started else None,
+            "finished": self.finished.isoformat() if self.finished else None,
+            "summary": self.summary,
+            "error": self.error,
+        }
+
+
+class AnalysisService:
+    def __init__(self, config: ZSharkConfig, host: str = "127.0.0.1", port: int = 8080, workers: int = 2,
+                 output_dir: str = "results/service", max_upload_bytes: int = 512 * 1024 * 1024,
+                 path_root: Optional[str] = None, keep_uploads: bool = False):
+        self.config = config
+        self.host = host
+        self.port = port
+        self.workers = max(1, workers)
+        self.output_dir = Path(output_dir)
+        self.upload_dir = self.output_dir / "uploads"
+        self.max_upload_bytes = max_upload_bytes
+        self.path_root = Path(path_root).resolve() if path_root else None
+        self.keep_uploads = keep_uploads
+        self.jobs: Dict[str, Job] = {}
+        self.queue: "asyncio.Queue[Job]" = asyncio.Queue()
+        self.pool: Optional[ProcessPoolExecutor] = None
+        self.server: Optional[asyncio.AbstractServer] = None
+        self.running_jobs = 0
+
+    async def start(self) -> None:
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.upload_dir.mkdir(parents=True, exist_ok=True)
+
+        loop = asyncio.get_running_loop()
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=get_context("spawn"),
+                                        initializer=init_worker)
+        started = time.perf_counter()
+        # Force every worker to start (and run init_worker) before accepting jobs.
+        pids = await asyncio.gather(*(loop.run_in_executor(self.pool, warm_up, 0.2) for _ in range(self.workers)))
+        logger.info(f"Warmed {len(set(pids))} worker process(es) in {time.perf_counter() - started:.2f}s")
+
+        self.dispatchers = [asyncio.create_task(self._dispatch()) for _ in range(self.workers)]
+        self.server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        logger.info(f"Z-Shark service listening on http://{self.host}:{self.port}")
+
+    async def stop(self) -> None:
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        for task in getattr(self, "dispatchers", []):
+            task.cancel()
+        if self.pool is not None:
+            if self.running_jobs:
+                logger.info(f"Waiting for {self.running_jobs} running job(s) to finish...")
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, functools.partial(self.pool.shutdown, wait=True, cancel_futures=True))
+            self.pool = None
+
+    async def serve_forever(self) -> None:
+        await self.start()
+        try:
+            await self.server.serve_forever()
+        finally:
+            await self.stop()
+
+    async def _dispatch(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self.queue.get()
+            job.status = "running"
+            job.started = datetime.now()
+            self.running_jobs += 1
+            try:
+                job.summary = await loop.run_in_executor(self.pool, run_analysis, job.source, job.config_json,
+                                                         job.output_path)
+                job.status = "done"
+                logger.info(f"Job {job.id} done: {job.summary['detections']} detection(s)")
+            except Exception as e:
+                job.status = "failed"
+                job.error = str(e)
+                logger.error(f"Job {job.id} failed: {e}")
+            finally:
+                job.finished = datetime.now()
+                self.running_jobs -= 1
+                if job.upload and not self.keep_uploads:
+                    try:
+                        os.remove(job.source)
+                    except OSError:
+                        pass
+                self.queue.task_done()
+
+    def _submit(self, source: str, config: ZSharkConfig, upload: bool) -> Job:
+        job = Job(source, config.model_dump_json(), "", upload)
+        job.output_path = str(self.output_dir / f"{job.id}_analysis.json")
+        self.jobs[job.id] = job
+        self.queue.put_nowait(job)
+        logger.info(f"Queued job {job.id} for {source}")
+        return job
+
+    def _job_config(self, models: Optional[str]) -> ZSharkConfig:
+        config = self.config.model_copy(deep=True)
+        if models:
+            from zshark.models import enable_models
+            try:
+                enable_models(config, models.split(","))
+            except ValueError as e:
+                raise HTTPError(HTTPStatus.BAD_REQUEST, str(e))
+        return config
+
+    def _resolve_path(self, raw_path: str) -> str:
+        path = Path(raw_path).expanduser().resolve()
+        if self.path_root is not None and self.path_root not in path.parents and path != self.path_root:
+            raise HTTPError(HTTPStatus.FORBIDDEN, f"Path outside of allowed root {self.path_root}")
+        if not path.is_file():
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"PCAP file not found: {raw_path}")
+        return str(path)
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Tuple[str, str, Dict[str, str]]:
+        request_line = await reader.readline()
+        if not request_line:
+            raise ConnectionResetError
+        if len(request_line) > MAX_HEADER_LINE:
+            raise HTTPError(HTTPStatus.REQUEST_URI_TOO_LONG, "Request line too long")
+        try:
+            method, target, _ = request_line.decode("latin-1").split(" ", 2)
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Malformed request line")
+
+        headers: Dict[str, str] = {}
+        for _ in range(MAX_HEADERS):
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            if len(line) > MAX_HEADER_LINE:
+                raise HTTPError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "Header line too long")
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        else:
+            raise HTTPError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "Too many headers")
+        return method.upper(), target, headers
+
+    def _content_length(self, headers: Dict[str, str]) -> int:
+        if "chunked" in headers.get("transfer-encoding", "").lower():
+            raise HTTPError(HTTPStatus.LENGTH_REQUIRED, "Chunked uploads are not supported; send Content-Length")
+        try:
+            length = int(headers.get("content-length", "0"))
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length")
+        if length > self.max_upload_bytes:
+            raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f"Upload exceeds {self.max_upload_bytes} bytes")
+        return length
+
+    async def _spool_upload(self, reader: asyncio.StreamReader, length: int, name: str) -> str:
+        safe_name = Path(name).name or "upload.pcap"
+        path = self.upload_dir / f"{uuid.uuid4().hex[:12]}_{safe_name}"
+        remaining = length
+        with open(path, "wb") as f:
+            while remaining:
+                chunk = await reader.read(min(UPLOAD_CHUNK, remaining))
+                if not chunk:
+                    f.close()
+                    path.unlink(missing_ok=True)
+                    raise HTTPError(HTTPStatus.BAD_REQUEST, "Upload ended before Content-Length bytes were received")
+                f.write(chunk)
+                remaining -= len(chunk)
+        return str(path)
+
+    async def _route(self, method: str, target: str, headers: Dict[str, str],
+                     reader: asyncio.StreamReader) -> Tuple[HTTPStatus, Any]:
+        url = urlsplit(target)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        parts = [part for part in url.path.split("/") if part]
+
+        if method == "GET" and parts == ["health"]:
+            return HTTPStatus.OK, {"status": "ok", "workers": self.workers, "queued": self.queue.qsize(),
+                                   "running": self.running_jobs, "jobs": len(self.jobs)}
+
+        if parts == ["jobs"] and method == "GET":
+            return HTTPStatus.OK, [job.as_dict() for job in self.jobs.values()]
+
+        if parts == ["jobs"] and method == "POST":
+            length = self._content_length(headers)
+            content_type = headers.get("content-type", "").split(";")[0].strip().lower()
+            if content_type == "application/json":
+                try:
+                    body = json.loads(await reader.readexactly(length))
+                except (json.JSONDecodeError, asyncio.IncompleteReadError):
+                    raise HTTPError(HTTPStatus.BAD_REQUEST, "Invalid JSON body")
+                if not isinstance(body, dict) or not body.get("path"):
+                    raise HTTPError(HTTPStatus.BAD_REQUEST, "JSON body must contain a 'path'")
+                config = self._job_config(body.get("models"))
+                job = self._submit(self._resolve_path(str(body["path"])), config, upload=False)
+            else:
+                if length <= 0:
+                    raise HTTPError(HTTPStatus.BAD_REQUEST, "Empty upload")
+                config = self._job_config(query.get("models"))
+                source = await self._spool_upload(reader, length, query.get("name", "upload.pcap"))
+                job = self._submit(source, config, upload=True)
+            return HTTPStatus.ACCEPTED, job.as_dict()
+
+        if len(parts) in (2, 3) and parts[0] == "jobs" and method == "GET":
+            job = self.jobs.get(parts[1])
+            if job is None:
+                raise HTTPError(HTTPStatus.NOT_FOUND, f"Unknown job {parts[1]}")
+            if len(parts) == 2:
+                return HTTPStatus.OK, job.as_dict()
+            if parts[2] == "result":
+                if job.status != "done":
+                    raise HTTPError(HTTPStatus.CONFLICT, f"Job {job.id} is {job.status}")
+                with open(job.output_path, "rb") as f:
+                    return HTTPStatus.OK, f.read()
+
+        raise HTTPError(HTTPStatus.NOT_FOUND, f"No route for {method} {url.path}")
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            try:
+                method, target, headers = await self._read_request(reader)
+                status, payload = await self._route(method, target, headers, reader)
+            except HTTPError as e:
+                status, payload = e.status, {"error": e.message}
+            except (ConnectionResetError, asyncio.IncompleteReadError):
+                return
+            except Exception as e:
+                logger.error(f"Unhandled error while serving request: {e}")
+                status, payload = HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(e)}
+
+            body = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+            writer.write(
+                f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                f"Content-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: close\r\n\r\n".encode("latin-1") + body
+            )
+            await writer.drain()
+        finally:
+            writer.close()
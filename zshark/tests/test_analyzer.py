@@ -0,0 +1,267 @@
+import pytest
+
+from zshark.bench.synthetic import generate_pcap
+from zshark.core.data_structures import ZSharkConfig
+from zshark.core.processor import Analyzer
+
+
+@pytest.fixture(scope="module")
+def synthetic_pcap(tmp_path_factory):
+    path = tmp_path_factory.mktemp("pcaps") / "synthetic.pcap"
+    generate_pcap(str(path), 3000, seed=3)
+    return str(path)
+
+
+def test_analysis_stats_cover_models_and_stages(synthetic_pcap):
+    result = Analyzer(ZSharkConfig.default()).analyze_pcap(synthetic_pcap)
+    stats = result.analysis_stats
+
+    assert stats["packets"] == result.total_packets == 3000
+    assert stats["windows"] == len(result.window_stats)
+    assert {"ingest", "window_stats", "fusion"} <= set(stats["stages"])
+
+    models = stats["models"]
+    assert set(models) == {"DDoSDetector", "PortScanDetector", "ARPSpoofDetector", "DNSAnomalyDetector", "BeaconingDetector"}
+    assert all(entry["windows"] == stats["windows"] for entry in models.values())
+    assert sum(entry["detections"] for entry in models.values()) == stats["raw_detections"]
+    assert models["PortScanDetector"]["peak_state_size"]["scan_history"] > 0
+
+
+def test_metrics_endpoint_reports_pipeline_state(synthetic_pcap):
+    from urllib.request import urlopen
+    from zshark.core.metrics import MetricsRegistry, start_metrics_server
+
+    registry = MetricsRegistry()
+    server = start_metrics_server(registry, port=0)
+    try:
+        result = Analyzer(ZSharkConfig.default(), metrics=registry).analyze_pcap(synthetic_pcap)
+        with urlopen(f"http://127.0.0.1:{server.server_address[1]}/metrics") as response:
+            body = response.read().decode()
+    finally:
+        server.shutdown()
+
+    assert f"zshark_packets_ingested_total {result.total_packets}" in body
+    assert 'zshark_model_latency_seconds_count{model="PortScanDetector"}' in body
+    assert 'zshark_model_state_entries{model="PortScanDetector",state="scan_history"}' in body
+    assert 'zshark_model_state_entries{model="BeaconingDetector",state="flow_iat_histories"}' in body
+    assert "zshark_window_lag_seconds" in body
+
+
+@pytest.mark.parametrize("sampling_mode,packet_filter", [("none", "auto"), ("random", "auto"), ("random", "udp or arp")])
+def test_resume_from_checkpoint_matches_uninterrupted_run(synthetic_pcap, tmp_path, monkeypatch, sampling_mode,
+                                                          packet_filter):
+    from zshark.core import processor
+
+    config = ZSharkConfig.default()
+    config.features = ["top_talkers"]
+    config.models["ddos_volume"].window_size_s = 1
+    config.sampling_mode, config.sampling_rate = sampling_mode, 3
+    config.packet_filter = packet_filter
+    expected = Analyzer(config).analyze_pcap(synthetic_pcap)
+
+    checkpoint = tmp_path / "run.ckpt"
+    saved = []
+    original_save = processor.save_checkpoint
+
+    def save_then_crash(*args, **kwargs):
+        original_save(*args, **kwargs)
+        saved.append(args[3]["offset"])
+        if len(saved) == 3:
+            raise KeyboardInterrupt
+
+    monkeypatch.setattr(processor, "save_checkpoint", save_then_crash)
+    with pytest.raises(KeyboardInterrupt):
+        Analyzer(config).analyze_pcap(synthetic_pcap, checkpoint_path=str(checkpoint), checkpoint_interval_s=0)
+    monkeypatch.setattr(processor, "save_checkpoint", original_save)
+    assert checkpoint.exists()
+
+    resumed = Analyzer(config).analyze_pcap(synthetic_pcap, checkpoint_path=str(checkpoint), resume=True)
+
+    assert not checkpoint.exists()
+    assert resumed.analysis_stats["stages"].get("baseline") is None
+    assert resumed.total_packets == expected.total_packets
+    assert resumed.window_stats == expected.window_stats
+    assert resumed.top_source_ips == expected.top_source_ips
+    assert resumed.sampling == expected.sampling
+    assert resumed.prefilter == expected.prefilter
+    assert [(d.label, d.score) for d in resumed.detections] == [(d.label, d.score) for d in expected.detections]
+
+
+def test_rotated_files_analyze_as_one_stream(synthetic_pcap, tmp_path):
+    from scapy.utils import rdpcap, wrpcap
+    from zshark.core.processor import order_captures
+
+    packets = rdpcap(synthetic_pcap)
+    parts = []
+    for index, start in enumerate(range(0, len(packets), 1000)):
+        part = tmp_path / f"rotated.pcap{index}"
+        wrpcap(str(part), packets[start:start + 1000])
+        parts.append(str(part))
+
+    assert order_captures(list(reversed(parts))) == parts
+
+    config = ZSharkConfig.default()
+    config.features = ["top_talkers"]
+    whole = Analyzer(config).analyze_pcap(synthetic_pcap)
+    rotated = Analyzer(config).analyze_pcap(parts)
+
+    assert rotated.source_files == parts
+    assert rotated.window_stats == whole.window_stats
+    assert rotated.top_source_ips == whole.top_source_ips
+    assert [(d.label, d.score) for d in rotated.detections] == [(d.label, d.score) for d in whole.detections]
+
+
+def test_merge_interleaves_taps_and_reorder_buffer_restores_order(synthetic_pcap, tmp_path):
+    from scapy.utils import rdpcap, wrpcap
+    from zshark.core.processor import PacketStreamer, WindowProcessor
+
+    packets = rdpcap(synthetic_pcap)[:600]
+    taps = [tmp_path / "tap0.pcap", tmp_path / "tap1.pcap"]
+    wrpcap(str(taps[0]), packets[0::2])
+    wrpcap(str(taps[1]), packets[1::2])
+
+    merged = list(PacketStreamer([str(tap) for tap in taps], merge=True).stream())
+    assert [float(p.time) for p in merged] == [float(p.time) for p in packets]
+
+    shuffled = list(packets)
+    for index in range(0, len(shuffled) - 1, 7):
+        shuffled[index], shuffled[index + 1] = shuffled[index + 1], shuffled[index]
+
+    config = ZSharkConfig.default()
+    config.reorder_window_s = 1.0
+    processor = WindowProcessor(config)
+    reordered = [pkt for _, window in processor.process_stream(iter(shuffled)) for pkt in window]
+    assert [float(p.time) for p in reordered] == sorted(float(p.time) for p in packets)
+    assert processor.late_packets == 0
+
+
+def test_window_processor_starts_each_stream_afresh(synthetic_pcap):
+    from scapy.utils import rdpcap
+    from zshark.core.processor import WindowProcessor
+
+    packets = rdpcap(synthetic_pcap)
+    config = ZSharkConfig.default()
+    config.reorder_window_s = 1.0
+    processor = WindowProcessor(config, features=[])
+    later = list(processor.process_stream(iter(packets[1500:])))
+    assert processor.window_last_time == float(packets[-1].time)
+
+    # A second stream on the same processor (as with rotated files) may start before the first ended.
+    earlier = list(processor.process_stream(iter(packets[:1500])))
+    assert processor.late_packets == 0
+    assert sum(stats.packet_count for stats, _ in earlier + later) == len(packets)
+    assert processor.window_last_time == float(packets[1499].time)
+
+    assert list(processor.process_stream(iter([]))) == []
+    assert processor.window_last_time is None
+
+def test_sampling_scales_volume_and_keeps_exact_totals(synthetic_pcap):
+    full = Analyzer(ZSharkConfig.default()).analyze_pcap(synthetic_pcap)
+    config = ZSharkConfig.default()
+    config.sampling_mode, config.sampling_rate = "systematic", 4
+    sampled = Analyzer(config).analyze_pcap(synthetic_pcap)
+
+    assert sampled.total_packets == full.total_packets == 3000
+    assert sampled.total_bytes == full.total_bytes
+    assert sampled.sampling["packets_sampled"] == sum(w.packet_count for w in sampled.window_stats) == 750
+    full_pps = sum(w.pps for w in full.window_stats) / len(full.window_stats)
+    sampled_pps = sum(w.pps for w in sampled.window_stats) / len(sampled.window_stats)
+    assert sampled_pps == pytest.approx(full_pps, rel=0.1)
+
+
+def test_auto_packet_filter_dissects_only_what_models_read(synthetic_pcap):
+    from zshark.models import enable_models
+
+    config = enable_models(ZSharkConfig.default(), ["dns_anomaly", "arp_spoof"])
+    config.features = []
+    filtered = Analyzer(config).analyze_pcap(synthetic_pcap)
+    config.packet_filter = "none"
+    full = Analyzer(config).analyze_pcap(synthetic_pcap)
+
+    assert filtered.prefilter["expression"] == "(arp) or (port 53 or port 5353)"
+    assert filtered.prefilter["packets_seen"] == filtered.total_packets == full.total_packets
+    assert filtered.analysis_stats["packets_analyzed"] == filtered.prefilter["packets_matched"] < full.total_packets
+    assert filtered.window_stats == full.window_stats
+    assert [(d.label, d.score, d.timestamp) for d in filtered.detections] == \
+        [(d.label, d.score, d.timestamp) for d in full.detections]
+
+
+def test_packet_filter_leaves_the_volume_baseline_unchanged(synthetic_pcap):
+    config = ZSharkConfig.default()
+    baseline = Analyzer(config).get_global_baseline(synthetic_pcap)
+    config.packet_filter = "port 53"
+
+    assert Analyzer(config).get_global_baseline(synthetic_pcap) == baseline > 0
+
+def test_triage_profile_defers_expensive_models_to_flagged_hosts(synthetic_pcap):
+    config = ZSharkConfig.default()
+    for model_config in config.models.values():
+        model_config.window_size_s = 1
+    full = Analyzer(config).analyze_pcap(synthetic_pcap)
+    config.analysis_profile = "triage"
+    config.cascade_every = 4
+    config.cascade_hold_s = 1.0
+    triage = Analyzer(config).analyze_pcap(synthetic_pcap)
+
+    cascade, models = triage.cascade, triage.analysis_stats["models"]
+    windows = triage.analysis_stats["windows"]
+    assert full.cascade == {} and cascade["every"] == 4
+    assert cascade["full_windows"] + cascade["focused_windows"] + cascade["skipped_windows"] == windows
+    assert cascade["skipped_windows"] + cascade["focused_windows"] > 0 and cascade["packets_withheld"] > 0
+    assert models["PortScanDetector"]["windows"] == windows
+    assert models["BeaconingDetector"]["windows"] == cascade["full_windows"] + cascade["focused_windows"]
+    assert cascade["models"]["DNSAnomalyDetector"]["tier"] == "expensive"
+
+    cheap = {"DDoSDetector", "PortScanDetector"}
+    assert [(d.label, d.score) for d in triage.detections if d.engine_name in cheap] == \
+        [(d.label, d.score) for d in full.detections if d.engine_name in cheap]
+
+
+def test_unknown_profile_is_rejected():
+    with pytest.raises(ValueError):
+        Analyzer(ZSharkConfig(analysis_profile="exhaustive"))
+
+
+def test_memory_budget_evicts_idle_state_across_models(synthetic_pcap):
+    config = ZSharkConfig.default()
+    unbounded = Analyzer(config).analyze_pcap(synthetic_pcap)
+    config.max_memory_bytes = 64 * 1024
+    bounded = Analyzer(config).analyze_pcap(synthetic_pcap)
+
+    memory = bounded.analysis_stats["memory"]
+    assert "memory" not in unbounded.analysis_stats
+    assert memory["enforcements"] > 0 and sum(memory["evicted_entries"].values()) > 0
+    assert memory["current_bytes"] <= memory["budget_bytes"] or memory["shortfalls"]
+    assert bounded.total_packets == unbounded.total_packets
+
+
+class FakeModel:
+    def __init__(self, name, entries):
+        self.engine_name = name
+        self.entries = dict(entries)
+        self.evicted = []
+
+    def memory_usage(self):
+        return 100 * len(self.entries)
+
+    def eviction_candidates(self):
+        return [(last_active, key, 100) for key, last_active in self.entries.items()]
+
+    def evict(self, keys):
+        self.evicted.extend(keys)
+        for key in keys:
+            del self.entries[key]
+
+
+def test_memory_budget_evicts_from_the_model_holding_each_entry():
+    from zshark.core.memory import MemoryBudget
+
+    ports = FakeModel("PortScanDetector", {"10.0.0.1": 1.0, "10.0.0.2": 4.0, "10.0.0.3": 6.0})
+    flows = FakeModel("BeaconingDetector", {"flow-a": 2.0, "flow-b": 3.0, "flow-c": 5.0})
+    budget = MemoryBudget(500, low_water=0.5)
+
+    assert budget.enforce([ports, flows]) == 4
+    assert ports.evicted == ["10.0.0.1", "10.0.0.2"]
+    assert flows.evicted == ["flow-a", "flow-b"]
+    assert budget.evicted_entries == {"PortScanDetector": 2, "BeaconingDetector": 2}
+    assert budget.current_bytes == sum(model.memory_usage() for model in (ports, flows))
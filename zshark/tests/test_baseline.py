@@ -0,0 +1,76 @@
+import random
+
+import pytest
+from scapy.layers.dns import DNS, DNSQR
+from scapy.layers.inet import IP, UDP
+from scapy.layers.l2 import ARP, Ether
+from scapy.utils import wrpcap
+
+from zshark.core.baseline import BaselineError, Distribution, load_baseline, save_baseline, train_baseline
+from zshark.core.data_structures import ZSharkConfig
+from zshark.core.processor import Analyzer
+from zshark.models import enable_models
+
+ETH = Ether(src="02:00:00:00:00:01", dst="02:00:00:00:00:02")
+GATEWAY_MAC = "02:00:00:00:00:aa"
+BENIGN = ("google facebook youtube wikipedia amazon twitter instagram linkedin netflix microsoft apple github "
+          "stackoverflow reddit yahoo office outlook windowsupdate cloudflare akamai dropbox spotify slack zoom "
+          "adobe salesforce wordpress mozilla ubuntu debian python docker kubernetes gitlab atlassian").split()
+
+
+def query(t, name):
+    pkt = ETH / IP(src="10.0.0.9", dst="10.0.0.53") / UDP(sport=40000, dport=53) / DNS(rd=1, qd=DNSQR(qname=name))
+    pkt.time = t
+    return pkt
+
+
+def arp_reply(t, mac):
+    pkt = Ether(src=mac, dst="ff:ff:ff:ff:ff:ff") / ARP(op=2, hwsrc=mac, psrc="10.0.0.1", pdst="10.0.0.9")
+    pkt.time = t
+    return pkt
+
+
+def test_distribution_merge_matches_single_pass():
+    values = [random.Random(4).uniform(0, 100) for _ in range(50)]
+    whole, left, right = Distribution(), Distribution(), Distribution()
+    for i, value in enumerate(values):
+        whole.add(value)
+        (left if i % 3 else right).add(value)
+    left.merge(right)
+    assert left.as_dict() == pytest.approx(whole.as_dict())
+
+
+def test_trained_baseline_defends_bindings_and_benign_domains(tmp_path):
+    t0 = 1_700_000_000.0
+    corpus = [arp_reply(t0 + i * 5, GATEWAY_MAC) for i in range(6)]
+    corpus += [query(t0 + 1 + i * 0.5, f"www.{name}.com") for i, name in enumerate(BENIGN)]
+    wrpcap(str(tmp_path / "known_good.pcap"), sorted(corpus, key=lambda pkt: pkt.time))
+
+    config = enable_models(ZSharkConfig.default(), ["arp_spoof", "dns_anomaly"])
+    profile = train_baseline([tmp_path / "known_good.pcap"], config, workers=1)
+    save_baseline(str(tmp_path / "baseline.json.gz"), profile)
+    assert profile["ip_mac"] == {"10.0.0.1": GATEWAY_MAC}
+    assert set(BENIGN) <= set(profile["domains"])
+
+    suspect = [arp_reply(t0 + 86400, "02:00:00:00:00:66"), query(t0 + 86401, "stackoverflow.com"),
+               query(t0 + 86402, "xkqjzvbwpfhy.com")]
+    wrpcap(str(tmp_path / "suspect.pcap"), suspect)
+
+    cold = Analyzer(config).analyze_pcap(str(tmp_path / "suspect.pcap"))
+    config.baseline_path = str(tmp_path / "baseline.json.gz")
+    trained = Analyzer(config).analyze_pcap(str(tmp_path / "suspect.pcap"))
+
+    assert sorted(d.evidence.get("domain", d.label) for d in cold.detections) == \
+        ["stackoverflow.com", "xkqjzvbwpfhy.com"]
+    labels = {d.label: d for d in trained.detections}
+    assert labels["ARP Spoofing Detected (MAC Conflict)"].evidence["baseline_mac"] == GATEWAY_MAC
+    assert [d.evidence["domain"] for d in trained.detections if "domain" in d.evidence] == ["xkqjzvbwpfhy.com"]
+    assert trained.analysis_stats["baseline"]["files"] == 1
+    assert "baseline" not in trained.analysis_stats["stages"]
+
+
+def test_load_baseline_rejects_other_files(tmp_path):
+    path = tmp_path / "not_a_profile.json"
+    path.write_text('{"kind": "checkpoint"}')
+    with pytest.raises(BaselineError):
+        load_baseline(str(path))
@@ -0,0 +1,42 @@
+from pathlib import Path
+
+from zshark.bench.synthetic import generate_pcap
+from zshark.core.batch import find_pcaps, analyze_files, merge_summaries
+from zshark.core.data_structures import ZSharkConfig
+
+
+def test_analyze_files_writes_per_file_results_and_merges(tmp_path):
+    captures = tmp_path / "captures"
+    captures.mkdir()
+    for index, seed in enumerate((1, 2, 3)):
+        generate_pcap(str(captures / f"trace.pcap{index}"), 800, seed=seed)
+    (captures / "notes.txt").write_text("not a capture")
+
+    pcaps = find_pcaps(str(captures))
+    assert [p.name for p in pcaps] == ["trace.pcap0", "trace.pcap1", "trace.pcap2"]
+
+    config = ZSharkConfig.default()
+    config.features = ["top_talkers"]
+    merged = analyze_files(pcaps, config, str(tmp_path / "out"), workers=2)
+
+    assert merged["succeeded"] == merged["files"] == 3
+    assert merged["total_packets"] == 2400
+    assert merged["detections"] == sum(r["detections"] for r in merged["results"])
+    assert sum(merged["labels"].values()) == merged["detections"]
+    assert merged["top_source_ips"] and merged["top_dest_ports"]
+    assert sorted(Path(r["output_path"]).name for r in merged["results"]) == [
+        f"trace.pcap{i}_analysis.json" for i in range(3)]
+    assert all(Path(r["output_path"]).exists() for r in merged["results"])
+
+
+def test_merge_summaries_combines_talkers():
+    base = {"start_time": "2024-01-01T00:00:00", "end_time": "2024-01-01T00:01:00", "total_packets": 10,
+            "total_bytes": 100, "detections": 1, "labels": {"Port Scan": 1}, "wall_s": 1.0, "top_dest_ports": []}
+    first = {**base, "pcap_path": "a", "top_source_ips": [{"ip": "10.0.0.1", "packets": 5, "bytes": 50}]}
+    second = {**base, "pcap_path": "b", "top_source_ips": [{"ip": "10.0.0.1", "packets": 2, "bytes": 20},
+                                                          {"ip": "10.0.0.2", "packets": 6, "bytes": 60}]}
+    merged = merge_summaries([first, second], [], 2.0)
+
+    assert merged["top_source_ips"][0] == {"ip": "10.0.0.1", "packets": 7, "bytes": 70}
+    assert merged["labels"] == {"Port Scan": 2}
+    assert merged["total_packets"] == 20
@@ -0,0 +1,74 @@
+import hashlib
+import socket
+from collections import Counter
+
+import pytest
+from scapy.all import IP, TCP, rdpcap
+
+from zshark.bench.replay import open_sink, replay
+from zshark.bench.synthetic import generate_pcap, parse_mix
+
+
+def test_parse_mix_normalizes_weights():
+    mix = parse_mix("flood=3,scan=1")
+    assert mix == pytest.approx({"flood": 0.75, "scan": 0.25})
+
+
+def test_parse_mix_rejects_unknown_kind():
+    with pytest.raises(ValueError):
+        parse_mix("flood=1,teleport=1")
+
+
+def test_generate_pcap_is_reproducible(tmp_path):
+    first, second = tmp_path / "a.pcap", tmp_path / "b.pcap"
+    meta = generate_pcap(str(first), 600, seed=7)
+    generate_pcap(str(second), 600, seed=7)
+
+    assert meta["packets"] == 600
+    assert hashlib.sha256(first.read_bytes()).digest() == hashlib.sha256(second.read_bytes()).digest()
+
+    packets = rdpcap(str(first))
+    times = [float(pkt.time) for pkt in packets]
+    assert times == sorted(times)
+    assert {"IP", "ARP", "DNS"} <= {layer.__name__ for pkt in packets for layer in pkt.layers()}
+
+
+def test_replay_paces_to_scaled_capture_time(tmp_path):
+    source = tmp_path / "source.pcap"
+    generate_pcap(str(source), 200, seed=2, duration_s=2.0)
+    sink, created = open_sink(str(tmp_path / "copy.pcap"))
+    stats = replay(str(source), sink, speed=10.0, loops=2)
+    sink.close()
+
+    summary = stats.as_dict()
+    assert created is None and summary["packets"] == 400 and summary["loops"] == 2
+    assert summary["elapsed_s"] >= summary["capture_span_s"] / 10 * 0.95
+    assert summary["achieved_speed"] == pytest.approx(10.0, rel=0.2)
+    original, copy = rdpcap(str(source)), rdpcap(str(tmp_path / "copy.pcap"))
+    assert [bytes(pkt) for pkt in copy] == [bytes(pkt) for pkt in original] * 2
+    times = [pkt.time for pkt in copy]
+    assert times[:200] == [pkt.time for pkt in original] and times == sorted(times)
+
+
+def test_replay_sends_one_datagram_per_frame(tmp_path):
+    source = tmp_path / "source.pcap"
+    generate_pcap(str(source), 50, seed=2)
+    receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receiver.bind(("127.0.0.1", 0))
+    receiver.settimeout(1.0)
+    sink, _ = open_sink(f"udp://127.0.0.1:{receiver.getsockname()[1]}")
+    stats = replay(str(source), sink, speed=None)
+    sink.close()
+
+    frames = [receiver.recv(65535) for _ in range(stats.packets)]
+    receiver.close()
+    assert stats.packets == 50 and frames == [bytes(pkt) for pkt in rdpcap(str(source))]
+
+
+def test_beaconing_flows_are_distinct(tmp_path):
+    path = tmp_path / "beacons.pcap"
+    generate_pcap(str(path), 3000, mix=parse_mix("beaconing=1"), seed=4)
+
+    packets = rdpcap(str(path))
+    flows = Counter((pkt[IP].src, pkt[IP].dst, pkt[TCP].sport) for pkt in packets)
+    assert len(flows) == 5 and set(flows.values()) == {600}
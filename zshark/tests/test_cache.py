@@ -0,0 +1,55 @@
+import json
+import os
+import sys
+
+from zshark.cli.main import main
+from zshark.core.cache import ResultCache
+from zshark.core.data_structures import ZSharkConfig
+
+
+def test_analysis_key_tracks_content_and_config(tmp_path):
+    pcap = tmp_path / "a.pcap"
+    pcap.write_bytes(os.urandom(2 * 1024 * 1024))
+    cache = ResultCache(str(tmp_path / "cache"))
+    config = ZSharkConfig.default()
+
+    key = cache.analysis_key(str(pcap), config)
+    config.output_dir = "elsewhere"
+    assert cache.analysis_key(str(pcap), config) == key
+
+    config.models["port_scan"].threshold = 0.9
+    assert cache.analysis_key(str(pcap), config) != key
+
+    data = bytearray(pcap.read_bytes())
+    data[-1] ^= 0xFF
+    pcap.write_bytes(bytes(data))
+    assert cache.analysis_key(str(pcap), ZSharkConfig.default()) != key
+
+
+def test_store_evicts_least_recently_used(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache"), max_bytes=2500)
+    source = tmp_path / "result.json"
+    source.write_bytes(b"x" * 1000)
+
+    for index, key in enumerate(("analysis-a", "analysis-b")):
+        entry = cache.store(key, str(source))
+        os.utime(entry, (index, index))
+    cache.lookup("analysis-a")
+    cache.store("analysis-c", str(source))
+
+    assert cache.lookup("analysis-a") is not None
+    assert cache.lookup("analysis-b") is None
+    assert cache.lookup("analysis-c") is not None
+
+
+def test_cached_report_is_not_reused_for_a_differently_named_result(tmp_path, monkeypatch):
+    analysis = {"pcap_path": "tap.pcap", "start_time": "2024-01-01T00:00:00", "end_time": "2024-01-01T00:01:00",
+                "total_packets": 10, "total_bytes": 1000, "window_stats": [], "detections": []}
+    cache_dir = tmp_path / "cache"
+    for name in ("monday_analysis.json", "monday_analysis.json", "tuesday_analysis.json"):
+        (tmp_path / name).write_text(json.dumps(analysis))
+        monkeypatch.setattr(sys, "argv", ["zshark", "report", str(tmp_path / name), "-o", str(tmp_path / "out.pdf"),
+                                          "--cache-dir", str(cache_dir), "--cache-max-mb", "8"])
+        main()
+
+    assert len(list(cache_dir.glob("report-*.pdf"))) == 2
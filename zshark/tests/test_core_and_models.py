@@ -3,9 +3,12 @@ from scapy.all import Ether, IP, TCP, UDP, ARP, wrpcap
 from pathlib import Path
 import numpy as np
 import os
+from collections import deque
+from datetime import datetime
 
 from zshark.core.utils import shannon_entropy
 from zshark.core.data_structures import ZSharkConfig, ModelConfig
+from zshark.models import enable_models
 from zshark.models.ddos_detector import DDoSDetector
 
 @pytest.fixture
@@ -77,6 +80,10 @@ def test_ddos_detector_entropy_detection(ddos_detector):
     assert len(detections) == 1
     assert "Entropy Collapse" in detections[0].label
     assert detections[0].score == pytest.approx(1.0)
-    
-from collections import deque
-from datetime import datetime
\ No newline at end of file
+
+
+def test_enable_models_fills_in_default_model_settings():
+    config = enable_models(ZSharkConfig(), ["port_scan"])
+    assert config.models["port_scan"] == ZSharkConfig.default().models["port_scan"].model_copy(update={"enabled": True})
+    assert not config.models["ddos_volume"].enabled
+    assert config.models["ddos_volume"].params["k"] == 5.0
@@ -0,0 +1,40 @@
+from scapy.all import Ether, IP, TCP
+
+from zshark.core.data_structures import ZSharkConfig
+from zshark.core.processor import Analyzer
+from zshark.core.utils import calculate_window_stats
+
+
+def make_packets():
+    packets = []
+    for i in range(10):
+        pkt = Ether() / IP(src=f"10.0.0.{i}", dst="10.0.0.254") / TCP(dport=1000 + i)
+        pkt.time = 1700000000.0 + i * 0.1
+        packets.append(pkt)
+    return packets
+
+
+def test_window_stats_only_computes_requested_features():
+    stats = calculate_window_stats(make_packets(), features=["dst_port_entropy"])
+    assert stats["packet_count"] == 10
+    assert "dst_port_entropy" in stats
+    assert "src_ip_entropy" not in stats
+    assert "dst_ip_entropy" not in stats
+
+
+def test_window_stats_defaults_to_all_features():
+    stats = calculate_window_stats(make_packets())
+    assert set(stats) >= {"src_ip_entropy", "dst_ip_entropy", "dst_port_entropy"}
+
+
+def test_analyzer_resolves_union_of_model_features():
+    config = ZSharkConfig.default()
+    for name, model_config in config.models.items():
+        model_config.enabled = name == "arp_spoof"
+    assert Analyzer(config).features == {"top_talkers"}
+    config.features = []
+    assert Analyzer(config).features == set()
+
+    config.models["ddos_volume"].enabled = True
+    config.features = ["top_talkers"]
+    assert Analyzer(config).features == {"src_ip_entropy", "top_talkers"}
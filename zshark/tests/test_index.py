@@ -0,0 +1,53 @@
+from datetime import datetime, timedelta
+
+from zshark.core.data_structures import AnalysisResult, Detection, WindowStats
+from zshark.core.index import DetectionIndex, parse_time
+
+T0 = datetime(2024, 1, 1, 12, 0, 0)
+
+
+def analysis(pcap_path, offset_s=0):
+    start = T0 + timedelta(seconds=offset_s)
+    detections = [
+        Detection(engine_name="PortScanDetector", timestamp=start + timedelta(seconds=5), severity=0.9, score=40.0,
+                  label="Port Scan Suspect (Stateful)", justification="test", evidence={"source_ip": "10.0.0.5"}),
+        Detection(engine_name="DNSAnomalyDetector", timestamp=start + timedelta(seconds=30), severity=0.6, score=4.1,
+                  label="DNS High Entropy (DGA Suspect)", justification="test",
+                  evidence={"domain": "xkqjzv.example", "client_ip": "10.0.0.7"}),
+        Detection(engine_name="BeaconingDetector", timestamp=start + timedelta(seconds=50), severity=0.7, score=0.8,
+                  label="C2 Beaconing Suspect (FFT)", justification="test",
+                  flow_key="10.0.0.5-203.0.113.9:40000-443:6"),
+    ]
+    windows = [WindowStats(start_time=(start + timedelta(seconds=s)).isoformat(),
+                           end_time=(start + timedelta(seconds=s + 10)).isoformat(), packet_count=100, total_bytes=6000)
+               for s in range(0, 60, 10)]
+    return AnalysisResult(pcap_path=pcap_path, start_time=start, end_time=start + timedelta(seconds=60),
+                          total_packets=600, total_bytes=36000, detections=detections, window_stats=windows)
+
+
+def test_index_queries_across_analyses_and_replaces_reindexed_results(tmp_path):
+    first, second = analysis("monday.pcap"), analysis("tuesday.pcap", offset_s=86400)
+    second_path = tmp_path / "tuesday_analysis.json"
+    second_path.write_text(second.model_dump_json(indent=4))
+
+    with DetectionIndex(str(tmp_path / "zshark.db")) as index:
+        index.add_result(first, str(tmp_path / "monday_analysis.json"))
+        assert index.add_json(str(second_path)) == 3
+
+        hits = index.query(entity="10.0.0.5")
+        assert [(hit["label"], hit["pcap_path"]) for hit in hits] == [
+            ("C2 Beaconing Suspect (FFT)", "tuesday.pcap"), ("Port Scan Suspect (Stateful)", "tuesday.pcap"),
+            ("C2 Beaconing Suspect (FFT)", "monday.pcap"), ("Port Scan Suspect (Stateful)", "monday.pcap")]
+        assert [hit["pcap_path"] for hit in index.query(entity="xkqjzv.example")] == ["tuesday.pcap", "monday.pcap"]
+        assert len(index.query(label="DNS*")) == 2
+        assert len(index.query(engine="PortScanDetector", min_severity=0.8)) == 2
+
+        day_two = parse_time((T0 + timedelta(days=1)).isoformat())
+        assert {hit["pcap_path"] for hit in index.query(since=day_two)} == {"tuesday.pcap"}
+        assert len(index.windows(until=day_two)) == 6
+
+        # Indexing the same result file again replaces its rows instead of duplicating them.
+        index.add_json(str(second_path))
+        assert index.stats()["analyses"] == 2
+        assert index.stats()["detections"] == 6
+        assert len(index.query(entity="10.0.0.5")) == 4
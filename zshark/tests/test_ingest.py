@@ -0,0 +1,107 @@
+import threading
+
+import pytest
+from scapy.all import rdpcap
+
+from zshark.bench.replay import open_sink, replay
+from zshark.bench.synthetic import generate_pcap
+from zshark.core.data_structures import ZSharkConfig
+from zshark.core.ingest import SensorStats, SocketIngest, parse_address
+from zshark.core.processor import Analyzer
+from zshark.core.sampling import Sampler
+
+
+def send(address, pcap_path):
+    sink, _ = open_sink(address)
+    replay(pcap_path, sink, speed=None, retime=True)
+    sink.close()
+
+
+def start_senders(address, paths):
+    senders = [threading.Thread(target=send, args=(address, path)) for path in paths]
+    for sender in senders:
+        sender.start()
+    return senders
+
+
+@pytest.fixture(scope="module")
+def sensor_pcaps(tmp_path_factory):
+    directory = tmp_path_factory.mktemp("sensors")
+    paths = [str(directory / "tap1.pcap"), str(directory / "tap2.pcap")]
+    generate_pcap(paths[0], 1500, seed=5)
+    generate_pcap(paths[1], 1000, seed=6)
+    return paths
+
+
+def test_parse_address_rejects_unknown_schemes():
+    assert parse_address("tcp://127.0.0.1:5555") == ("tcp", ("127.0.0.1", 5555))
+    assert parse_address("unix:///run/zshark.sock") == ("unix", "/run/zshark.sock")
+    with pytest.raises(ValueError):
+        parse_address("udp://127.0.0.1:5555")
+
+
+def test_sensors_stream_into_one_analysis(sensor_pcaps, tmp_path):
+    config = ZSharkConfig.default()
+    config.reorder_window_s = 1.0
+    ingest = SocketIngest(f"unix://{tmp_path / 'zshark.sock'}", until_idle=True)
+    address = ingest.start()
+    senders = start_senders(address, sensor_pcaps)
+    result = Analyzer(config).analyze_pcap(address, ingest=ingest)
+    for sender in senders:
+        sender.join()
+
+    stats = result.analysis_stats["ingest"]
+    assert result.total_packets == stats["packets"] == 2500
+    assert [sensor["packets"] for sensor in stats["sensors"]] in ([1500, 1000], [1000, 1500])
+    assert stats["dropped_packets"] == 0 and stats["late_packets"] == 0
+
+
+@pytest.mark.parametrize("overload", ["block", "sample"])
+def test_full_queue_blocks_or_samples_instead_of_buffering(sensor_pcaps, overload):
+    ingest = SocketIngest("tcp://127.0.0.1:0", queue_batches=1, overload=overload, until_idle=True)
+    address = ingest.start()
+    senders = start_senders(address, sensor_pcaps[:1])
+    if overload == "sample":
+        # Nothing is consumed until the sensor has sent everything, so the queue overflows.
+        senders[0].join()
+    packets = sum(1 for _ in ingest.stream())
+    senders[0].join()
+
+    stats = ingest.as_dict()
+    sensor = stats["sensors"][0]
+    assert stats["peak_queue"] == 1
+    if overload == "block":
+        assert packets == 1500 and stats["dropped_packets"] == 0 and sensor["blocked_s"] > 0
+    else:
+        assert sensor["overloads"] >= 1 and stats["dropped_packets"] > 0
+        assert packets + stats["dropped_packets"] == 1500
+
+
+def test_overload_sampled_batches_are_scaled_back_to_full_volume(sensor_pcaps):
+    records = [(float(pkt.time), bytes(pkt), 1, len(pkt)) for pkt in rdpcap(sensor_pcaps[0])]
+
+    def run(overload_rate):
+        # Queue the capture as a sensor connection would, sampling from the sixth batch on.
+        ingest = SocketIngest("tcp://127.0.0.1:0", overload="sample")
+        sensor = SensorStats("tap1")
+        ingest.sensors.append(sensor)
+        sampler = Sampler("flow", overload_rate, seed=1)
+        for index, start in enumerate(range(0, len(records), 100)):
+            rate = overload_rate if index >= 5 else 1
+            batch = []
+            for record in records[start:start + 100]:
+                if rate > 1 and not sampler.keep(record[1], record[2]):
+                    sensor.sampled_packets += 1
+                    sensor.sampled_bytes += len(record[1])
+                    continue
+                batch.append(record)
+            ingest.queue.put((rate, batch))
+        ingest.stop()
+        return Analyzer(ZSharkConfig.default()).analyze_pcap(ingest.address, ingest=ingest)
+
+    full, sampled = run(1), run(4)
+    assert sampled.analysis_stats["ingest"]["sampled_windows"] == 1
+    assert sampled.analysis_stats["packets_analyzed"] < full.total_packets
+    assert (sampled.total_packets, sampled.total_bytes) == (full.total_packets, full.total_bytes) == (1500, 580154)
+    assert sampled.window_stats[0].pps == pytest.approx(full.window_stats[0].pps, rel=0.1)
+    assert sampled.window_stats[0].bps == pytest.approx(full.window_stats[0].bps, rel=0.1)
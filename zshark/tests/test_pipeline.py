@@ -0,0 +1,64 @@
+import json
+
+from scapy.layers.dns import DNS, DNSQR
+from scapy.layers.inet import ICMP, IP, TCP, UDP
+from scapy.layers.inet6 import IPv6
+from scapy.layers.l2 import ARP, Ether
+
+from zshark.bench.synthetic import generate_pcap
+from zshark.core.cascade import _hosts
+from zshark.core.data_structures import ZSharkConfig
+from zshark.core.pipeline import PARSED_COLUMNS, BatchLayout, PacketView, _AddressNames, packet_views, parse_batch
+from zshark.core.processor import Analyzer
+from zshark.core.utils import get_flow_key
+from zshark.models.dns_detector import query_name
+
+MACS = {"src": "02:00:00:00:00:01", "dst": "02:00:00:00:00:02"}
+
+
+def describe(pkt):
+    return (len(pkt), get_flow_key(pkt), query_name(pkt), _hosts(pkt), IP in pkt, TCP in pkt, UDP in pkt,
+            pkt[ARP].hwsrc if ARP in pkt else None, pkt[ARP].op if ARP in pkt else None)
+
+
+def test_parsed_batch_answers_like_dissected_packets():
+    frames = [
+        Ether(**MACS) / IP(src="10.0.0.5", dst="10.0.0.9") / TCP(sport=40000, dport=443),
+        Ether(**MACS) / IP(src="10.0.0.5", dst="10.0.0.53") / UDP(sport=5353, dport=53) / DNS(qd=DNSQR(qname="xkqjzv.example")),
+        Ether(**MACS) / IPv6(src="2001:db8::1", dst="2001:db8::35") / UDP(dport=53) / DNS(qr=1, qd=DNSQR(qname="a.example")),
+        Ether(**MACS) / ARP(op=2, psrc="10.0.0.1", pdst="10.0.0.1", hwsrc="02:00:00:00:00:aa"),
+        Ether(**MACS) / IP(src="10.0.0.5", dst="10.0.0.9") / ICMP(),
+        # IPv4 inside IPv6 cannot be described by the columns and is re-dissected whole.
+        Ether(**MACS) / IPv6(src="2001:db8::1", dst="2001:db8::2") / IP(src="10.0.0.5", dst="10.0.0.9") / TCP(),
+    ]
+    raw = [bytes(frame) for frame in frames]
+    columns = {"time": [1.5 + i for i in range(len(raw))], "caplen": [len(frame) for frame in raw],
+               "linktype": [1] * len(raw), "filtered": [0] * len(raw)}
+    rows, heap = parse_batch(columns, memoryview(b"".join(raw)), len(raw))
+
+    layout = BatchLayout(PARSED_COLUMNS, 8, 4096)
+    buf = memoryview(bytearray(layout.size))
+    layout.write(buf, list(zip(*rows)), heap)
+    views = packet_views(layout.read(buf, len(rows)), buf[layout.heap:], len(rows), _AddressNames())
+
+    assert [type(view) is PacketView for view in views] == [True] * 5 + [False]
+    assert [view.time for view in views] == columns["time"]
+    assert [describe(view) for view in views] == [describe(Ether(frame)) for frame in raw]
+
+
+def test_parallel_parsing_matches_in_process_analysis(tmp_path):
+    pcap = str(tmp_path / "mixed.pcap")
+    generate_pcap(pcap, 3000, seed=11)
+
+    def run(workers):
+        config = ZSharkConfig.default()
+        config.parallel_workers = workers
+        config.sampling_mode, config.sampling_rate = "systematic", 2
+        result = json.loads(Analyzer(config).analyze_pcap(pcap).model_dump_json())
+        return result, result.pop("analysis_stats")
+
+    serial, _ = run(1)
+    parallel, stats = run(2)
+    assert parallel == serial
+    assert stats["pipeline"]["parsers"] == 2
+    assert stats["pipeline"]["batches"] == 2
@@ -0,0 +1,40 @@
+import pytest
+from scapy.layers.dns import DNS, DNSQR
+from scapy.layers.inet import ICMP, IP, TCP, UDP
+from scapy.layers.inet6 import IPv6, IPv6ExtHdrHopByHop
+from scapy.layers.l2 import ARP, Ether
+
+from zshark.core.headers import LINKTYPE_ETHERNET
+from zshark.core.prefilter import PacketFilter, compile_filter
+
+ETH = Ether(src="02:00:00:00:00:01", dst="02:00:00:00:00:02")
+PACKETS = {
+    "dns": ETH / IP(src="10.0.0.1", dst="8.8.8.8") / UDP(sport=3333, dport=53) / DNS(qd=DNSQR(qname="example.com")),
+    "mdns6": ETH / IPv6(src="fe80::1", dst="ff02::fb") / IPv6ExtHdrHopByHop() / UDP(sport=5353, dport=5353),
+    "https": ETH / IP(src="192.168.1.5", dst="10.0.0.9") / TCP(sport=44000, dport=443),
+    "arp": ETH / ARP(psrc="192.168.1.1", pdst="192.168.1.7"),
+    "ping": ETH / IP(src="10.1.1.1", dst="10.2.2.2") / ICMP(),
+}
+
+
+@pytest.mark.parametrize("expression,expected", [
+    ("port 53 or port 5353", {"dns", "mdns6"}),
+    ("tcp and dst port 443", {"https"}),
+    ("net 192.168.0.0/16", {"https", "arp"}),
+    ("src net 10.0.0.0/8 and not udp", {"ping"}),
+    ("icmp || arp", {"ping", "arp"}),
+    ("ip proto 17 and portrange 1-100", {"dns"}),
+    ("!(ip or ip6)", {"arp"}),
+])
+def test_filter_matches_on_raw_headers(expression, expected):
+    packet_filter = PacketFilter(expression)
+    matched = {name for name, pkt in PACKETS.items() if packet_filter.keep(bytes(pkt), LINKTYPE_ETHERNET)}
+    assert matched == expected
+    assert packet_filter.as_dict()["packets_seen"] == len(PACKETS)
+    assert packet_filter.as_dict()["packets_matched"] == len(expected)
+
+
+@pytest.mark.parametrize("expression", ["port 70000", "tcp and", "(udp", "host example.com", "vlan 10", ""])
+def test_invalid_filters_are_rejected(expression):
+    with pytest.raises(ValueError):
+        compile_filter(expression)
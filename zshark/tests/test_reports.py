@@ -0,0 +1,95 @@
+import json
+import math
+
+from zshark.reports.json_stream import iter_object
+from zshark.reports.pdf_generator import appendix_row, lttb, split_detections, generate_pdf_report, load_report_data
+
+
+def test_lttb_keeps_endpoints_and_peaks():
+    points = [(float(i), math.sin(i / 10.0)) for i in range(5000)]
+    points[2500] = (2500.0, 50.0)
+
+    sampled = lttb(points, 200)
+
+    assert len(sampled) == 200
+    assert sampled[0] == points[0] and sampled[-1] == points[-1]
+    assert (2500.0, 50.0) in sampled
+    assert lttb(points[:10], 200) == points[:10]
+
+
+def test_split_detections_moves_low_severity_to_overflow():
+    detections = [{"severity": i / 100.0, "timestamp": f"t{i:03d}", "label": "SCAN"} for i in range(100)]
+
+    shown, overflow = split_detections(detections, 30)
+
+    assert len(shown) == 30 and len(overflow) == 70
+    assert min(d["severity"] for d in shown) > max(d["severity"] for d in overflow)
+
+
+def test_generate_pdf_report_with_many_detections(tmp_path):
+    analysis = {
+        "pcap_path": "big.pcap", "start_time": "2024-01-01T00:00:00", "end_time": "2024-01-01T01:00:00",
+        "total_packets": 1000, "total_bytes": 100000, "top_source_ips": [], "top_dest_ports": [],
+        "window_stats": [{"start_time": f"2024-01-01T00:{i // 60:02d}:{i % 60:02d}", "pps": i % 7, "bps": i % 11}
+                         for i in range(3600)],
+        "detections": [{"timestamp": "2024-01-01T00:00:00", "label": "PORT_SCAN", "score": 0.9,
+                        "severity": 0.5 + (i % 5) / 10, "evidence": {"src_ip": f"10.0.0.{i % 250}"},
+                        "flow_key": None} for i in range(700)],
+    }
+    json_path, pdf_path = tmp_path / "a.json", tmp_path / "a.pdf"
+    json_path.write_text(json.dumps(analysis))
+
+    generate_pdf_report(str(json_path), str(pdf_path), max_detail_rows=100, group_by="entity", max_chart_points=100)
+
+    assert pdf_path.read_bytes().startswith(b"%PDF")
+
+
+def test_iter_object_streams_arrays_across_chunk_boundaries(tmp_path):
+    data = {"total_packets": 123456789, "empty": [], "nested": {"a": [1, 2.5, None, True]},
+            "window_stats": [{"pps": i * 1.25, "label": "w\u00e9,]}" * (i % 3)} for i in range(50)],
+            "detections": [], "end": -0.000125}
+    path = tmp_path / "a.json"
+    path.write_text(json.dumps(data, indent=4))
+
+    for chunk_size in (1, 3, 7, 64):
+        header, windows, detections = {}, [], []
+        for key, value in iter_object(str(path), ("window_stats", "detections"), chunk_size=chunk_size):
+            if key == "window_stats":
+                windows.append(value)
+            elif key == "detections":
+                detections.append(value)
+            else:
+                header[key] = value
+        assert windows == data["window_stats"] and detections == []
+        assert header == {k: v for k, v in data.items() if k not in ("window_stats", "detections")}
+
+
+def test_load_report_data_keeps_top_detections_and_compact_overflow(tmp_path):
+    detections = [{"timestamp": f"2024-01-01T00:00:{i % 60:02d}", "label": "SCAN" if i % 2 else "DGA",
+                   "severity": (i * 37 % 100) / 100.0, "score": 1.0, "evidence": {}} for i in range(250)]
+    path = tmp_path / "a.json"
+    path.write_text(json.dumps({"start_time": "2024-01-01T00:00:00", "detections": detections,
+                                "window_stats": [{"start_time": "2024-01-01T00:00:00", "pps": 3}]}))
+
+    data = load_report_data(str(path), max_detail_rows=20)
+
+    expected, overflow = split_detections(detections, 20)
+    assert data["detections"] == expected
+    assert len(data["overflow_rows"]) == len(overflow) == 230
+    assert data["detection_total"] == 250
+    assert sum(sum(c.values()) for c in data["detection_counts"].values()) == 250
+    assert len(data["rate_series"]) == 1 and data["rate_series"][0] == (0.0, 3.0)
+
+
+def test_appendix_keeps_only_the_most_severe_overflow(tmp_path):
+    detections = [{"timestamp": f"2024-01-01T00:{i // 60 % 60:02d}:{i % 60:02d}", "label": "SCAN",
+                   "severity": (i * 37 % 1000) / 1000.0, "score": 1.0, "evidence": {}} for i in range(3000)]
+    path = tmp_path / "a.json"
+    path.write_text(json.dumps({"start_time": "2024-01-01T00:00:00", "detections": detections, "window_stats": []}))
+
+    data = load_report_data(str(path), max_detail_rows=20, max_appendix_rows=50)
+
+    _, overflow = split_detections(detections, 20)
+    assert data["overflow_total"] == 2980
+    assert data["overflow_rows"] == [appendix_row(det) for det in overflow[:50]]
+    assert load_report_data(str(path), max_detail_rows=20, max_appendix_rows=0)["overflow_rows"] == []
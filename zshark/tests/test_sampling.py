@@ -0,0 +1,42 @@
+import pytest
+from scapy.layers.inet import IP, TCP, UDP
+from scapy.layers.l2 import Ether, ARP
+
+from zshark.core.headers import LINKTYPE_ETHERNET, conversation_key, flow_tuple
+from zshark.core.sampling import Sampler
+
+ETH = Ether(src="02:00:00:00:00:01", dst="02:00:00:00:00:02")
+
+
+def test_flow_tuple_reads_headers_without_dissection():
+    raw = bytes(ETH / IP(src="10.0.0.1", dst="10.0.0.2") / UDP(sport=5353, dport=53))
+    assert flow_tuple(raw, LINKTYPE_ETHERNET) == (17, bytes([10, 0, 0, 1]), bytes([10, 0, 0, 2]), 5353, 53)
+    assert flow_tuple(bytes(ETH / ARP()), LINKTYPE_ETHERNET) is None
+
+
+def test_flow_sampling_keeps_whole_conversations():
+    sampler = Sampler("flow", rate=4, seed=1)
+    kept = 0
+    for port in range(1024, 1424):
+        forward = bytes(ETH / IP(src="10.0.0.1", dst="192.0.2.7") / TCP(sport=port, dport=443))
+        reverse = bytes(ETH / IP(src="192.0.2.7", dst="10.0.0.1") / TCP(sport=443, dport=port))
+        assert conversation_key(forward, LINKTYPE_ETHERNET) == conversation_key(reverse, LINKTYPE_ETHERNET)
+        decision = sampler.keep(forward, LINKTYPE_ETHERNET)
+        assert sampler.keep(reverse, LINKTYPE_ETHERNET) == decision
+        kept += decision
+    assert 60 < kept < 140
+
+
+def test_systematic_and_random_sampling_rates():
+    systematic = Sampler("systematic", rate=5)
+    assert [systematic.keep(b"x", LINKTYPE_ETHERNET) for _ in range(10)] == [True, False, False, False, False] * 2
+    assert systematic.as_dict()["effective_rate"] == 5
+
+    first, second = Sampler("random", rate=3, seed=9), Sampler("random", rate=3, seed=9)
+    decisions = [first.keep(b"x", LINKTYPE_ETHERNET) for _ in range(3000)]
+    assert decisions == [second.keep(b"x", LINKTYPE_ETHERNET) for _ in range(3000)]
+    assert 900 < sum(decisions) < 1100
+
+    assert Sampler("random", rate=1).mode == "none"
+    with pytest.raises(ValueError):
+        Sampler("reservoir", rate=2)
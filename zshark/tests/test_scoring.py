@@ -0,0 +1,51 @@
+from datetime import datetime
+
+from zshark.core.records import DetectionRecord
+from zshark.core.scoring import FusionEngine, score_and_fuse
+
+T0 = datetime(2024, 1, 1, 12, 0, 0).timestamp()
+
+
+def detection(engine, label, seconds, severity, score, **evidence):
+    return DetectionRecord(engine_name=engine, timestamp=T0 + seconds, severity=severity, score=score,
+                           label=label, justification="test", evidence=evidence)
+
+
+def test_online_fusion_keeps_max_score_and_correlates_hosts():
+    detections = [
+        detection("PortScanDetector", "Port Scan", 0, 0.5, 12.0, source_ip="10.0.0.5"),
+        detection("BeaconingDetector", "C2 Beaconing", 10, 0.6, 0.7, flow_key="10.0.0.5-203.0.113.9:40000-443:6"),
+        detection("PortScanDetector", "Port Scan", 20, 0.9, 40.0, source_ip="10.0.0.5"),
+        detection("DNSAnomalyDetector", "DGA", 30, 0.8, 4.1, domain="xkqjzv.example", client_ip="10.0.0.5"),
+        detection("PortScanDetector", "Port Scan", 40, 0.4, 8.0, source_ip="10.0.0.7"),
+    ]
+
+    engine = FusionEngine()
+    engine.add_all(detections)
+
+    fused = engine.detections()
+    assert [(d.label, d.score) for d in fused] == [(d.label, d.score) for d in score_and_fuse([d.to_model() for d in detections])]
+    assert [(d.label, d.score) for d in fused] == [("Port Scan", 40.0), ("C2 Beaconing", 0.7), ("DGA", 4.1),
+                                                   ("Port Scan", 8.0)]
+
+    top = engine.incidents()[0]
+    assert top.entity == "10.0.0.5" and top.first_seen == datetime.fromtimestamp(T0)
+    assert set(top.engines) == {"PortScanDetector", "BeaconingDetector", "DNSAnomalyDetector"}
+    assert top.detection_count == 4 and top.max_severity == 0.9
+    assert top.severity > 0.99
+    assert {i.entity for i in engine.incidents()} == {"10.0.0.5", "203.0.113.9", "10.0.0.7"}
+
+
+def test_expiry_closes_idle_entries_and_reopens_on_new_activity():
+    engine = FusionEngine(expiry_s=60)
+    engine.add(detection("PortScanDetector", "Port Scan", 0, 0.5, 10.0, source_ip="10.0.0.5"))
+    engine.add(detection("PortScanDetector", "Port Scan", 30, 0.5, 20.0, source_ip="10.0.0.5"))
+    assert engine.expire(T0 + 80) == 0
+
+    engine.expire(T0 + 200)
+    assert engine.stats()["peak_open"] == 2
+    engine.add(detection("PortScanDetector", "Port Scan", 210, 0.5, 5.0, source_ip="10.0.0.5"))
+
+    assert [d.score for d in engine.detections()] == [20.0, 5.0]
+    assert [i.detection_count for i in engine.incidents()] == [2, 1]
+    assert engine.stats() == {"raw": 3, "fused": 2, "incidents": 2, "peak_open": 2}
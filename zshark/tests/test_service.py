@@ -0,0 +1,79 @@
+import asyncio
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+from zshark.bench.synthetic import generate_pcap
+from zshark.core.data_structures import ZSharkConfig
+from zshark.service.server import AnalysisService
+
+
+@pytest.fixture(scope="module")
+def service(tmp_path_factory):
+    out_dir = tmp_path_factory.mktemp("service")
+    service = AnalysisService(ZSharkConfig.default(), port=0, workers=1, output_dir=str(out_dir))
+    loop = asyncio.new_event_loop()
+    ready = threading.Event()
+
+    def run():
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(service.start())
+        ready.set()
+        loop.run_forever()
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    assert ready.wait(60)
+    yield service, f"http://127.0.0.1:{service.port}", out_dir
+    asyncio.run_coroutine_threadsafe(service.stop(), loop).result(60)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(10)
+
+
+def request(url, data=None, content_type=None):
+    req = urllib.request.Request(url, data=data, method="POST" if data is not None else "GET")
+    if content_type:
+        req.add_header("Content-Type", content_type)
+    with urllib.request.urlopen(req, timeout=30) as resp:
+        return resp.status, json.loads(resp.read())
+
+
+def wait_for(base, job_id, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        _, job = request(f"{base}/jobs/{job_id}")
+        if job["status"] in ("done", "failed"):
+            return job
+        time.sleep(0.1)
+    raise AssertionError("job did not finish in time")
+
+
+def test_path_and_upload_jobs(service):
+    _, base, out_dir = service
+    pcap = out_dir / "input.pcap"
+    generate_pcap(str(pcap), 500, seed=5)
+
+    status, job = request(f"{base}/jobs", json.dumps({"path": str(pcap)}).encode(), "application/json")
+    assert status == 202
+    job = wait_for(base, job["id"])
+    assert job["status"] == "done"
+    assert job["summary"]["total_packets"] == 500
+
+    status, uploaded = request(f"{base}/jobs?name=upload.pcap&models=arp_spoof", pcap.read_bytes(),
+                               "application/vnd.tcpdump.pcap")
+    uploaded = wait_for(base, uploaded["id"])
+    _, result = request(f"{base}/jobs/{uploaded['id']}/result")
+    assert result["total_packets"] == 500
+    assert {det["engine_name"] for det in result["detections"]} <= {"ARPSpoofDetector"}
+
+
+def test_errors_are_reported_as_json(service):
+    _, base, _ = service
+    with pytest.raises(urllib.error.HTTPError) as excinfo:
+        request(f"{base}/jobs", json.dumps({"path": "/does/not/exist.pcap"}).encode(), "application/json")
+    assert excinfo.value.code == 404
+    assert "error" in json.loads(excinfo.value.read())
@@ -0,0 +1,44 @@
+import random
+from collections import Counter
+
+import numpy as np
+
+from zshark.core.sketches import CountMinSketch, HeavyHitters, top_counts
+
+
+def test_heavy_hitters_exact_below_capacity():
+    tracker = HeavyHitters(capacity=10)
+    tracker.update_counts({"a": 5, "b": 2}, {"a": 500, "b": 200})
+    tracker.update_counts({"b": 4, "c": 1}, {"b": 400, "c": 100})
+
+    assert tracker.top(2, "ip") == [{"ip": "b", "packets": 6, "bytes": 600, "error": 0},
+                                    {"ip": "a", "packets": 5, "bytes": 500, "error": 0}]
+
+
+def test_heavy_hitters_survive_spoofed_flood_in_constant_memory():
+    rng = random.Random(7)
+    truth = Counter()
+    tracker = HeavyHitters(capacity=50, cms_width=256, cms_depth=4)
+    for _ in range(40):
+        window = Counter(f"198.51.{rng.randrange(256)}.{rng.randrange(256)}" for _ in range(2000))
+        window.update({"10.0.0.1": 300, "10.0.0.2": 200})
+        truth.update(window)
+        tracker.update_counts(window, {key: count * 100 for key, count in window.items()})
+
+    assert len(tracker.entries) == 50
+    top = tracker.top(2, "ip")
+    assert [entry["ip"] for entry in top] == ["10.0.0.1", "10.0.0.2"]
+    for entry in top:
+        assert truth[entry["ip"]] <= entry["packets"] <= truth[entry["ip"]] + entry["error"]
+        assert entry["error"] <= tracker.total_packets // tracker.capacity
+
+
+def test_count_min_never_undercounts_and_window_top_is_exact():
+    sketch = CountMinSketch(width=16, depth=3)
+    counts = {f"k{i}": i for i in range(1, 60)}
+    sketch.add(sketch.columns(list(counts)), np.array(list(counts.values())))
+    assert all(sketch.estimate(key) >= count for key, count in counts.items())
+
+    assert top_counts({80: 3, 443: 9, 53: 1}, {80: 30, 443: 90}, 2, "port") == [
+        {"port": 443, "packets": 9, "bytes": 90}, {"port": 80, "packets": 3, "bytes": 30}]
+    assert top_counts({80: 1}, {}, 0, "port") is None
@@ -0,0 +1,39 @@
+import subprocess
+import sys
+
+# Import-time budget for the CLI entry point. Heavy dependencies must only be
+# imported by the subcommand that needs them.
+STARTUP_BUDGET_S = 0.5
+HEAVY_MODULES = ("scapy", "numpy", "reportlab", "pydantic")
+
+PROBE = f"""
+import sys, time
+start = time.perf_counter()
+import zshark.cli.main
+elapsed = time.perf_counter() - start
+loaded = [m for m in {HEAVY_MODULES!r} if m in sys.modules]
+print(elapsed)
+print(",".join(loaded))
+"""
+
+
+def run_probe():
+    out = subprocess.run([sys.executable, "-c", PROBE], capture_output=True, text=True, check=True).stdout.splitlines()
+    return float(out[0]), out[1] if len(out) > 1 else ""
+
+
+def test_cli_import_skips_heavy_dependencies():
+    _, loaded = run_probe()
+    assert loaded == ""
+
+
+def test_cli_import_within_budget():
+    elapsed = min(run_probe()[0] for _ in range(3))
+    assert elapsed < STARTUP_BUDGET_S
+
+
+def test_model_registry_is_lazy():
+    probe = ("import sys, zshark.core, zshark.models; "
+             "print(any(m in sys.modules for m in ('scapy.layers.inet', 'numpy', 'zshark.models.ddos_detector')))")
+    out = subprocess.run([sys.executable, "-c", probe], capture_output=True, text=True, check=True).stdout.strip()
+    assert out == "False"